@@ -0,0 +1,130 @@
+"""Admission control: per-route-class concurrency limits and per-client rate limits.
+
+`AdmissionMiddleware` sorts each HTTP request into a cost class by its route template.
+A class serves at most `limit` requests at once and lets up to `queue` more wait for a
+slot, each for at most `queue_timeout` seconds; a request that finds the queue full or
+waits too long is shed with 503. Every request also takes `cost` tokens from its
+client's bucket, and a client that has run dry gets 429. Both answers carry
+Retry-After and are given before the route runs, so a spike of expensive requests
+(bcrypt, search scans) queues and sheds within its own class while cheap reads keep
+their own slots.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from starlette.responses import JSONResponse
+
+import metrics
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    limit: int  # requests served at once
+    queue: int  # requests waiting for a slot
+    cost: float  # tokens taken from the client's bucket
+
+
+class TokenBuckets:
+    """LRU of per-client token buckets, refilling at `rate` tokens per second up to `burst`"""
+
+    def __init__(self, rate: float, burst: float, max_size: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_size = max_size
+        self.entries = OrderedDict()  # client key -> (tokens, monotonic time of last update)
+
+    def take(self, key: str, cost: float) -> float:
+        """Take `cost` tokens; returns 0 when granted, else the seconds until they would be"""
+        now = time.monotonic()
+        tokens, updated = self.entries.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        wait = 0.0
+        if tokens < cost:
+            wait = (cost - tokens) / self.rate
+        else:
+            tokens -= cost
+        self.entries[key] = (tokens, now)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        return wait
+
+
+class Gate:
+    """The slots and queue of one route class"""
+
+    def __init__(self, route_class: RouteClass):
+        self.route_class = route_class
+        self.slots = asyncio.Semaphore(route_class.limit)
+        self.waiting = 0
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying class concurrency limits and client token buckets.
+
+    `classify(method, route_template)` returns a RouteClass, or None for routes that
+    are never limited (long-lived streams, the metrics scrape). `client_key(scope)`
+    names the bucket a request draws from.
+    """
+
+    def __init__(self, app, classify: Callable[[str, str], Optional[RouteClass]], client_key: Callable[[dict], str],
+                 buckets: TokenBuckets, queue_timeout: float):
+        self.app = app
+        self.classify = classify
+        self.client_key = client_key
+        self.buckets = buckets
+        self.queue_timeout = queue_timeout
+        self.gates: Dict[str, Gate] = {}
+
+    def gate(self, route_class: RouteClass) -> Gate:
+        gate = self.gates.get(route_class.name)
+        if gate is None:
+            gate = self.gates[route_class.name] = Gate(route_class)
+        return gate
+
+    async def shed(self, scope, receive, send, route_class: RouteClass, status: int, reason: str, retry_after: float):
+        metrics.ADMISSION_SHED.inc(route_class.name, reason)
+        detail = "Too many requests" if status == 429 else "Server busy, please retry"
+        response = JSONResponse({"detail": detail}, status_code=status, headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+        await response(scope, receive, send)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        route_class = self.classify(scope['method'], metrics.route_template(scope))
+        if route_class is None:
+            return await self.app(scope, receive, send)
+
+        retry_after = self.buckets.take(self.client_key(scope), route_class.cost)
+        if retry_after:
+            return await self.shed(scope, receive, send, route_class, 429, 'rate_limited', retry_after)
+
+        gate = self.gate(route_class)
+        start = time.perf_counter()
+        if gate.slots.locked():
+            if gate.waiting >= route_class.queue:
+                return await self.shed(scope, receive, send, route_class, 503, 'queue_full', self.queue_timeout)
+            gate.waiting += 1
+            metrics.ADMISSION_QUEUED.inc(route_class.name)
+            try:
+                await asyncio.wait_for(gate.slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                metrics.ADMISSION_QUEUE_SECONDS.observe(time.perf_counter() - start, route_class.name)
+                return await self.shed(scope, receive, send, route_class, 503, 'queue_timeout', self.queue_timeout)
+            finally:
+                gate.waiting -= 1
+                metrics.ADMISSION_QUEUED.dec(route_class.name)
+        else:
+            await gate.slots.acquire()
+        metrics.ADMISSION_QUEUE_SECONDS.observe(time.perf_counter() - start, route_class.name)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            gate.slots.release()
@@ -0,0 +1,260 @@
+"""Route-level benchmark of the ASGI app.
+
+Runs `server.app` in-process through an httpx ASGI client against a generated
+dataset (see generate_data.py) and drives concurrent workloads per route,
+reporting throughput and p50/p95/p99 latency. The store is an in-memory Motor
+stand-in (mongomock-motor, the default), a local mongod (--store mongo, using
+MONGO_URL and a throwaway `<DB_NAME>_bench` database) or a throwaway SQLite file
+(--store sqlite).
+
+    python bench_routes.py [--workloads board_open,search] [--requests 500] [--concurrency 16]
+    python bench_routes.py --output run.json --baseline baseline.json [--threshold 0.2]
+
+With --baseline, exits 1 when any workload's p95 latency grew, or its throughput
+fell, by more than --threshold (a fraction) relative to the baseline run.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+# The in-memory store needs no .env; --store mongo reads it like the server
+load_dotenv(Path(__file__).parent / '.env')
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow')
+# A few users drive every request, far past the per-user rate limits; export
+# ADMISSION_CONTROL=1 to measure with admission control in place
+os.environ.setdefault('ADMISSION_CONTROL', '0')
+# Generated tasks are dated 2025; keep the archive job from moving them mid-run
+os.environ.setdefault('ARCHIVE_AFTER_DAYS', '0')
+
+import server
+from repository import Repository, MongoRepository
+from sql_repository import SqlRepository
+
+SEARCH_QUERIES = ['api', 'deploy', 'design bug', 'sync', 'payment web', 'report export', 'log']
+TABLE_FIELDS = 'title,status_id,priority,due_date,group_id'  # the board table view's columns
+
+
+def open_store(store: str, workdir: str) -> Repository:
+    """A fresh, empty store of the given kind"""
+    if store == 'sqlite':
+        return SqlRepository(os.path.join(workdir, 'bench.db'), on_board_removed=server.board_cache.invalidate)
+    if store == 'memory':
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("--store memory needs mongomock-motor (pip install mongomock-motor), or use --store mongo")
+        database = AsyncMongoMockClient(tz_aware=True)['taskflow_bench']
+    else:
+        database = AsyncIOMotorClient(os.environ['MONGO_URL'])[f"{os.environ['DB_NAME']}_bench"]
+    return MongoRepository(database, on_board_removed=server.board_cache.invalidate)
+
+
+async def prepare(client: httpx.AsyncClient, spec: server.DatasetSpec) -> list:
+    """Generate the dataset and log every generated user in; returns one context per user"""
+    summary = await server.generate_dataset(spec)
+    contexts = []
+    for n in range(summary.get('users', 0)):
+        email = f"loadtest-{spec.seed}-{n}@example.com"
+        r = await client.post("/api/auth/login", json={"email": email, "password": server.GENERATED_PASSWORD})
+        r.raise_for_status()
+        headers = {"Authorization": f"Bearer {r.json()['token']}"}
+        board_ids, task_ids = [], []
+        for workspace in (await client.get("/api/workspaces", headers=headers)).json():
+            boards = (await client.get("/api/boards", params={"workspace_id": workspace['id']}, headers=headers)).json()
+            board_ids.extend(b['id'] for b in boards)
+        for board_id in board_ids:
+            r = await client.get("/api/tasks", params={"board_id": board_id}, headers={**headers, "Accept": server.NDJSON_MEDIA_TYPE})
+            task_ids.extend(json.loads(line)['id'] for line in r.text.splitlines() if line)
+        contexts.append({"email": email, "headers": headers, "board_ids": board_ids, "task_ids": task_ids})
+    return contexts
+
+
+# Each workload sends one request for a random user and returns the response
+async def board_open(client, ctx, rng):
+    board_id = rng.choice(ctx['board_ids'])
+    return await client.get(f"/api/boards/{board_id}/snapshot", headers=ctx['headers'])
+
+
+async def task_list(client, ctx, rng):
+    return await client.get("/api/tasks", params={"board_id": rng.choice(ctx['board_ids'])}, headers=ctx['headers'])
+
+
+async def task_table(client, ctx, rng):
+    params = {"board_id": rng.choice(ctx['board_ids']), "fields": TABLE_FIELDS}
+    return await client.get("/api/tasks", params=params, headers=ctx['headers'])
+
+
+async def task_update(client, ctx, rng):
+    task_id = rng.choice(ctx['task_ids'])
+    body = {"priority": rng.choice(['low', 'medium', 'high', 'critical']), "title": f"Benchmark edit {rng.randrange(10**6)}"}
+    return await client.put(f"/api/tasks/{task_id}", json=body, headers=ctx['headers'])
+
+
+async def task_move(client, ctx, rng):
+    return await client.post(f"/api/tasks/{rng.choice(ctx['task_ids'])}/move", json={}, headers=ctx['headers'])
+
+
+async def search(client, ctx, rng):
+    params = {"q": rng.choice(SEARCH_QUERIES), "board_id": rng.choice(ctx['board_ids'])}
+    return await client.get("/api/search/tasks", params=params, headers=ctx['headers'])
+
+
+async def board_stats(client, ctx, rng):
+    return await client.get(f"/api/boards/{rng.choice(ctx['board_ids'])}/stats", headers=ctx['headers'])
+
+
+async def login(client, ctx, rng):
+    return await client.post("/api/auth/login", json={"email": ctx['email'], "password": server.GENERATED_PASSWORD})
+
+
+WORKLOADS = {
+    "board_open": board_open,
+    "task_list": task_list,
+    "task_table": task_table,
+    "task_update": task_update,
+    "task_move": task_move,
+    "search": search,
+    "board_stats": board_stats,
+    "login": login,
+}
+
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+async def run_workload(client, contexts: list, workload, requests: int, concurrency: int, seed: int) -> dict:
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def worker(rng):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await workload(client, rng.choice(contexts), rng)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker(random.Random(seed * 1000 + n)) for n in range(concurrency)])
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p95_ms": round(percentile(latencies, 0.95), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+    }
+
+
+def regressions(results: dict, baseline: dict, threshold: float) -> list:
+    """Describe every workload that is slower than the baseline by more than threshold"""
+    found = []
+    for name, current in results['workloads'].items():
+        previous = baseline.get('workloads', {}).get(name)
+        if not previous:
+            continue
+        if current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            found.append(f"{name}: p95 {previous['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current['throughput'] < previous['throughput'] * (1 - threshold):
+            found.append(f"{name}: throughput {previous['throughput']}/s -> {current['throughput']}/s")
+    return found
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--store', choices=['memory', 'mongo', 'sqlite'], default='memory')
+    parser.add_argument('--workloads', default=','.join(WORKLOADS), help="comma-separated subset of: " + ', '.join(WORKLOADS))
+    parser.add_argument('--requests', type=int, default=500, help="requests per workload")
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--boards-per-workspace', type=int, default=3)
+    parser.add_argument('--tasks-per-board', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="write the results as JSON")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2)
+    args = parser.parse_args()
+
+    names = [n.strip() for n in args.workloads.split(',') if n.strip()]
+    unknown = [n for n in names if n not in WORKLOADS]
+    if unknown:
+        parser.error(f"unknown workloads: {', '.join(unknown)}")
+
+    workdir = tempfile.mkdtemp(prefix='taskflow_bench_')
+    server.store = open_store(args.store, workdir)
+    spec = server.DatasetSpec(
+        users=args.users,
+        workspaces_per_user=1,
+        boards_per_workspace=args.boards_per_workspace,
+        tasks_per_board=args.tasks_per_board,
+        seed=args.seed
+    )
+    results = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "store": args.store,
+        "python": platform.python_version(),
+        "dataset": spec.model_dump(),
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "workloads": {},
+    }
+    try:
+        if args.store != 'sqlite':
+            await server.store.database.client.drop_database(server.store.database.name)
+        await server.store.migrate()
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            contexts = await prepare(client, spec)
+            print(f"{'workload':<12} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}")
+            for name in names:
+                stats = await run_workload(client, contexts, WORKLOADS[name], args.requests, args.concurrency, args.seed)
+                results['workloads'][name] = stats
+                print(f"{name:<12} {stats['throughput']:>9.1f} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['errors']:>7}")
+    finally:
+        if args.store == 'mongo':
+            await server.store.database.client.drop_database(server.store.database.name)
+        server.store.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}")
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,94 @@
+"""Micro-benchmark of the task list response paths.
+
+Compares the standard path (serialize_doc, response_model validation, JSON encoding
+through FastAPI) with the FAST_RESPONSES path (fast_payload shaping and dump_json) for
+boards of 100, 1k and 10k tasks, fed the documents a store returns. Also checks that
+both paths produce the same fields, and the same values once validated against the
+Task model.
+
+    python bench_serialization.py [--repeat 20]
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_bench')
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+import server
+
+SIZES = [100, 1_000, 10_000]
+task_list = TypeAdapter(List[server.Task])
+
+
+def make_tasks(count: int, seed: int = 0) -> list:
+    """Task documents as a store returns them: datetimes not yet serialized, and no
+    archived_at on live tasks"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    tasks = []
+    for i in range(count):
+        task = server.Task(
+            board_id='board',
+            group_id=f'group-{i % 5}',
+            title=f'Task {i}',
+            description=' '.join(rng.choice(['api', 'design', 'bug', 'review', 'deploy']) for _ in range(rng.randint(0, 40))),
+            status_id=f'status-{i % 4}',
+            priority=rng.choice(['low', 'medium', 'high', 'critical']),
+            start_date=now if i % 2 else None,
+            due_date=now + timedelta(days=i % 30),
+            order=i
+        )
+        tasks.append(task.model_dump(exclude={'archived_at'}))
+    return tasks
+
+
+def standard_path(docs: list) -> bytes:
+    content = [server.serialize_doc(d) for d in docs]
+    validated = task_list.validate_python(content)
+    return JSONResponse(jsonable_encoder(task_list.dump_python(validated, mode='json'))).body
+
+
+def fast_path(docs: list) -> bytes:
+    return server.dump_json(server.fast_payload(docs, List[server.Task]))
+
+
+def timed(func, docs: list, repeat: int) -> float:
+    """Best wall time of `repeat` runs, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(docs)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'tasks':>8} {'standard ms':>12} {'fast ms':>10} {'speedup':>8}")
+    for size in SIZES:
+        docs = make_tasks(size)
+        standard = json.loads(standard_path(docs))
+        fast = json.loads(fast_path(docs))
+        assert [set(t) for t in fast] == [set(t) for t in standard], "fast path fields differ from the validated response"
+        fast = task_list.dump_python(task_list.validate_python(fast), mode='json')
+        assert standard == fast, "fast path payload differs from the validated response"
+
+        standard_ms = timed(standard_path, docs, args.repeat)
+        fast_ms = timed(fast_path, docs, args.repeat)
+        print(f"{size:>8} {standard_ms:>12.2f} {fast_ms:>10.2f} {standard_ms / fast_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
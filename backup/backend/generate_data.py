@@ -0,0 +1,60 @@
+"""Synthetic dataset generator for load testing.
+
+Writes users, workspaces, boards, groups, statuses and tasks through chunked
+insert_many calls. The same arguments and --seed always produce the same dataset,
+ids included, so benchmark runs can be repeated on identical data. Writes to the
+store the server is configured with (STORAGE_BACKEND, from .env like the server). Generated users log in with the
+password "loadtest".
+
+    python generate_data.py --users 100 --tasks-per-board 2000 --seed 1 [--drop]
+"""
+import argparse
+import asyncio
+import time
+from pathlib import Path
+
+import server
+
+COLLECTIONS = ['users', 'workspaces', 'boards', 'groups', 'statuses', 'tasks', 'tasks_archive', 'board_stats', 'board_changes', 'deletion_jobs']
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--workspaces-per-user', type=int, default=2)
+    parser.add_argument('--boards-per-workspace', type=int, default=3)
+    parser.add_argument('--groups-per-board', type=int, default=4)
+    parser.add_argument('--statuses-per-board', type=int, default=4)
+    parser.add_argument('--tasks-per-board', type=int, default=100, help="average; board sizes are long-tailed")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--drop', action='store_true', help="drop every collection (or the SQLite file) first, so the dataset can be rebuilt")
+    args = parser.parse_args()
+
+    spec = server.DatasetSpec(
+        users=max(args.users, 1),
+        workspaces_per_user=args.workspaces_per_user,
+        boards_per_workspace=args.boards_per_workspace,
+        groups_per_board=args.groups_per_board,
+        statuses_per_board=args.statuses_per_board,
+        tasks_per_board=args.tasks_per_board,
+        seed=args.seed
+    )
+    if args.drop:
+        if server.db is not None:
+            for name in COLLECTIONS:
+                await server.db.drop_collection(name)
+        else:
+            for path in (server.SQLITE_PATH, f"{server.SQLITE_PATH}-wal", f"{server.SQLITE_PATH}-shm"):
+                Path(path).unlink(missing_ok=True)
+    await server.store.migrate()
+
+    start = time.perf_counter()
+    summary = await server.generate_dataset(spec)
+    elapsed = time.perf_counter() - start
+    for name in ('users', 'workspaces', 'boards', 'groups', 'statuses', 'tasks'):
+        print(f"{name:>10}: {summary.get(name, 0)}")
+    print(f"written in {elapsed:.1f}s ({summary.get('tasks', 0) / elapsed:,.0f} tasks/s)")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
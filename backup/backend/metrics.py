@@ -0,0 +1,252 @@
+"""In-process metrics exposed in the Prometheus text format.
+
+Metrics are module-level objects that server.py records into; `render()` produces
+the /metrics payload, so no client library is needed. Recording is thread-safe:
+the PyMongo listeners run on Motor's executor threads, not the event loop.
+"""
+import threading
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+from pymongo import monitoring
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+REGISTRY: List['Metric'] = []
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple, extra: str = '') -> str:
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: Dict[Tuple, object] = {}
+        self.lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for labels, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{format_labels(self.labels, labels)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def inc(self, *labels, amount: float = 1):
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def dec(self, *labels, amount: float = 1):
+        self.inc(*labels, amount=-amount)
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+
+    def observe(self, value: float, *labels):
+        with self.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                # one slot per bucket plus +Inf, then the sum
+                counts = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self.lock:
+            for labels, counts in sorted(self.values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{self.name}_bucket{format_labels(self.labels, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {counts[-1]}")
+                lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {cumulative}")
+        return lines
+
+
+def render() -> bytes:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+HTTP_REQUEST_SECONDS = Histogram('http_request_duration_seconds', "Time to serve a request, by route template", ('method', 'route'))
+HTTP_REQUESTS = Counter('http_requests_total', "Requests served, by route template and status code", ('method', 'route', 'status'))
+HTTP_IN_FLIGHT = Gauge('http_requests_in_flight', "Requests currently being served, by route template", ('route',))
+MONGO_COMMAND_SECONDS = Histogram('mongo_command_duration_seconds', "MongoDB command round trips, by collection and command", ('collection', 'command'))
+MONGO_COMMAND_FAILURES = Counter('mongo_command_failures_total', "Failed MongoDB commands, by collection and command", ('collection', 'command'))
+MONGO_POOL_WAIT_SECONDS = Histogram('mongo_pool_checkout_wait_seconds', "Time spent waiting for a connection from the MongoDB pool")
+MONGO_POOL_CHECKED_OUT = Gauge('mongo_pool_connections_checked_out', "MongoDB connections currently checked out of the pool")
+PASSWORD_HASH_SECONDS = Histogram('password_hash_duration_seconds', "bcrypt calls including their wait for the hash pool", ('operation',))
+ADMISSION_QUEUE_SECONDS = Histogram('admission_queue_seconds', "Time requests waited for a slot in their route class", ('route_class',))
+ADMISSION_QUEUED = Gauge('admission_queued_requests', "Requests currently waiting for a slot, by route class", ('route_class',))
+ADMISSION_SHED = Counter('admission_shed_total', "Requests refused before running, by route class and reason", ('route_class', 'reason'))
+COALESCED_READS = Counter('coalesced_reads_total', "Coalescable reads by kind; role is leader (ran the load) or joined (shared one in flight)", ('kind', 'role'))
+RESPONSE_RENDER_SECONDS = Histogram('response_render_duration_seconds', "JSON encoding of response bodies", ('encoder',))
+
+
+def route_template(scope) -> str:
+    """The path template of the route serving a request, so ids do not become label values"""
+    template = scope.get('route_template')
+    if template is None:
+        template = scope['route_template'] = find_route(scope)
+    return template
+
+
+def find_route(scope) -> str:
+    """The route the router will dispatch to: the first full match (path and method),
+    else the first path-only match, which answers 405"""
+    partial = None
+    for route in scope['app'].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or 'unmatched'
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight count per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        method = scope['method']
+        route = route_template(scope)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method, route)
+            HTTP_REQUESTS.inc(method, route, str(status))
+            HTTP_IN_FLIGHT.dec(route)
+
+
+class TimedJSONResponse(JSONResponse):
+    """The default JSON response, recording how long encoding takes"""
+
+    def render(self, content) -> bytes:
+        start = time.perf_counter()
+        body = super().render(content)
+        RESPONSE_RENDER_SECONDS.observe(time.perf_counter() - start, 'json')
+        return body
+
+
+class CommandTimer(monitoring.CommandListener):
+    """Times every MongoDB command by collection and command name"""
+
+    def __init__(self):
+        self.pending: Dict[Tuple, str] = {}
+        self.lock = threading.Lock()
+
+    def started(self, event):
+        # The collection is the value of the command's first key (or `collection` for getMore)
+        collection = event.command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = event.command.get('collection', '')
+        with self.lock:
+            self.pending[(event.connection_id, event.request_id)] = collection
+
+    def finished(self, event) -> str:
+        with self.lock:
+            collection = self.pending.pop((event.connection_id, event.request_id), '')
+        MONGO_COMMAND_SECONDS.observe(event.duration_micros / 1e6, collection, event.command_name)
+        return collection
+
+    def succeeded(self, event):
+        self.finished(event)
+
+    def failed(self, event):
+        MONGO_COMMAND_FAILURES.inc(self.finished(event), event.command_name)
+
+
+class PoolTimer(monitoring.ConnectionPoolListener):
+    """Times connection checkouts; a checkout starts and ends on the same thread"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def connection_check_out_started(self, event):
+        self.local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        MONGO_POOL_CHECKED_OUT.inc()
+        started = getattr(self.local, 'started', None)
+        if started is not None:
+            MONGO_POOL_WAIT_SECONDS.observe(time.perf_counter() - started)
+            self.local.started = None
+
+    def connection_check_out_failed(self, event):
+        self.local.started = None
+
+    def connection_checked_in(self, event):
+        MONGO_POOL_CHECKED_OUT.dec()
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
@@ -0,0 +1,89 @@
+"""Query-plan regression check.
+
+Runs explain() for the query shape behind each route and fails if any of them
+falls back to a COLLSCAN. Needs a reachable MongoDB (MONGO_URL/DB_NAME, read from
+.env like the server; STORAGE_BACKEND must be mongo):
+
+    python query_plans.py
+
+Tests can call `assert_no_collscan(db)` against their own database.
+"""
+import asyncio
+import sys
+from datetime import datetime, timezone
+
+import server
+from repository import MongoRepository, keyset_filter, overdue_filter, search_filter, task_query, timeline_filter
+
+SOME_DAY = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+# (route, collection, filter, sort) for every hot lookup in repository.MongoRepository
+QUERY_SHAPES = [
+    ("register/login", "users", {"email": "user@example.com"}, None),
+    ("get_me", "users", {"id": "id"}, None),
+    ("token check", "revoked_tokens", {"_id": "digest", "expires_at": {"$gt": SOME_DAY}}, None),
+    ("get_workspaces", "workspaces", {"owner_id": "id"}, None),
+    ("update_workspace", "workspaces", {"id": "id", "owner_id": "id"}, None),
+    ("get_boards", "boards", {"workspace_id": "id"}, None),
+    ("get_board", "boards", {"id": "id"}, None),
+    ("get_groups", "groups", {"board_id": "id"}, [("order", 1)]),
+    ("update_group", "groups", {"id": "id"}, None),
+    ("get_statuses", "statuses", {"board_id": "id"}, [("order", 1)]),
+    ("update_status", "statuses", {"id": "id"}, None),
+    ("get_tasks", "tasks", {"board_id": "id"}, [("order", 1), ("id", 1)]),
+    ("get_tasks?group_id", "tasks", {"group_id": "id"}, [("order", 1), ("id", 1)]),
+    ("get_tasks?status_id", "tasks", {"status_id": "id"}, [("order", 1), ("id", 1)]),
+    ("get_tasks?cursor", "tasks", {"$and": [{"board_id": "id"}, keyset_filter(server.decode_cursor(server.encode_cursor({"order": 0, "id": "id"})))]}, [("order", 1), ("id", 1)]),
+    ("get_tasks?due_before", "tasks", task_query({"board_id": "id", "due_before": SOME_DAY}), [("order", 1), ("id", 1)]),
+    ("get_board_timeline", "tasks", timeline_filter("id", SOME_DAY, datetime(2025, 2, 1, tzinfo=timezone.utc)), [("due_date", 1), ("id", 1)]),
+    ("get_task", "tasks", {"id": "id"}, None),
+    ("bulk_tasks", "tasks", {"id": {"$in": ["a", "b"]}}, None),
+    ("get_board_stats", "board_stats", {"board_id": "id"}, None),
+    ("get_board_stats?overdue", "tasks", {"board_id": "id", **overdue_filter("id")}, None),
+    ("sync", "board_changes", {"board_id": "id", "seq": {"$gt": 0}}, [("seq", 1)]),
+    ("search_tasks", "tasks", {"board_id": "id", **search_filter(["design"])}, None),
+    ("archive_job", "tasks", {"board_id": "id", "status_id": "id", "updated_at": {"$lt": SOME_DAY}}, None),
+    ("get_tasks?include_archived", "tasks_archive", {"board_id": "id"}, [("order", 1), ("id", 1)]),
+    ("restore_task", "tasks_archive", {"id": "id"}, None),
+]
+
+
+def find_stages(plan: dict, stage: str) -> bool:
+    if plan.get('stage') == stage:
+        return True
+    children = plan.get('inputStages', []) + [plan[k] for k in ('inputStage', 'queryPlan') if k in plan]
+    return any(find_stages(child, stage) for child in children)
+
+
+async def collscan_routes(database) -> list:
+    """Return the routes whose winning plan contains a COLLSCAN"""
+    offenders = []
+    for route, collection, query, sort in QUERY_SHAPES:
+        cursor = database[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        if find_stages(explain['queryPlanner']['winningPlan'], 'COLLSCAN'):
+            offenders.append(route)
+    return offenders
+
+
+async def assert_no_collscan(database):
+    await MongoRepository(database).ensure_indexes()
+    offenders = await collscan_routes(database)
+    assert not offenders, f"Queries fall back to COLLSCAN: {', '.join(offenders)}"
+
+
+async def main():
+    if server.db is None:
+        print("query plans are only checked on the mongo backend")
+        return 1
+    await MongoRepository(server.db, sync_retention_days=server.SYNC_RETENTION_DAYS).ensure_indexes()
+    offenders = await collscan_routes(server.db)
+    for route, *_ in QUERY_SHAPES:
+        print(f"{'COLLSCAN' if route in offenders else 'ok':>8}  {route}")
+    return 1 if offenders else 0
+
+
+if __name__ == '__main__':
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,1108 @@
+"""Storage backends behind the API routes.
+
+server.py reads and writes through a `Repository`. `MongoRepository` keeps the
+documents in MongoDB through Motor; `SqlRepository` (sql_repository.py) keeps them
+in tables following the MySQL DDL in DATABASE_SCHEMA.md. Both take and return
+plain dicts shaped like the API models, with timezone-aware UTC datetimes (BSON dates
+in MongoDB, so the Motor client must be opened with tz_aware=True). Task search
+terms are the store's business: it derives them from title and description on every
+write and never returns them.
+
+Writes addressed by a group, status or task id take an optional `board_ids` scope:
+when given, a document outside those boards is treated as missing.
+
+Completed tasks can be moved to a cold archive (tasks_archive) with the same shape
+plus `archived_at`; archived tasks are only reached through the archive methods.
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import re
+from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, Callable, Collection, Dict, List, Optional, Set, Tuple, Union
+
+from pymongo import ASCENDING, IndexModel, InsertOne, UpdateOne, ReplaceOne, DeleteOne, ReturnDocument
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+
+logger = logging.getLogger(__name__)
+
+TASK_PROJECTION = {"_id": 0, "search_terms": 0}
+BOARD_PROJECTION = {"_id": 0, "version": 0}
+
+# Cascade deletion (MongoDB): descendants of deleted workspaces/boards are removed by a background worker
+CASCADE_LEASE_SECONDS = 300
+CASCADE_POLL_SECONDS = 5
+
+STREAM_PAGE_SIZE = 500
+
+
+class StorageError(Exception):
+    """A write was rejected by the store"""
+
+
+class DuplicateKey(StorageError):
+    """A unique key (an id or a user's email) is already taken"""
+
+
+class ConstraintViolation(StorageError):
+    """A write referenced a missing row or broke a column constraint"""
+
+
+MISSING_REFERENCE = "Referenced workspace, board, group or status does not exist"
+
+
+# Timestamp fields of each collection; older deployments stored them as ISO strings
+DATETIME_FIELDS = {
+    "users": ("created_at",),
+    "workspaces": ("created_at",),
+    "boards": ("created_at",),
+    "groups": ("created_at",),
+    "statuses": ("created_at",),
+    "tasks": ("created_at", "updated_at", "start_date", "due_date"),
+}
+SCHEMA_VERSION = 1  # recorded in the schema document once every data migration has run
+
+# Task filters that compare instead of matching: filter key -> (field, operator)
+TASK_RANGE_FILTERS = {
+    "due_before": ("due_date", "$lt"),
+    "due_after": ("due_date", "$gte"),
+    "status_id_not": ("status_id", "$ne"),
+}
+
+
+def as_utc(value: datetime) -> datetime:
+    """Naive datetimes are UTC"""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def parse_datetime(value: str) -> datetime:
+    return as_utc(datetime.fromisoformat(value)).astimezone(timezone.utc)
+
+
+def task_sort_key(task: dict) -> tuple:
+    return (task.get('order', 0), task['id'])
+
+
+async def stream_pages(list_page, after: Optional[tuple], limit: Optional[int]) -> AsyncIterator[dict]:
+    """Yield the tasks of list_page(after, page_size) page by page along the (order, id) keyset"""
+    while limit is None or limit > 0:
+        page_size = STREAM_PAGE_SIZE if limit is None else min(limit, STREAM_PAGE_SIZE)
+        tasks = await list_page(after, page_size)
+        for task in tasks:
+            yield task
+        if len(tasks) < page_size:
+            return
+        after = task_sort_key(tasks[-1])
+        if limit is not None:
+            limit -= len(tasks)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens, keeping first-seen order"""
+    if not text:
+        return []
+    return list(dict.fromkeys(re.findall(r'\w+', text.casefold())))
+
+
+def task_search_terms(doc: dict) -> List[str]:
+    return list(dict.fromkeys(tokenize(doc.get('title')) + tokenize(doc.get('description'))))
+
+
+class Repository:
+    """What the routes need from a store.
+
+    Task filters are {field: value} on board_id, group_id, status_id and priority; a
+    list value matches any of its items. `due_before` and `due_after` bound due_date
+    (before is exclusive, after inclusive) and `status_id_not` excludes one status; a
+    task without a due date matches no due bound. `search` is a list of query terms, each of
+    which must prefix one of a task's words (an empty list matches nothing). `after`
+    is the (order, id) keyset of the last task of the previous page.
+
+    List methods take an optional `fields` collection: only those fields are read and
+    returned (None returns whole documents).
+    """
+
+    on_board_removed: Optional[Callable[[str], None]] = None  # called for boards removed by a cascade
+
+    async def migrate(self):
+        """Create missing tables/indexes and backfill derived data"""
+
+    def start(self):
+        """Start background work; called once the event loop runs"""
+
+    def stop(self):
+        """Stop background work"""
+
+    def close(self):
+        """Release connections"""
+
+    # Users
+
+    async def find_user(self, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def find_user_by_email(self, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def insert_user(self, doc: dict):
+        """Raises DuplicateKey when the email is taken"""
+        raise NotImplementedError
+
+    async def set_password_hash(self, user_id: str, password_hash: str):
+        raise NotImplementedError
+
+    async def revoke_token(self, digest: str, expires_at: datetime):
+        """Record a logged-out token (by digest) until it would have expired anyway"""
+        raise NotImplementedError
+
+    async def is_token_revoked(self, digest: str) -> bool:
+        raise NotImplementedError
+
+    # Workspaces
+
+    async def list_workspaces(self, owner_id: str, fields: Optional[Collection[str]] = None) -> List[dict]:
+        raise NotImplementedError
+
+    async def find_workspace(self, workspace_id: str, owner_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def insert_workspace(self, doc: dict):
+        raise NotImplementedError
+
+    async def update_workspace(self, workspace_id: str, owner_id: str, data: dict) -> Optional[dict]:
+        """Returns the updated workspace, or None when the owner has no such workspace"""
+        raise NotImplementedError
+
+    async def delete_workspace(self, workspace_id: str, owner_id: str) -> bool:
+        """Delete a workspace and, now or in the background, everything under it"""
+        raise NotImplementedError
+
+    async def access_index(self, owner_id: str) -> Dict[str, List[str]]:
+        """The ids of the owner's workspaces, each with the ids of its boards"""
+        raise NotImplementedError
+
+    # Boards
+
+    async def list_boards(self, workspace_id: Union[str, List[str]], fields: Optional[Collection[str]] = None) -> List[dict]:
+        """Boards in one workspace, or in any of a list of them"""
+        raise NotImplementedError
+
+    async def list_board_ids(self, after_id: str, limit: int) -> List[str]:
+        """Ids of every board, in id order, for background jobs that visit them all"""
+        raise NotImplementedError
+
+    async def find_board(self, board_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def board_version(self, board_id: str) -> Optional[int]:
+        """The board's write counter, or None when the board does not exist"""
+        raise NotImplementedError
+
+    async def insert_board(self, doc: dict, statuses: List[dict]):
+        raise NotImplementedError
+
+    async def update_board(self, board_id: str, data: dict) -> Optional[Tuple[dict, int]]:
+        """Update a board and bump its version; returns the board and the new version"""
+        raise NotImplementedError
+
+    async def delete_board(self, board_id: str) -> bool:
+        """Delete a board and, now or in the background, its groups, statuses and tasks"""
+        raise NotImplementedError
+
+    async def bump_board_versions(self, board_ids: List[str], counters: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, int]:
+        """Increment each board's version and apply `counters` as adjust_counters does;
+        returns the new versions of the boards that exist"""
+        raise NotImplementedError
+
+    # Groups and statuses
+
+    async def list_groups(self, board_id: str) -> List[dict]:
+        raise NotImplementedError
+
+    async def find_groups(self, group_ids: List[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def insert_group(self, doc: dict):
+        raise NotImplementedError
+
+    async def update_group(self, group_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        """Returns the group as it was before the update"""
+        raise NotImplementedError
+
+    async def delete_group(self, group_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[Tuple[dict, List[str]]]:
+        """Returns the deleted group's id and board_id, and the ids of tasks the store ungrouped"""
+        raise NotImplementedError
+
+    async def list_statuses(self, board_id: str) -> List[dict]:
+        raise NotImplementedError
+
+    async def find_statuses(self, status_ids: List[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def insert_status(self, doc: dict):
+        raise NotImplementedError
+
+    async def update_status(self, status_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        """Returns the status as it was before the update"""
+        raise NotImplementedError
+
+    async def delete_status(self, status_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[Tuple[dict, List[str]]]:
+        """Returns the deleted status's id and board_id, and the ids of tasks the store cleared it from"""
+        raise NotImplementedError
+
+    # Tasks
+
+    async def list_tasks(self, filters: dict, search: Optional[List[str]] = None, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> List[dict]:
+        """Tasks sorted by (order, id)"""
+        raise NotImplementedError
+
+    async def stream_tasks(self, filters: dict, search: Optional[List[str]] = None, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> AsyncIterator[dict]:
+        """Like list_tasks, yielding tasks as pages arrive instead of collecting them"""
+        if fields is not None:
+            # Paging needs each task's (order, id)
+            fields = {*fields, 'order', 'id'}
+        async for task in stream_pages(lambda page_after, page_size: self.list_tasks(filters, search, page_after, page_size, fields), after, limit):
+            yield task
+
+    async def search_tasks(self, filters: dict, search: List[str], limit: int) -> List[dict]:
+        """The `limit` best tasks matching every term of `search`, each with its `score`: every
+        (indexed word, term) pair where the word starts with the term scores 1, or 2 when it
+        is the whole word. Ties keep (order, id) order."""
+        raise NotImplementedError
+
+    async def list_timeline(self, board_id: str, start: datetime, end: datetime, limit: int) -> List[dict]:
+        """Up to `limit` tasks whose [start_date, due_date] span overlaps [start, end), the
+        first by (due_date, id) with tasks without a due date first; a task with only one
+        of the dates is a point on that date"""
+        raise NotImplementedError
+
+    async def find_task(self, task_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def find_tasks(self, task_ids: List[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def list_group_tasks(self, board_id: str, group_ids: List[str]) -> List[dict]:
+        raise NotImplementedError
+
+    async def insert_task(self, doc: dict):
+        raise NotImplementedError
+
+    async def update_task(self, task_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        """Returns the task as it was before the update; search terms follow title/description edits"""
+        raise NotImplementedError
+
+    async def delete_task(self, task_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        """Returns the deleted task's id, board_id, group_id, status_id and priority"""
+        raise NotImplementedError
+
+    async def bulk_write_tasks(self, writes: List[tuple], ordered: bool) -> Dict[int, str]:
+        """Apply (op, doc, data) writes: ('create', new task, None), ('update', task after
+        the update, changed fields) and ('delete', task, None).
+
+        Returns error messages by position; an ordered batch stops at its first error.
+        """
+        raise NotImplementedError
+
+    async def order_after(self, board_id: str, group_id: Optional[str], exclude_id: str, key: tuple) -> Optional[float]:
+        """The order of the task following the (order, id) key in a group"""
+        raise NotImplementedError
+
+    async def order_before(self, board_id: str, group_id: Optional[str], exclude_id: str, key: Optional[tuple] = None) -> Optional[float]:
+        """The order of the task preceding the (order, id) key (or of the last task) in a group"""
+        raise NotImplementedError
+
+    async def renumber_tasks(self, board_id: str, group_id: Optional[str]) -> bool:
+        """Renumber a group's tasks 0, 1, 2, ... keeping their order; False when it has none"""
+        raise NotImplementedError
+
+    # Job leases
+
+    async def claim_lease(self, name: str, seconds: float) -> bool:
+        """Take the named lease for `seconds` unless another worker holds an unexpired one,
+        so periodic jobs run in one worker at a time"""
+        raise NotImplementedError
+
+    # Archive
+
+    async def archive_tasks(self, board_id: str, status_id: str, updated_before: datetime, limit: int) -> List[dict]:
+        """Move up to `limit` of a board's tasks in status_id, last updated before
+        updated_before, to the archive; returns the tasks moved"""
+        raise NotImplementedError
+
+    async def restore_task(self, task_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        """Move an archived task back, applying data; returns it, or None when it is not archived"""
+        raise NotImplementedError
+
+    async def list_archived_tasks(self, filters: dict, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> List[dict]:
+        """Archived tasks sorted by (order, id), with the filters of list_tasks (no search)"""
+        raise NotImplementedError
+
+    async def list_tasks_with_archive(self, filters: dict, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> List[dict]:
+        """Live and archived tasks merged into one (order, id) sequence"""
+        live, archived = await asyncio.gather(
+            self.list_tasks(filters, None, after, limit, fields),
+            self.list_archived_tasks(filters, after, limit, fields)
+        )
+        return list(itertools.islice(heapq.merge(live, archived, key=task_sort_key), limit))
+
+    async def stream_tasks_with_archive(self, filters: dict, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> AsyncIterator[dict]:
+        if fields is not None:
+            fields = {*fields, 'order', 'id'}
+        async for task in stream_pages(lambda page_after, page_size: self.list_tasks_with_archive(filters, page_after, page_size, fields), after, limit):
+            yield task
+
+    # Statistics
+
+    async def count_tasks(self, board_id: str, done_status_id: Optional[str]) -> dict:
+        """Task counts by_status, by_priority and by_group (keyed by raw value) and overdue"""
+        raise NotImplementedError
+
+    async def count_overdue(self, board_id: str, done_status_id: Optional[str]) -> int:
+        """Tasks due before now that are not in done_status_id"""
+        raise NotImplementedError
+
+    async def get_counters(self, board_id: str) -> Optional[dict]:
+        """Materialized counters of a large board, with counted_at; None when there are none"""
+        return None
+
+    async def put_counters(self, board_id: str, counters: dict):
+        pass
+
+    async def delete_counters(self, board_id: str):
+        pass
+
+    async def adjust_counters(self, incs: Dict[str, Dict[str, int]]):
+        """Apply {board_id: {"total"/"by_status.<key>"/...: n}} to boards that have counters"""
+
+    # Change log
+
+    async def log_changes(self, entries: List[dict]):
+        """Append (board_id, seq, entity, action, id, at) entries for delta sync"""
+        raise NotImplementedError
+
+    async def changes_since(self, board_id: str, seq: int, limit: int) -> List[dict]:
+        """Log entries of a board with a higher seq, in seq order; `at` is a datetime"""
+        raise NotImplementedError
+
+    # Bulk loading
+
+    async def insert_many(self, collection: str, docs: List[dict]):
+        """Insert generated documents into one collection/table"""
+        raise NotImplementedError
+
+
+def mongo_indexes(sync_retention_days: int) -> dict:
+    """Indexes applied at startup, named after the MySQL DDL in DATABASE_SCHEMA.md"""
+    return {
+        "users": [
+            IndexModel([("id", ASCENDING)], name="pk_id", unique=True),
+            IndexModel([("email", ASCENDING)], name="idx_email", unique=True),
+        ],
+        "revoked_tokens": [
+            IndexModel([("expires_at", ASCENDING)], name="ttl_expires_at", expireAfterSeconds=0),
+        ],
+        "workspaces": [
+            IndexModel([("id", ASCENDING)], name="pk_id", unique=True),
+            IndexModel([("owner_id", ASCENDING)], name="idx_owner"),
+        ],
+        "boards": [
+            IndexModel([("id", ASCENDING)], name="pk_id", unique=True),
+            IndexModel([("workspace_id", ASCENDING)], name="idx_workspace"),
+        ],
+        "groups": [
+            IndexModel([("id", ASCENDING)], name="pk_id", unique=True),
+            IndexModel([("board_id", ASCENDING), ("order", ASCENDING)], name="idx_board_order"),
+        ],
+        "statuses": [
+            IndexModel([("id", ASCENDING)], name="pk_id", unique=True),
+            IndexModel([("board_id", ASCENDING), ("order", ASCENDING)], name="idx_board_order"),
+        ],
+        "tasks": [
+            IndexModel([("id", ASCENDING)], name="pk_id", unique=True),
+            IndexModel([("board_id", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)], name="idx_board_order"),
+            IndexModel([("group_id", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)], name="idx_group_order"),
+            IndexModel([("status_id", ASCENDING)], name="idx_status"),
+            IndexModel([("board_id", ASCENDING), ("search_terms", ASCENDING)], name="idx_search"),
+            IndexModel([("board_id", ASCENDING), ("due_date", ASCENDING)], name="idx_board_due"),
+            IndexModel([("board_id", ASCENDING), ("start_date", ASCENDING)], name="idx_board_start"),
+        ],
+        "tasks_archive": [
+            IndexModel([("id", ASCENDING)], name="pk_id", unique=True),
+            IndexModel([("board_id", ASCENDING), ("order", ASCENDING), ("id", ASCENDING)], name="idx_board_order"),
+        ],
+        "board_stats": [
+            IndexModel([("board_id", ASCENDING)], name="pk_board_id", unique=True),
+        ],
+        "board_changes": [
+            IndexModel([("board_id", ASCENDING), ("seq", ASCENDING)], name="idx_board_seq"),
+            IndexModel([("at", ASCENDING)], name="ttl_at", expireAfterSeconds=sync_retention_days * 86400),
+        ],
+        "deletion_jobs": [
+            IndexModel([("id", ASCENDING)], name="pk_id", unique=True),
+            IndexModel([("locked_until", ASCENDING), ("created_at", ASCENDING)], name="idx_claim"),
+        ],
+    }
+
+
+def projection(fields: Optional[Collection[str]], default: dict) -> dict:
+    """The find() projection reading only `fields`, or `default` for whole documents"""
+    if fields is None:
+        return default
+    return {"_id": 0, **{field: 1 for field in fields}}
+
+
+def in_boards(doc_id: str, board_ids: Optional[Collection[str]]) -> dict:
+    """Match one document by id, only inside board_ids when a scope is given"""
+    if board_ids is None:
+        return {"id": doc_id}
+    return {"id": doc_id, "board_id": {"$in": list(board_ids)}}
+
+
+def keyset_filter(after: tuple) -> dict:
+    """Match tasks sorted after the (order, id) of the last task of a page"""
+    order, last_id = after
+    return {"$or": [
+        {"order": {"$gt": order}},
+        {"order": order, "id": {"$gt": last_id}}
+    ]}
+
+
+def keyset_before(before: tuple) -> dict:
+    """Match tasks sorted before an (order, id)"""
+    order, last_id = before
+    return {"$or": [
+        {"order": {"$lt": order}},
+        {"order": order, "id": {"$lt": last_id}}
+    ]}
+
+
+def search_filter(terms: List[str]) -> dict:
+    """Match tasks whose indexed terms start with every query term"""
+    if not terms:
+        return {"search_terms": {"$in": []}}
+    clauses = [{"search_terms": {"$regex": '^' + re.escape(term)}} for term in terms]
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def search_score(terms: List[str]) -> dict:
+    """Aggregation expression for Repository.search_tasks' score"""
+    return {"$add": [
+        {"$size": {"$filter": {"input": "$search_terms", "as": "word", "cond": {"$regexMatch": {"input": "$$word", "regex": '^' + re.escape(term)}}}}}
+        for term in terms
+    ] + [
+        {"$cond": [{"$in": [term, "$search_terms"]}, 1, 0]}
+        for term in terms
+    ]}
+
+
+def overdue_filter(done_status_id: Optional[str]) -> dict:
+    query = {"due_date": {"$lt": datetime.now(timezone.utc)}}
+    if done_status_id:
+        query["status_id"] = {"$ne": done_status_id}
+    return query
+
+
+def timeline_filter(board_id: str, start: datetime, end: datetime) -> dict:
+    """Tasks overlapping [start, end): each branch is a range on one of the
+    (board_id, due_date) and (board_id, start_date) indexes"""
+    return {"$or": [
+        {"board_id": board_id, "due_date": {"$gte": start, "$lt": end}},
+        {"board_id": board_id, "due_date": {"$gte": end}, "start_date": {"$lt": end}},
+        {"board_id": board_id, "due_date": None, "start_date": {"$gte": start, "$lt": end}},
+    ]}
+
+
+def task_query(filters: dict, search: Optional[List[str]] = None, after: Optional[tuple] = None) -> dict:
+    query = {}
+    for key, value in filters.items():
+        if key in TASK_RANGE_FILTERS:
+            field, op = TASK_RANGE_FILTERS[key]
+            if field in query and not isinstance(query[field], dict):
+                query[field] = {"$eq": query[field]}
+            query.setdefault(field, {})[op] = value
+        else:
+            query[key] = {"$in": value} if isinstance(value, list) else value
+    if search is not None:
+        query.update(search_filter(search))
+    if after:
+        query = {"$and": [query, keyset_filter(after)]} if query else keyset_filter(after)
+    return query
+
+
+class MongoRepository(Repository):
+    """Documents in MongoDB, one collection per table.
+
+    Deleting a workspace or board removes the parent document immediately and records a
+    job in deletion_jobs. A background worker claims jobs with a lease and deletes the
+    descendants in batches of cascade_batch_size. Every step is idempotent, so a job
+    whose worker crashed is simply picked up again once its lease expires.
+    """
+
+    def __init__(self, database, on_board_removed: Optional[Callable[[str], None]] = None, cascade_batch_size: int = 500, sync_retention_days: int = 30):
+        self.database = database
+        self.on_board_removed = on_board_removed
+        self.cascade_batch_size = cascade_batch_size
+        self.sync_retention_days = sync_retention_days
+        self.cascade_wakeup: Optional[asyncio.Event] = None
+        self.cascade_task: Optional[asyncio.Task] = None
+
+    async def migrate(self):
+        await self.ensure_indexes()
+        # Data migrations scan whole collections, so they run until one pass has finished
+        # and the schema document records it, like SQLite's user_version
+        if await self.schema_version() < SCHEMA_VERSION:
+            await self.migrate_datetimes()
+            await self.reindex_task_search()
+            await self.database.meta.update_one({"_id": "schema"}, {"$max": {"version": SCHEMA_VERSION}}, upsert=True)
+
+    async def schema_version(self) -> int:
+        doc = await self.database.meta.find_one({"_id": "schema"})
+        return doc['version'] if doc else 0
+
+    async def ensure_indexes(self):
+        """Create every index in mongo_indexes(); existing identical indexes are left untouched"""
+        for collection, indexes in mongo_indexes(self.sync_retention_days).items():
+            unique = [index for index in indexes if index.document.get('unique')]
+            others = [index for index in indexes if not index.document.get('unique')]
+            if unique:
+                # Ids and user emails rely on these for uniqueness (register inserts without
+                # looking first), so the service must not start without them
+                try:
+                    await self.database[collection].create_indexes(unique)
+                except OperationFailure as e:
+                    raise StorageError(f"Could not create unique indexes on {collection}: {e}") from e
+            if others:
+                try:
+                    await self.database[collection].create_indexes(others)
+                except OperationFailure as e:
+                    logger.error("Could not create indexes on %s: %s", collection, e)
+
+    async def migrate_datetimes(self, batch_size: int = 500):
+        """Convert timestamps stored as ISO strings to BSON dates"""
+        for collection, fields in DATETIME_FIELDS.items():
+            query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+            cursor = self.database[collection].find(query, {"_id": 0, "id": 1, **{field: 1 for field in fields}})
+            batch = []
+            async for doc in cursor:
+                dates = {field: parse_datetime(doc[field]) for field in fields if isinstance(doc.get(field), str)}
+                batch.append(UpdateOne({"id": doc['id']}, {"$set": dates}))
+                if len(batch) >= batch_size:
+                    await self.database[collection].bulk_write(batch, ordered=False)
+                    batch = []
+            if batch:
+                await self.database[collection].bulk_write(batch, ordered=False)
+
+    async def reindex_task_search(self, batch_size: int = 500):
+        """Backfill search terms for tasks written before search indexing existed"""
+        cursor = self.database.tasks.find({"search_terms": {"$exists": False}}, {"_id": 0, "id": 1, "title": 1, "description": 1})
+        batch = []
+        async for doc in cursor:
+            batch.append(UpdateOne({"id": doc['id']}, {"$set": {"search_terms": task_search_terms(doc)}}))
+            if len(batch) >= batch_size:
+                await self.database.tasks.bulk_write(batch, ordered=False)
+                batch = []
+        if batch:
+            await self.database.tasks.bulk_write(batch, ordered=False)
+
+    def start(self):
+        self.cascade_wakeup = asyncio.Event()
+        self.cascade_task = asyncio.create_task(self.cascade_worker())
+
+    def stop(self):
+        if self.cascade_task is not None:
+            self.cascade_task.cancel()
+            self.cascade_task = None
+
+    def close(self):
+        self.database.client.close()
+
+    # Users
+
+    async def find_user(self, user_id: str) -> Optional[dict]:
+        return await self.database.users.find_one({"id": user_id}, {"_id": 0})
+
+    async def find_user_by_email(self, email: str) -> Optional[dict]:
+        return await self.database.users.find_one({"email": email}, {"_id": 0})
+
+    async def insert_user(self, doc: dict):
+        try:
+            await self.database.users.insert_one(dict(doc))
+        except DuplicateKeyError as e:
+            raise DuplicateKey(str(e))
+
+    async def set_password_hash(self, user_id: str, password_hash: str):
+        await self.database.users.update_one({"id": user_id}, {"$set": {"password_hash": password_hash}})
+
+    async def revoke_token(self, digest: str, expires_at: datetime):
+        # The TTL index drops the record once the token has expired
+        await self.database.revoked_tokens.update_one({"_id": digest}, {"$set": {"expires_at": expires_at}}, upsert=True)
+
+    async def is_token_revoked(self, digest: str) -> bool:
+        # TTL deletion runs about once a minute, so check the expiry too
+        doc = await self.database.revoked_tokens.find_one({"_id": digest, "expires_at": {"$gt": datetime.now(timezone.utc)}}, {"_id": 1})
+        return doc is not None
+
+    # Workspaces
+
+    async def list_workspaces(self, owner_id: str, fields: Optional[Collection[str]] = None) -> List[dict]:
+        return await self.database.workspaces.find({"owner_id": owner_id}, projection(fields, {"_id": 0})).to_list(1000)
+
+    async def find_workspace(self, workspace_id: str, owner_id: str) -> Optional[dict]:
+        return await self.database.workspaces.find_one({"id": workspace_id, "owner_id": owner_id}, {"_id": 0})
+
+    async def insert_workspace(self, doc: dict):
+        await self.database.workspaces.insert_one(dict(doc))
+
+    async def update_workspace(self, workspace_id: str, owner_id: str, data: dict) -> Optional[dict]:
+        return await self.database.workspaces.find_one_and_update(
+            {"id": workspace_id, "owner_id": owner_id},
+            {"$set": data},
+            {"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def delete_workspace(self, workspace_id: str, owner_id: str) -> bool:
+        result = await self.database.workspaces.delete_one({"id": workspace_id, "owner_id": owner_id})
+        if result.deleted_count == 0:
+            return False
+        # Boards, groups, tasks and statuses are removed in the background
+        await self.enqueue_deletion('workspace', workspace_id)
+        return True
+
+    # Boards
+
+    async def access_index(self, owner_id: str) -> Dict[str, List[str]]:
+        workspaces = await self.database.workspaces.find({"owner_id": owner_id}, {"_id": 0, "id": 1}).to_list(None)
+        index = {w['id']: [] for w in workspaces}
+        if index:
+            boards = self.database.boards.find({"workspace_id": {"$in": list(index)}}, {"_id": 0, "id": 1, "workspace_id": 1})
+            async for board in boards:
+                index[board['workspace_id']].append(board['id'])
+        return index
+
+    async def list_boards(self, workspace_id: Union[str, List[str]], fields: Optional[Collection[str]] = None) -> List[dict]:
+        query = {"workspace_id": {"$in": workspace_id} if isinstance(workspace_id, list) else workspace_id}
+        return await self.database.boards.find(query, projection(fields, BOARD_PROJECTION)).to_list(1000)
+
+    async def list_board_ids(self, after_id: str, limit: int) -> List[str]:
+        boards = self.database.boards.find({"id": {"$gt": after_id}}, {"_id": 0, "id": 1}).sort("id", 1).limit(limit)
+        return [board['id'] async for board in boards]
+
+    async def find_board(self, board_id: str) -> Optional[dict]:
+        return await self.database.boards.find_one({"id": board_id}, BOARD_PROJECTION)
+
+    async def board_version(self, board_id: str) -> Optional[int]:
+        board = await self.database.boards.find_one({"id": board_id}, {"_id": 0, "version": 1})
+        return None if board is None else board.get('version', 0)
+
+    async def insert_board(self, doc: dict, statuses: List[dict]):
+        await self.database.boards.insert_one(dict(doc))
+        if statuses:
+            await self.database.statuses.insert_many([dict(s) for s in statuses])
+
+    async def update_board(self, board_id: str, data: dict) -> Optional[Tuple[dict, int]]:
+        board = await self.database.boards.find_one_and_update(
+            {"id": board_id},
+            {"$set": data, "$inc": {"version": 1}},
+            {"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if board is None:
+            return None
+        version = board.pop('version')
+        return board, version
+
+    async def delete_board(self, board_id: str) -> bool:
+        result = await self.database.boards.delete_one({"id": board_id})
+        if result.deleted_count == 0:
+            return False
+        # Groups, tasks and statuses are removed in the background
+        await self.enqueue_deletion('board', board_id)
+        return True
+
+    async def bump_board_versions(self, board_ids: List[str], counters: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, int]:
+        # Counter increments go out in the same batch as the version bumps, not after them
+        docs, _ = await asyncio.gather(
+            asyncio.gather(*[
+                self.database.boards.find_one_and_update(
+                    {"id": board_id},
+                    {"$inc": {"version": 1}},
+                    {"_id": 0, "id": 1, "version": 1},
+                    return_document=ReturnDocument.AFTER
+                )
+                for board_id in board_ids
+            ]),
+            self.adjust_counters(counters or {})
+        )
+        return {doc['id']: doc['version'] for doc in docs if doc}
+
+    # Groups and statuses
+
+    async def list_groups(self, board_id: str) -> List[dict]:
+        return await self.database.groups.find({"board_id": board_id}, {"_id": 0}).sort("order", 1).to_list(1000)
+
+    async def find_groups(self, group_ids: List[str]) -> List[dict]:
+        return await self.database.groups.find({"id": {"$in": group_ids}}, {"_id": 0}).to_list(None)
+
+    async def insert_group(self, doc: dict):
+        await self.database.groups.insert_one(dict(doc))
+
+    async def update_group(self, group_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        return await self.database.groups.find_one_and_update(in_boards(group_id, board_ids), {"$set": data}, {"_id": 0}, return_document=ReturnDocument.BEFORE)
+
+    async def delete_group(self, group_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[Tuple[dict, List[str]]]:
+        doc = await self.database.groups.find_one_and_delete(in_boards(group_id, board_ids), {"_id": 0, "id": 1, "board_id": 1})
+        return (doc, await self.detach_tasks('group_id', group_id)) if doc else None
+
+    async def list_statuses(self, board_id: str) -> List[dict]:
+        return await self.database.statuses.find({"board_id": board_id}, {"_id": 0}).sort("order", 1).to_list(1000)
+
+    async def find_statuses(self, status_ids: List[str]) -> List[dict]:
+        return await self.database.statuses.find({"id": {"$in": status_ids}}, {"_id": 0}).to_list(None)
+
+    async def insert_status(self, doc: dict):
+        await self.database.statuses.insert_one(dict(doc))
+
+    async def update_status(self, status_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        return await self.database.statuses.find_one_and_update(in_boards(status_id, board_ids), {"$set": data}, {"_id": 0}, return_document=ReturnDocument.BEFORE)
+
+    async def delete_status(self, status_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[Tuple[dict, List[str]]]:
+        doc = await self.database.statuses.find_one_and_delete(in_boards(status_id, board_ids), {"_id": 0, "id": 1, "board_id": 1})
+        return (doc, await self.detach_tasks('status_id', status_id)) if doc else None
+
+    async def detach_tasks(self, field: str, value: str) -> List[str]:
+        """Clear a deleted group or status from the tasks that reference it, like the SQL
+        schema's ON DELETE SET NULL; returns their ids. Archived tasks are fixed on restore."""
+        tasks = await self.database.tasks.find({field: value}, {"_id": 0, "id": 1}).to_list(None)
+        if tasks:
+            await self.database.tasks.update_many({field: value}, {"$set": {field: None}})
+        return [task['id'] for task in tasks]
+
+    # Tasks
+
+    def task_cursor(self, filters: dict, search: Optional[List[str]] = None, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None):
+        cursor = self.database.tasks.find(task_query(filters, search, after), projection(fields, TASK_PROJECTION)).sort([("order", 1), ("id", 1)])
+        return cursor.limit(limit) if limit else cursor
+
+    async def list_tasks(self, filters: dict, search: Optional[List[str]] = None, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> List[dict]:
+        return await self.task_cursor(filters, search, after, limit, fields).to_list(limit)
+
+    async def stream_tasks(self, filters: dict, search: Optional[List[str]] = None, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> AsyncIterator[dict]:
+        async for doc in self.task_cursor(filters, search, after, limit, fields):
+            yield doc
+
+    async def search_tasks(self, filters: dict, search: List[str], limit: int) -> List[dict]:
+        if not search:
+            return []
+        return await self.database.tasks.aggregate([
+            {"$match": task_query(filters, search)},
+            {"$addFields": {"score": search_score(search)}},
+            {"$sort": {"score": -1, "order": 1, "id": 1}},
+            {"$limit": limit},
+            {"$project": TASK_PROJECTION}
+        ]).to_list(limit)
+
+    async def list_timeline(self, board_id: str, start: datetime, end: datetime, limit: int) -> List[dict]:
+        cursor = self.database.tasks.find(timeline_filter(board_id, start, end), TASK_PROJECTION).sort([("due_date", 1), ("id", 1)])
+        return await cursor.limit(limit).to_list(limit)
+
+    async def find_task(self, task_id: str) -> Optional[dict]:
+        return await self.database.tasks.find_one({"id": task_id}, TASK_PROJECTION)
+
+    async def find_tasks(self, task_ids: List[str]) -> List[dict]:
+        return await self.database.tasks.find({"id": {"$in": task_ids}}, TASK_PROJECTION).to_list(len(task_ids))
+
+    async def list_group_tasks(self, board_id: str, group_ids: List[str]) -> List[dict]:
+        return await self.database.tasks.find({"board_id": board_id, "group_id": {"$in": group_ids}}, TASK_PROJECTION).to_list(None)
+
+    async def missing_references(self, docs: List[dict]) -> Set[Tuple[str, str]]:
+        """The (field, id) group and status references in docs that match no document, which
+        the SQL schema rejects through its foreign keys"""
+        missing = set()
+        for field, collection in (('group_id', self.database.groups), ('status_id', self.database.statuses)):
+            ids = {doc[field] for doc in docs if doc.get(field)}
+            if ids:
+                found = await collection.find({"id": {"$in": list(ids)}}, {"_id": 0, "id": 1}).to_list(None)
+                missing.update((field, i) for i in ids - {d['id'] for d in found})
+        return missing
+
+    async def insert_task(self, doc: dict):
+        if await self.missing_references([doc]):
+            raise ConstraintViolation(MISSING_REFERENCE)
+        await self.database.tasks.insert_one({**doc, "search_terms": task_search_terms(doc)})
+
+    async def update_task(self, task_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        if await self.missing_references([data]):
+            raise ConstraintViolation(MISSING_REFERENCE)
+        previous = await self.database.tasks.find_one_and_update(in_boards(task_id, board_ids), {"$set": data}, {"_id": 0})
+        if previous is None:
+            return None
+        # Keep the search index in step with text edits
+        if 'title' in data or 'description' in data:
+            search_terms = task_search_terms({**previous, **data})
+            if search_terms != previous.get('search_terms'):
+                await self.database.tasks.update_one({"id": task_id}, {"$set": {"search_terms": search_terms}})
+        previous.pop('search_terms', None)
+        return previous
+
+    async def delete_task(self, task_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        return await self.database.tasks.find_one_and_delete(
+            in_boards(task_id, board_ids), {"_id": 0, "id": 1, "board_id": 1, "group_id": 1, "status_id": 1, "priority": 1}
+        )
+
+    async def bulk_write_tasks(self, writes: List[tuple], ordered: bool) -> Dict[int, str]:
+        # Creates reference groups and statuses through doc, updates through their changed fields
+        referencing = {position: doc if op == 'create' else data for position, (op, doc, data) in enumerate(writes) if op != 'delete'}
+        missing = await self.missing_references(list(referencing.values()))
+        errors = {}
+        requests = []
+        positions = []
+        for position, (op, doc, data) in enumerate(writes):
+            if position in referencing and any((field, referencing[position].get(field)) in missing for field in ('group_id', 'status_id')):
+                errors[position] = MISSING_REFERENCE
+                if ordered:
+                    break
+                continue
+            positions.append(position)
+            if op == 'create':
+                requests.append(InsertOne({**doc, "search_terms": task_search_terms(doc)}))
+            elif op == 'update':
+                if 'title' in data or 'description' in data:
+                    data = {**data, "search_terms": task_search_terms(doc)}
+                requests.append(UpdateOne({"id": doc['id']}, {"$set": data}))
+            else:
+                requests.append(DeleteOne({"id": doc['id']}))
+        if not requests:
+            return errors
+        try:
+            await self.database.tasks.bulk_write(requests, ordered=ordered)
+        except BulkWriteError as e:
+            failed = {positions[error['index']]: error.get('errmsg', 'Write failed') for error in e.details.get('writeErrors', [])}
+            # An ordered batch stops at its first failure, before any missing reference after it
+            errors = failed if ordered else {**errors, **failed}
+        return errors
+
+    async def order_after(self, board_id: str, group_id: Optional[str], exclude_id: str, key: tuple) -> Optional[float]:
+        doc = await self.database.tasks.find_one(
+            {"board_id": board_id, "group_id": group_id, "id": {"$ne": exclude_id}, **keyset_filter(key)},
+            {"_id": 0, "order": 1}, sort=[("order", 1), ("id", 1)]
+        )
+        return doc['order'] if doc else None
+
+    async def order_before(self, board_id: str, group_id: Optional[str], exclude_id: str, key: Optional[tuple] = None) -> Optional[float]:
+        query = {"board_id": board_id, "group_id": group_id, "id": {"$ne": exclude_id}}
+        if key is not None:
+            query.update(keyset_before(key))
+        doc = await self.database.tasks.find_one(query, {"_id": 0, "order": 1}, sort=[("order", -1), ("id", -1)])
+        return doc['order'] if doc else None
+
+    async def renumber_tasks(self, board_id: str, group_id: Optional[str]) -> bool:
+        tasks = await self.database.tasks.find(
+            {"board_id": board_id, "group_id": group_id}, {"_id": 0, "id": 1}
+        ).sort([("order", 1), ("id", 1)]).to_list(None)
+        if tasks:
+            await self.database.tasks.bulk_write([UpdateOne({"id": t['id']}, {"$set": {"order": float(i)}}) for i, t in enumerate(tasks)])
+        return bool(tasks)
+
+    # Job leases
+
+    async def claim_lease(self, name: str, seconds: float) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            # An unexpired lease does not match, so the upsert collides with its _id
+            await self.database.job_leases.update_one(
+                {"_id": name, "locked_until": {"$lte": now}},
+                {"$set": {"locked_until": now + timedelta(seconds=seconds)}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    # Archive
+
+    async def archive_tasks(self, board_id: str, status_id: str, updated_before: datetime, limit: int) -> List[dict]:
+        query = {"board_id": board_id, "status_id": status_id, "updated_at": {"$lt": updated_before}}
+        docs = await self.database.tasks.find(query, {"_id": 0}).to_list(limit)
+        if not docs:
+            return []
+        # Copy first and delete second, so a crash leaves a task in both places rather than
+        # neither; the next pass overwrites the copy and finishes the move
+        archived_at = datetime.now(timezone.utc)
+        await self.database.tasks_archive.bulk_write(
+            [ReplaceOne({"id": doc['id']}, {**doc, "archived_at": archived_at}, upsert=True) for doc in docs], ordered=False
+        )
+        ids = [doc['id'] for doc in docs]
+        await self.database.tasks.delete_many({**query, "id": {"$in": ids}})
+        # A task edited after it was read no longer matches and stays live; drop its copy
+        kept = {doc['id'] for doc in await self.database.tasks.find({"id": {"$in": ids}}, {"_id": 0, "id": 1}).to_list(None)}
+        if kept:
+            await self.database.tasks_archive.delete_many({"id": {"$in": list(kept)}})
+        return [{k: v for k, v in doc.items() if k != 'search_terms'} for doc in docs if doc['id'] not in kept]
+
+    async def restore_task(self, task_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        doc = await self.database.tasks_archive.find_one(in_boards(task_id, board_ids), {"_id": 0, "archived_at": 0})
+        if doc is None:
+            return None
+        doc.update(data)
+        # A group or status deleted while the task was archived did not reach the archive
+        for field, collection in (('group_id', self.database.groups), ('status_id', self.database.statuses)):
+            if doc.get(field) and not await collection.find_one({"id": doc[field]}, {"_id": 1}):
+                doc[field] = None
+        await self.database.tasks.replace_one({"id": task_id}, doc, upsert=True)
+        await self.database.tasks_archive.delete_one({"id": task_id})
+        doc.pop('search_terms', None)
+        return doc
+
+    async def list_archived_tasks(self, filters: dict, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> List[dict]:
+        cursor = self.database.tasks_archive.find(task_query(filters, None, after), projection(fields, TASK_PROJECTION)).sort([("order", 1), ("id", 1)])
+        return await (cursor.limit(limit) if limit else cursor).to_list(limit)
+
+    # Statistics
+
+    async def count_tasks(self, board_id: str, done_status_id: Optional[str]) -> dict:
+        """Counts per status, priority and group plus overdue tasks in one aggregation"""
+        facets = {field: [{"$group": {"_id": f"${field}", "count": {"$sum": 1}}}] for field in ('status_id', 'priority', 'group_id')}
+        facets["overdue"] = [{"$match": overdue_filter(done_status_id)}, {"$count": "count"}]
+        result = (await self.database.tasks.aggregate([{"$match": {"board_id": board_id}}, {"$facet": facets}]).to_list(1))[0]
+        return {
+            "by_status": {row['_id']: row['count'] for row in result['status_id']},
+            "by_priority": {row['_id']: row['count'] for row in result['priority']},
+            "by_group": {row['_id']: row['count'] for row in result['group_id']},
+            "overdue": result['overdue'][0]['count'] if result['overdue'] else 0,
+        }
+
+    async def count_overdue(self, board_id: str, done_status_id: Optional[str]) -> int:
+        return await self.database.tasks.count_documents({"board_id": board_id, **overdue_filter(done_status_id)})
+
+    async def get_counters(self, board_id: str) -> Optional[dict]:
+        return await self.database.board_stats.find_one({"board_id": board_id}, {"_id": 0})
+
+    async def put_counters(self, board_id: str, counters: dict):
+        await self.database.board_stats.replace_one(
+            {"board_id": board_id},
+            {"board_id": board_id, **counters, "counted_at": datetime.now(timezone.utc)},
+            upsert=True
+        )
+
+    async def delete_counters(self, board_id: str):
+        await self.database.board_stats.delete_one({"board_id": board_id})
+
+    async def adjust_counters(self, incs: Dict[str, Dict[str, int]]):
+        # Boards below the threshold have no board_stats document and the update matches nothing
+        await asyncio.gather(*[
+            self.database.board_stats.update_one({"board_id": board_id}, {"$inc": inc})
+            for board_id, inc in incs.items() if inc
+        ])
+
+    # Change log
+
+    async def log_changes(self, entries: List[dict]):
+        await self.database.board_changes.insert_many([dict(e) for e in entries], ordered=False)
+
+    async def changes_since(self, board_id: str, seq: int, limit: int) -> List[dict]:
+        return await self.database.board_changes.find(
+            {"board_id": board_id, "seq": {"$gt": seq}}, {"_id": 0}
+        ).sort("seq", 1).to_list(limit)
+
+    # Bulk loading
+
+    async def insert_many(self, collection: str, docs: List[dict]):
+        if collection == 'tasks':
+            docs = [d if 'search_terms' in d else {**d, "search_terms": task_search_terms(d)} for d in docs]
+        try:
+            await self.database[collection].insert_many([dict(d) for d in docs], ordered=False)
+        except BulkWriteError as e:
+            errors = e.details.get('writeErrors', [])
+            if errors and all(error.get('code') == 11000 for error in errors):
+                raise DuplicateKey(errors[0].get('errmsg', 'Duplicate key'))
+            raise
+
+    # Cascade deletion
+
+    async def enqueue_deletion(self, kind: str, *target_ids: str):
+        """Record cascade jobs for deleted workspaces or boards; re-enqueueing is a no-op"""
+        if target_ids:
+            now = datetime.now(timezone.utc)
+            await self.database.deletion_jobs.bulk_write([
+                UpdateOne({"id": f"{kind}:{target_id}"}, {"$setOnInsert": {
+                    "id": f"{kind}:{target_id}",
+                    "kind": kind,
+                    "target_id": target_id,
+                    "locked_until": datetime.fromtimestamp(0, timezone.utc),
+                    "created_at": now
+                }}, upsert=True)
+                for target_id in target_ids
+            ], ordered=False)
+        if self.cascade_wakeup is not None:
+            self.cascade_wakeup.set()
+
+    async def claim_deletion_job(self) -> Optional[dict]:
+        now = datetime.now(timezone.utc)
+        return await self.database.deletion_jobs.find_one_and_update(
+            {"locked_until": {"$lte": now}},
+            {"$set": {"locked_until": now + timedelta(seconds=CASCADE_LEASE_SECONDS)}},
+            projection={"_id": 0},
+            sort=[("created_at", ASCENDING)]
+        )
+
+    async def delete_in_batches(self, collection, query: dict, on_batch=None):
+        while True:
+            docs = await collection.find(query, {"_id": 0, "id": 1}).to_list(self.cascade_batch_size)
+            if not docs:
+                return
+            ids = [d['id'] for d in docs]
+            if on_batch is not None:
+                await on_batch(ids)
+            await collection.delete_many({"id": {"$in": ids}})
+
+    def board_removed(self, board_id: str):
+        if self.on_board_removed is not None:
+            self.on_board_removed(board_id)
+
+    async def run_deletion_job(self, job: dict):
+        database = self.database
+
+        async def renew_lease(_ids=None):
+            until = datetime.now(timezone.utc) + timedelta(seconds=CASCADE_LEASE_SECONDS)
+            await database.deletion_jobs.update_one({"id": job['id']}, {"$set": {"locked_until": until}})
+
+        if job['kind'] == 'workspace':
+            # Hand each board to its own job before removing it, so nothing under it is lost
+            async def enqueue_boards(board_ids):
+                await self.enqueue_deletion('board', *board_ids)
+                for board_id in board_ids:
+                    self.board_removed(board_id)
+                await renew_lease()
+            await self.delete_in_batches(database.boards, {"workspace_id": job['target_id']}, enqueue_boards)
+        else:
+            self.board_removed(job['target_id'])
+            for collection in (database.tasks, database.tasks_archive, database.groups, database.statuses):
+                await self.delete_in_batches(collection, {"board_id": job['target_id']}, renew_lease)
+            await database.board_stats.delete_one({"board_id": job['target_id']})
+
+        await database.deletion_jobs.delete_one({"id": job['id']})
+
+    async def drain_deletion_jobs(self) -> int:
+        """Run claimable jobs until none are left; returns how many completed"""
+        completed = 0
+        while True:
+            job = await self.claim_deletion_job()
+            if job is None:
+                return completed
+            await self.run_deletion_job(job)
+            completed += 1
+
+    async def cascade_worker(self):
+        while True:
+            try:
+                await self.drain_deletion_jobs()
+            except Exception:
+                logger.exception("Cascade deletion failed; the job will be retried when its lease expires")
+            self.cascade_wakeup.clear()
+            try:
+                await asyncio.wait_for(self.cascade_wakeup.wait(), timeout=CASCADE_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
@@ -1,34 +1,165 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, Query, BackgroundTasks, WebSocket, status
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import asyncio
+import json
+import base64
+import hashlib
+import time
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter, ValidationError, create_model
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union, get_args, get_origin
 import uuid
+import random
+import itertools
+import functools
 from datetime import datetime, timezone, timedelta
 import bcrypt
 import jwt
 
+try:
+    import orjson
+except ImportError:  # optional; FAST_RESPONSES falls back to the json module
+    orjson = None
+
+import metrics
+from admission import AdmissionMiddleware, RouteClass, TokenBuckets
+from repository import Repository, MongoRepository, StorageError, DuplicateKey, as_utc, task_search_terms, task_sort_key, tokenize
+from sql_repository import SqlRepository
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# Storage backend: 'mongo' (MongoDB through Motor) or 'sqlite' (the MySQL schema on SQLite)
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'mongo')
+SQLITE_PATH = os.environ.get('SQLITE_PATH', str(ROOT_DIR / 'taskflow.db'))
+
 # MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+if STORAGE_BACKEND == 'mongo':
+    mongo_url = os.environ['MONGO_URL']
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[metrics.CommandTimer(), metrics.PoolTimer()])
+    db = client[os.environ['DB_NAME']]
+else:
+    client = db = None
 
 # JWT Configuration
 JWT_SECRET = os.environ.get('JWT_SECRET', 'taskflow-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24 * 7  # 7 days
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+TOKEN_RECHECK_SECONDS = 60  # how long a worker trusts a cached token before asking the store about logouts
+
+# Board metadata cache (board, groups and statuses per board)
+BOARD_CACHE_SIZE = int(os.environ.get('BOARD_CACHE_SIZE', '5000'))
+BOARD_CACHE_KINDS = ('board', 'groups', 'statuses')
+
+# Read coalescing: concurrent identical board reads share one in-flight store query
+READ_COALESCING = os.environ.get('READ_COALESCING', '1') == '1'
+
+# Access cache: the workspace and board ids each user owns, which every board-level route is scoped to
+ACCESS_CACHE_SIZE = int(os.environ.get('ACCESS_CACHE_SIZE', '10000'))
+
+# Password hashing: bcrypt runs in a bounded thread pool, off the event loop
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+HASH_POOL_SIZE = int(os.environ.get('HASH_POOL_SIZE', str(min(4, os.cpu_count() or 1))))
+HASH_QUEUE_LIMIT = int(os.environ.get('HASH_QUEUE_LIMIT', '32'))
+HASH_RETRY_AFTER_SECONDS = 1
+
+# Admission control: every route belongs to a cost class with its own concurrency limit
+# and bounded queue; requests beyond the queue, or queued longer than the timeout, get a
+# 503. Each user (or client address, before login) also has a token bucket that every
+# request draws its class's cost from; an empty bucket means 429.
+ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', '1') == '1'
+ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', '2'))
+RATE_LIMIT_PER_SECOND = float(os.environ.get('RATE_LIMIT_PER_SECOND', '50'))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', '200'))
+RATE_LIMIT_CLIENTS = 100000  # buckets kept per worker
+# Behind a reverse proxy every connection comes from the proxy, so anonymous clients are told
+# apart by the address it records in this header (e.g. X-Forwarded-For or X-Real-IP). Leave
+# it unset only when clients connect directly: the header is client-controlled otherwise.
+TRUSTED_PROXY_HEADER = os.environ.get('TRUSTED_PROXY_HEADER', '').strip().lower().encode('latin-1')
+ROUTE_CLASSES = {
+    "read": RouteClass("read", limit=int(os.environ.get('READ_CONCURRENCY', '64')), queue=256, cost=1),
+    "write": RouteClass("write", limit=int(os.environ.get('WRITE_CONCURRENCY', '32')), queue=128, cost=1),
+    "search": RouteClass("search", limit=8, queue=32, cost=4),
+    "auth": RouteClass("auth", limit=HASH_POOL_SIZE, queue=HASH_QUEUE_LIMIT, cost=10),
+    "bulk": RouteClass("bulk", limit=2, queue=8, cost=20),
+}
+ROUTE_COST_CLASSES = {
+    "/api/auth/register": "auth",
+    "/api/auth/login": "auth",
+    "/api/search/tasks": "search",
+    "/api/tasks/bulk": "bulk",
+    "/api/seed-demo-data": "bulk",
+    "/api/generate-data": "bulk",
+    "/api/boards/{board_id}/events": None,  # long-lived streams would hold a slot for their lifetime
+    "/metrics": None,
+}
+
+# Bulk write limits
+MAX_BULK_OPERATIONS = int(os.environ.get('MAX_BULK_OPERATIONS', '1000'))
+
+# Fast responses: encode list payloads directly instead of validating them against response_model
+FAST_RESPONSES = os.environ.get('FAST_RESPONSES', '').lower() in ('1', 'true', 'yes')
+
+# Task list pagination
+MAX_PAGE_SIZE = 1000
+NDJSON_MEDIA_TYPE = 'application/x-ndjson'
+
+# Board timeline: tasks overlapping a date window, for timeline/calendar views
+TIMELINE_MAX_DAYS = 366
+TIMELINE_MAX_TASKS = 5000
+
+# Task search
+SEARCH_MAX_TERMS = 8
+
+# Task ordering: a move writes the midpoint of its neighbours' order; a list is renumbered
+# in the background once two neighbours are closer than this
+RANK_REBALANCE_GAP = 1e-6
+
+# Cascade deletion (MongoDB): descendants of deleted workspaces/boards are removed by a background worker
+CASCADE_BATCH_SIZE = int(os.environ.get('CASCADE_BATCH_SIZE', '500'))
+
+# Real-time board events
+EVENT_QUEUE_SIZE = 256  # per subscriber; a subscriber that falls further behind is told to resync
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Delta sync: every board write is logged in board_changes under the board version it produced
+SYNC_RETENTION_DAYS = int(os.environ.get('SYNC_RETENTION_DAYS', '30'))
+SYNC_MAX_CHANGES = 5000  # a client further behind than this is told to reload the board
+SYNC_GAP_GRACE_SECONDS = 5  # how long a missing version may still be an in-flight write
+
+# Board statistics: boards with at least STATS_COUNTER_THRESHOLD tasks are served from
+# counters in board_stats that task writes adjust; a recount every STATS_RECOUNT_SECONDS
+# corrects any drift from writes that raced the previous count
+STATS_COUNTER_THRESHOLD = int(os.environ.get('STATS_COUNTER_THRESHOLD', '2000'))
+STATS_RECOUNT_SECONDS = 3600
+STATS_FIELDS = {"status_id": "by_status", "priority": "by_priority", "group_id": "by_group"}
+
+# Cold archive (opt-in): tasks in a board's final status, unchanged for ARCHIVE_AFTER_DAYS, are
+# moved to tasks_archive by a background job every ARCHIVE_INTERVAL_SECONDS; every worker runs
+# the job, but a lease in the store lets only one of them make each pass (0 days disables it)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '0'))
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_INTERVAL_SECONDS = 3600
+
+# Synthetic data generator (load testing); the HTTP endpoint is off unless enabled
+DATA_GENERATOR_ENABLED = os.environ.get('DATA_GENERATOR_ENABLED', '0') == '1'
+GENERATOR_MAX_DOCUMENTS = int(os.environ.get('GENERATOR_MAX_DOCUMENTS', '100000'))  # per request; the CLI has no cap
+GENERATOR_BATCH_SIZE = 5000
+GENERATOR_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)  # fixed, so a seed always yields the same dates
+GENERATED_PASSWORD = 'loadtest'
 
 # Create the main app
 app = FastAPI()
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", default_response_class=metrics.TimedJSONResponse)
 security = HTTPBearer()
 
 # ============================================================================
@@ -134,9 +265,10 @@ class Task(BaseModel):
     priority: str = 'medium'  # low, medium, high, critical
     start_date: Optional[datetime] = None
     due_date: Optional[datetime] = None
-    order: int = 0
+    order: float = 0  # fractional, so a task can be moved between two others with one write
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    archived_at: Optional[datetime] = None  # set on tasks read from the archive
 
 class TaskCreate(BaseModel):
     board_id: str
@@ -147,7 +279,7 @@ class TaskCreate(BaseModel):
     priority: Optional[str] = 'medium'
     start_date: Optional[datetime] = None
     due_date: Optional[datetime] = None
-    order: Optional[int] = 0
+    order: Optional[float] = 0
 
 class TaskUpdate(BaseModel):
     title: Optional[str] = None
@@ -157,18 +289,412 @@ class TaskUpdate(BaseModel):
     start_date: Optional[datetime] = None
     due_date: Optional[datetime] = None
     group_id: Optional[str] = None
-    order: Optional[int] = None
+    order: Optional[float] = None
+
+class TaskMove(BaseModel):
+    # Neighbours in the target list: the moved task lands after after_id and before before_id.
+    # With neither, it goes to the end of group_id (or of its current group).
+    after_id: Optional[str] = None
+    before_id: Optional[str] = None
+    group_id: Optional[str] = None
+    status_id: Optional[str] = None
+
+class SyncResponse(BaseModel):
+    board_id: str
+    sync_token: str
+    reset: bool = False  # the token was missing or too old: reload the board, then sync from sync_token
+    board: Optional[Board] = None
+    tasks: List[Task] = []
+    groups: List[Group] = []
+    statuses: List[Status] = []
+    deleted: Dict[str, List[str]] = {}  # tombstones: "tasks"/"groups"/"statuses" -> ids
+
+class BoardStats(BaseModel):
+    board_id: str
+    total: int = 0
+    by_status: Dict[str, int] = {}  # "none" counts tasks without a status (or group)
+    by_priority: Dict[str, int] = {}
+    by_group: Dict[str, int] = {}
+    overdue: int = 0  # due before now and not in the board's last status
+    source: Literal['aggregate', 'counters'] = 'aggregate'
+
+class DatasetSpec(BaseModel):
+    users: int = Field(0, ge=0)  # 0 = generate everything for the calling user
+    workspaces_per_user: int = Field(2, ge=1)
+    boards_per_workspace: int = Field(3, ge=1)
+    groups_per_board: int = Field(4, ge=0)
+    statuses_per_board: int = Field(4, ge=1)
+    tasks_per_board: int = Field(100, ge=0)  # average; board sizes follow a long-tailed distribution
+    seed: int = 0
+
+class DatasetSummary(BaseModel):
+    seed: int
+    users: int = 0
+    workspaces: int = 0
+    boards: int = 0
+    groups: int = 0
+    statuses: int = 0
+    tasks: int = 0
+
+class GroupWithTasks(Group):
+    tasks: List[Task] = []
+
+class BoardSnapshot(BaseModel):
+    board: Board
+    groups: List[GroupWithTasks]
+    statuses: List[Status]
+    ungrouped_tasks: List[Task]
+    next_cursor: Optional[str] = None  # set when the board has more than one page of tasks
+
+class TaskSearchHit(Task):
+    score: float
+
+class BulkTaskOperation(BaseModel):
+    op: Literal['create', 'update', 'delete']
+    id: Optional[str] = None  # required for update/delete
+    data: Optional[Dict[str, Any]] = None  # TaskCreate for create, TaskUpdate for update
+
+class BulkTaskRequest(BaseModel):
+    operations: List[BulkTaskOperation]
+    ordered: bool = True
+
+class BulkTaskResult(BaseModel):
+    index: int
+    op: str
+    id: Optional[str] = None
+    ok: bool
+    error: Optional[str] = None
+    task: Optional[Task] = None
+
+class BulkTaskResponse(BaseModel):
+    ordered: bool
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    failed: int = 0
+    results: List[BulkTaskResult]
+
+# ============================================================================
+# CACHES
+# ============================================================================
+
+class TokenCache:
+    """LRU cache of verified JWTs keyed by SHA-256 digest.
+
+    An entry lasts until its token expires or for TOKEN_RECHECK_SECONDS, whichever is sooner.
+    Logouts are recorded in the store, so a token revoked through another worker is refused
+    here once its entry lapses and the store is asked again.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # digest -> (user_id, valid until timestamp)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: str) -> Optional[str]:
+        entry = self.entries.get(digest)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self.entries[digest]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(digest)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, digest: str, user_id: str, exp: float):
+        self.entries[digest] = (user_id, min(exp, time.time() + TOKEN_RECHECK_SECONDS))
+        self.entries.move_to_end(digest)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def evict(self, digest: str):
+        self.entries.pop(digest, None)
+
+    def peek(self, digest: str) -> Optional[str]:
+        """The user of a cached, unexpired token, without counting a lookup"""
+        entry = self.entries.get(digest)
+        return entry[0] if entry and entry[1] > time.time() else None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+class BoardCache:
+    """LRU read-through cache of board metadata with per-board version counters.
+
+    Entries remember the local version they were loaded at. Writes in this process
+    bump it, so an entry loaded before (or during) a write is never served again.
+    Entries also remember the stored board version (boards.version) the request that
+    loaded them had read; a request that has read a newer one, after a write in
+    another process, misses instead of pairing a stale body with a fresh ETag.
+
+    Local versions are only kept for cached or recently written boards. A board
+    without one reads as `floor`, which forgetting a version raises past it, so a
+    load that began before the version was dropped still cannot be stored.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # (board_id, kind) -> (version, stored version or None, value)
+        self.versions = OrderedDict()  # board_id -> version, least recently written first
+        self.clock = 0  # last version handed out
+        self.floor = 0  # version of boards not in `versions`
+        self.epoch = 0  # bumped by clear(), invalidating every board at once
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, board_id: str) -> tuple:
+        return (self.epoch, self.versions.get(board_id, self.floor))
+
+    def get(self, board_id: str, kind: str, stored_version: Optional[int] = None):
+        """The cached value, or None; with stored_version, only one loaded at that board version"""
+        key = (board_id, kind)
+        entry = self.entries.get(key)
+        if entry is None or entry[0] != self.version(board_id) or (stored_version is not None and entry[1] != stored_version):
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[2]
+
+    def put(self, board_id: str, kind: str, version: tuple, stored_version: Optional[int], value):
+        if version != self.version(board_id):
+            return  # a write landed while this value was loading
+        self.versions.setdefault(board_id, version[1])
+        self.entries[(board_id, kind)] = (version, stored_version, value)
+        self.entries.move_to_end((board_id, kind))
+        while len(self.entries) > self.max_size:
+            (evicted, _), _ = self.entries.popitem(last=False)
+            if not any((evicted, k) in self.entries for k in BOARD_CACHE_KINDS):
+                self.forget(evicted)
+        self.trim()
+
+    def invalidate(self, board_id: str):
+        self.clock += 1
+        self.versions[board_id] = self.clock
+        self.versions.move_to_end(board_id)
+        for kind in BOARD_CACHE_KINDS:
+            self.entries.pop((board_id, kind), None)
+        self.trim()
+
+    def trim(self):
+        """Keep at most max_size versions, forgetting the least recently written boards"""
+        while len(self.versions) > self.max_size:
+            self.forget(next(iter(self.versions)))
+
+    def forget(self, board_id: str):
+        """Drop a board's version and entries"""
+        self.floor = self.clock = max(self.clock, self.versions.pop(board_id, 0)) + 1
+        for kind in BOARD_CACHE_KINDS:
+            self.entries.pop((board_id, kind), None)
+
+    def clear(self):
+        self.epoch += 1
+        self.entries.clear()
+        self.versions.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+class ReadCoalescer:
+    """Single-flight loads: concurrent calls with an equal key share one in-flight load.
+
+    Nothing is kept once a load finishes, so this only collapses bursts. Callers put the
+    board version in the key, so a read that starts after a write never joins a load
+    that started before it. The shared result must not be mutated.
+    """
+
+    def __init__(self):
+        self.inflight: Dict[tuple, asyncio.Future] = {}
+
+    async def run(self, kind: str, key: tuple, loader):
+        key = (kind, *key)
+        load = self.inflight.get(key)
+        if load is None:
+            load = asyncio.ensure_future(loader())
+            self.inflight[key] = load
+            load.add_done_callback(lambda done: self.finished(key, done))
+            metrics.COALESCED_READS.inc(kind, 'leader')
+        else:
+            metrics.COALESCED_READS.inc(kind, 'joined')
+        # A waiter that is cancelled (its client went away) must not cancel the load for the others
+        return await asyncio.shield(load)
+
+    def finished(self, key: tuple, load: asyncio.Future):
+        if self.inflight.get(key) is load:
+            del self.inflight[key]
+        if not load.cancelled():
+            load.exception()  # retrieved, so a load every waiter abandoned logs nothing
+
+class BoardHub:
+    """In-process pub/sub of board change events, one bounded queue per subscriber"""
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.subscribers = {}  # board_id -> set of asyncio.Queue
+
+    def subscribe(self, board_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.setdefault(board_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, board_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(board_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[board_id]
+
+    def publish(self, board_id: str, event: dict):
+        for queue in self.subscribers.get(board_id, ()):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Too slow to keep up: drop its backlog and have it refetch the board
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "board_id": board_id})
+
+class Access:
+    """The workspaces a user owns, each with the ids of its boards"""
+
+    def __init__(self, user_id: str, workspaces: Dict[str, List[str]]):
+        self.user_id = user_id
+        self.workspaces = workspaces
+        self.board_ids = {b for board_ids in workspaces.values() for b in board_ids}
+
+class AccessCache:
+    """LRU cache of each user's Access, invalidated when they create, move or delete a workspace or board.
+
+    Like BoardCache, an entry that was loading while its user was invalidated is not stored,
+    and versions are only kept for the max_size most recently invalidated users.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # user_id -> Access
+        self.versions = OrderedDict()  # user_id -> version, least recently invalidated first
+        self.clock = 0  # last version handed out
+        self.floor = 0  # version of users not in `versions`
+        self.hits = 0
+        self.misses = 0
+
+    def version(self, user_id: str) -> int:
+        return self.versions.get(user_id, self.floor)
+
+    def get(self, user_id: str) -> Optional[Access]:
+        access = self.entries.get(user_id)
+        if access is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(user_id)
+        self.hits += 1
+        return access
+
+    def put(self, user_id: str, version: int, access: Access):
+        if version != self.version(user_id):
+            return
+        self.entries[user_id] = access
+        self.entries.move_to_end(user_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, user_id: str):
+        self.clock += 1
+        self.versions[user_id] = self.clock
+        self.versions.move_to_end(user_id)
+        self.entries.pop(user_id, None)
+        while len(self.versions) > self.max_size:
+            # Users without a version read as the floor; raising it past every version
+            # handed out keeps loads that began before this from being stored
+            _, version = self.versions.popitem(last=False)
+            self.floor = self.clock = max(self.clock, version) + 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE)
+board_cache = BoardCache(BOARD_CACHE_SIZE)
+access_cache = AccessCache(ACCESS_CACHE_SIZE)
+board_hub = BoardHub(EVENT_QUEUE_SIZE)
+read_coalescer = ReadCoalescer()
+
+def open_store() -> Repository:
+    """The storage backend selected by STORAGE_BACKEND"""
+    if STORAGE_BACKEND == 'sqlite':
+        return SqlRepository(SQLITE_PATH, on_board_removed=board_cache.invalidate, sync_retention_days=SYNC_RETENTION_DAYS)
+    if STORAGE_BACKEND != 'mongo':
+        raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}; use 'mongo' or 'sqlite'")
+    return MongoRepository(db, on_board_removed=board_cache.invalidate, cascade_batch_size=CASCADE_BATCH_SIZE, sync_retention_days=SYNC_RETENTION_DAYS)
+
+store = open_store()
 
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
 
+password_pool = ThreadPoolExecutor(max_workers=HASH_POOL_SIZE, thread_name_prefix='bcrypt')
+password_jobs = 0  # running + queued jobs in password_pool
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def password_needs_rehash(hashed: str) -> bool:
+    """True when a hash was made with a different work factor than BCRYPT_ROUNDS"""
+    try:
+        return int(hashed.split('$')[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+async def run_password_job(func, *args):
+    """Run a bcrypt call in password_pool, shedding load once the queue is full"""
+    global password_jobs
+    if password_jobs >= HASH_POOL_SIZE + HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)}
+        )
+    password_jobs += 1
+    start = time.perf_counter()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_pool, func, *args)
+    finally:
+        password_jobs -= 1
+        metrics.PASSWORD_HASH_SECONDS.observe(time.perf_counter() - start, func.__name__)
+
+async def rehash_password(user_id: str, password: str):
+    """Upgrade a stored hash to the current work factor after a successful login"""
+    try:
+        password_hash = await run_password_job(hash_password, password)
+    except HTTPException:
+        return  # pool saturated; try again on the next login
+    await store.set_password_hash(user_id, password_hash)
+
 def create_token(user_id: str) -> str:
     payload = {
         'user_id': user_id,
@@ -176,17 +702,79 @@ def create_token(user_id: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-def decode_token(token: str) -> str:
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def token_payload(token: str) -> dict:
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload['user_id']
+        return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def decode_token(token: str) -> str:
+    digest = token_digest(token)
+    user_id = token_cache.get(digest)
+    if user_id is not None:
+        return user_id
+    
+    payload = token_payload(token)
+    if await store.is_token_revoked(digest):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    token_cache.put(digest, payload['user_id'], payload['exp'])
+    return payload['user_id']
+
+async def revoke_token(token: str):
+    """Refuse a token in every worker until it would have expired anyway (see TokenCache)"""
+    digest = token_digest(token)
+    await store.revoke_token(digest, datetime.fromtimestamp(token_payload(token)['exp'], timezone.utc))
+    token_cache.evict(digest)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
-    return decode_token(credentials.credentials)
+    return await decode_token(credentials.credentials)
+
+async def load_access(user_id: str, refresh: bool = False) -> Access:
+    """The user's Access, from access_cache unless missing or refresh is set"""
+    if refresh:
+        access_cache.invalidate(user_id)
+    version = access_cache.version(user_id)
+    access = access_cache.get(user_id)
+    if access is None:
+        access = Access(user_id, await store.access_index(user_id))
+        access_cache.put(user_id, version, access)
+    return access
+
+async def get_access(user_id: str = Depends(get_current_user)) -> Access:
+    return await load_access(user_id)
+
+async def covering_access(access: Access, board_ids) -> Access:
+    """access, reloaded once if it lacks any of board_ids (another worker may have just created them)"""
+    if all(b in access.board_ids for b in board_ids):
+        return access
+    return await load_access(access.user_id, refresh=True)
+
+async def require_board(access: Access, board_id: str, detail: str = "Board not found") -> Access:
+    access = await covering_access(access, [board_id])
+    if board_id not in access.board_ids:
+        raise HTTPException(status_code=404, detail=detail)
+    return access
+
+async def require_workspace(access: Access, workspace_id: str) -> Access:
+    if workspace_id not in access.workspaces:
+        access = await load_access(access.user_id, refresh=True)
+        if workspace_id not in access.workspaces:
+            raise HTTPException(status_code=404, detail="Workspace not found")
+    return access
+
+async def scoped_write(access: Access, write):
+    """Run write(board_ids) limited to the user's boards; when nothing matched, retry once with reloaded access"""
+    result = await write(access.board_ids)
+    if result is None:
+        fresh = await load_access(access.user_id, refresh=True)
+        if fresh.board_ids != access.board_ids:
+            result = await write(fresh.board_ids)
+    return result
 
 def serialize_doc(doc):
     """Convert MongoDB document to JSON-serializable format"""
@@ -200,27 +788,318 @@ def serialize_doc(doc):
         return result
     return doc
 
+def encode_cursor(doc: dict) -> str:
+    """Build an opaque keyset cursor from the (order, id) of the last document of a page"""
+    raw = json.dumps([doc.get('order', 0), doc['id']]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor: str) -> tuple:
+    """Turn a cursor back into the (order, id) keyset that the next page starts after"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        order, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if isinstance(order, bool) or not isinstance(order, (int, float)) or not isinstance(last_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return (order, last_id)
+
+def search_terms(search: str) -> List[str]:
+    return tokenize(search)[:SEARCH_MAX_TERMS]
+
+async def read_through(board_id: str, kind: str, loader, stored_version: Optional[int] = None):
+    """Return cached board metadata, loading and caching it on a miss; concurrent misses share one load.
+
+    Pass the board version a conditional read tagged its response with (see check_board_etag),
+    so the body is never older than the ETag.
+    """
+    version = board_cache.version(board_id)
+    value = board_cache.get(board_id, kind, stored_version)
+    if value is None:
+        if READ_COALESCING:
+            value = await read_coalescer.run(kind, (board_id, version, stored_version), lambda: loader(board_id))
+        else:
+            value = await loader(board_id)
+        if value is not None:
+            board_cache.put(board_id, kind, version, stored_version, value)
+    return value
+
+async def load_board(board_id: str) -> Optional[dict]:
+    board = await store.find_board(board_id)
+    return serialize_doc(board) if board else None
+
+async def load_groups(board_id: str) -> List[dict]:
+    return [serialize_doc(g) for g in await store.list_groups(board_id)]
+
+async def load_statuses(board_id: str) -> List[dict]:
+    return [serialize_doc(s) for s in await store.list_statuses(board_id)]
+
+async def bump_board_versions(*board_ids, counters: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, int]:
+    """Advance the version of each board after a write to it or its groups, statuses or tasks,
+    applying any board counter changes in the same store call"""
+    return await store.bump_board_versions(list({b for b in board_ids if b}), counters)
+
+def board_change(entity: str, action: str, doc: dict, data: Optional[dict] = None) -> dict:
+    """Describe one write for record_board_changes; data holds the new or changed fields"""
+    if data is not None:
+        data = {k: v for k, v in serialize_doc(data).items() if k != 'search_terms'}
+    board_id = doc['id'] if entity == 'board' else doc['board_id']
+    return {"type": f"{entity}.{action}", "board_id": board_id, "id": doc.get('id'), "data": data}
+
+async def record_board_changes(*changes: dict, versions: Optional[Dict[str, int]] = None, counters: Optional[Dict[str, Dict[str, int]]] = None):
+    """Bump the version of every board touched by a write, log the changes for delta sync
+    and push them to subscribers. Pass `versions` when the write already bumped them, and
+    `counters` (see board_counter_changes) when it moved tasks between counters."""
+    if versions is None:
+        versions = await bump_board_versions(*[c['board_id'] for c in changes if c['type'] not in ('board.created', 'board.deleted')], counters=counters)
+    elif counters:
+        await store.adjust_counters(counters)
+    
+    now = datetime.now(timezone.utc)
+    log = []
+    for change in changes:
+        change['version'] = versions.get(change['board_id'])
+        if change['version'] is not None:
+            entity, action = change['type'].split('.')
+            log.append({"board_id": change['board_id'], "seq": change['version'], "entity": entity, "action": action, "id": change['id'], "at": now})
+    if log:
+        await store.log_changes(log)
+    
+    by_board = {}
+    for change in changes:
+        by_board.setdefault(change['board_id'], []).append(change)
+    for board_id, board_changes in by_board.items():
+        if len(board_changes) == 1:
+            board_hub.publish(board_id, board_changes[0])
+        else:
+            board_hub.publish(board_id, {"type": "batch", "board_id": board_id, "changes": board_changes})
+
+def if_none_match(request: Request, etag: str) -> bool:
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    strip_weak = lambda tag: tag[2:] if tag.startswith('W/') else tag
+    candidates = [strip_weak(c.strip()) for c in header.split(',')]
+    return '*' in candidates or strip_weak(etag) in candidates
+
+async def check_board_etag(request: Request, response: Response, board_id: str) -> Optional[Response]:
+    """Tag a board read with a weak ETag derived from the board version.
+
+    Returns a 304 response when the client already holds this representation, so the
+    caller can skip loading documents entirely. The version is read before any data,
+    so a concurrent write can only make the ETag older than the body, never newer.
+    """
+    version = await store.board_version(board_id)
+    if version is None:
+        return None
+    variant = hashlib.sha1(f"{request.url.path}?{request.url.query}|{request.headers.get('accept', '')}".encode('utf-8')).hexdigest()[:12]
+    etag = f'W/"{version}-{variant}"'
+    if if_none_match(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers['ETag'] = etag
+    request.state.board_version = version
+    return None
+
+def coalescing_key(key: tuple) -> str:
+    """A hashable form of a read's parameters: equal for equal reads, whatever their types"""
+    return json.dumps(key, sort_keys=True, default=str)
+
+async def coalesced_read(request: Request, kind: str, key: tuple, loader):
+    """Run loader(), sharing it with concurrent identical reads at the same board version.
+
+    The version is the one check_board_etag read before any data, so a client that saw
+    its write acknowledged gets a load started after it. Reads without a version, and
+    requests sent with `Cache-Control: no-cache`, always run their own load.
+    """
+    version = getattr(request.state, 'board_version', None)
+    if not READ_COALESCING or version is None or 'no-cache' in request.headers.get('cache-control', ''):
+        return await loader()
+    return await read_coalescer.run(kind, (version, coalescing_key(key)), loader)
+
+def dump_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':'), default=lambda v: v.isoformat()).encode('utf-8')
+
+class FastJSONResponse(Response):
+    media_type = 'application/json'
+
+    def render(self, content) -> bytes:
+        start = time.perf_counter()
+        body = dump_json(content)
+        metrics.RESPONSE_RENDER_SECONDS.observe(time.perf_counter() - start, 'fast')
+        return body
+
+def has_model(annotation) -> bool:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return True
+    return any(has_model(arg) for arg in get_args(annotation))
+
+@functools.lru_cache(maxsize=None)
+def payload_fields(model) -> Tuple[tuple, ...]:
+    """(name, annotation if it holds a model else None, default) for each field of model"""
+    return tuple(
+        (name, field.annotation if has_model(field.annotation) else None,
+         None if field.is_required() or field.default_factory else field.default)
+        for name, field in model.model_fields.items()
+    )
+
+def fast_payload(content, annotation):
+    """Shape content as response_model validation would: exactly the model's fields, with
+    missing ones at their defaults, whatever extra or absent keys the store returned"""
+    if content is None:
+        return None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return {
+            name: fast_payload(content.get(name, default), nested) if nested else content.get(name, default)
+            for name, nested, default in payload_fields(annotation)
+        }
+    if get_origin(annotation) is list:
+        item, = get_args(annotation)
+        return [fast_payload(c, item) for c in content]
+    if get_origin(annotation) is Union:
+        models = [arg for arg in get_args(annotation) if has_model(arg)]
+        return fast_payload(content, models[0]) if len(models) == 1 else content
+    return content
+
+def respond(content, model, response: Optional[Response] = None):
+    """In FAST_RESPONSES mode shape content to `model` and encode it directly, bypassing
+    response_model validation"""
+    if FAST_RESPONSES:
+        return FastJSONResponse(fast_payload(content, model), headers=dict(response.headers) if response else None)
+    return content
+
+def list_response(docs: list, model, response: Optional[Response] = None):
+    """Return a list of `model` documents; the fast path encodes datetimes itself, so skips serialize_doc"""
+    if FAST_RESPONSES:
+        return respond(docs, List[model], response)
+    return [serialize_doc(d) for d in docs]
+
+def parse_fields(fields: Optional[str], model, always: Tuple[str, ...] = ('id',)) -> Optional[Tuple[str, ...]]:
+    """Validate a comma-separated `fields=` list against a model; None means every field"""
+    if not fields:
+        return None
+    names = {f.strip() for f in fields.split(',') if f.strip()}
+    unknown = sorted(names - model.model_fields.keys())
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    names.update(always)
+    return tuple(name for name in model.model_fields if name in names)
+
+@functools.lru_cache(maxsize=256)
+def sparse_model(model, fields: Tuple[str, ...]):
+    """`model` cut down to `fields`, keeping their types and defaults"""
+    return create_model(f"{model.__name__}Fields", **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields})
+
+@functools.lru_cache(maxsize=256)
+def sparse_adapter(model, fields: Tuple[str, ...]) -> TypeAdapter:
+    return TypeAdapter(List[sparse_model(model, fields)])
+
+def sparse_response(docs: list, model, fields: Tuple[str, ...], response: Optional[Response] = None):
+    """Return documents projected to a sparse fieldset, validated against the trimmed model
+    instead of the route's response_model, which would reject the missing fields"""
+    if FAST_RESPONSES:
+        return respond(docs, List[sparse_model(model, fields)], response)
+    adapter = sparse_adapter(model, fields)
+    content = adapter.dump_python(adapter.validate_python(docs), mode='json')
+    return metrics.TimedJSONResponse(content, headers=dict(response.headers) if response else None)
+
+def midpoint_order(lower: Optional[float], upper: Optional[float]) -> float:
+    if lower is None and upper is None:
+        return 0.0
+    if lower is None:
+        return upper - 1
+    if upper is None:
+        return lower + 1
+    return (lower + upper) / 2
+
+def order_fits(order: float, lower: Optional[float], upper: Optional[float]) -> bool:
+    """False when neighbours share an order or floats cannot tell the midpoint from them"""
+    return (lower is None or order > lower) and (upper is None or order < upper)
+
+async def neighbour_orders(task: dict, group_id: Optional[str], after: Optional[dict], before: Optional[dict]) -> Tuple[Optional[float], Optional[float]]:
+    """The orders a moved task goes between, filling in a missing neighbour from the target group"""
+    lower = after.get('order', 0) if after else None
+    upper = before.get('order', 0) if before else None
+    if after and not before:
+        upper = await store.order_after(task['board_id'], group_id, task['id'], task_sort_key(after))
+    elif before and not after:
+        lower = await store.order_before(task['board_id'], group_id, task['id'], task_sort_key(before))
+    elif not after:
+        lower = await store.order_before(task['board_id'], group_id, task['id'])
+    return lower, upper
+
+async def rebalance_task_orders(board_id: str, group_id: Optional[str]):
+    """Renumber a group's tasks 0, 1, 2, ... keeping their current order"""
+    if await store.renumber_tasks(board_id, group_id):
+        await record_board_changes(board_change('task', 'reordered', {"board_id": board_id, "id": group_id}))
+
+def stats_key(value) -> str:
+    """Counter key for a status/group id or priority, safe to use in a dotted $inc path"""
+    if value is None:
+        return 'none'
+    return str(value).replace('.', '_').replace('$', '_')
+
+def counter_changes(before: Optional[dict], after: Optional[dict]) -> dict:
+    """The $inc that takes board counters from a task's old state to its new one"""
+    inc = {}
+    for doc, step in ((before, -1), (after, 1)):
+        if doc is None:
+            continue
+        inc['total'] = inc.get('total', 0) + step
+        for field, counter in STATS_FIELDS.items():
+            path = f"{counter}.{stats_key(doc.get(field))}"
+            inc[path] = inc.get(path, 0) + step
+    return {path: n for path, n in inc.items() if n}
+
+def board_counter_changes(*transitions) -> Dict[str, Dict[str, int]]:
+    """The counter $inc of each board for (before, after) task transitions; boards whose
+    counters end up unchanged are left out"""
+    by_board = {}
+    for before, after in transitions:
+        for path, n in counter_changes(before, after).items():
+            inc = by_board.setdefault((after or before)['board_id'], {})
+            inc[path] = inc.get(path, 0) + n
+    return {board_id: {path: n for path, n in inc.items() if n} for board_id, inc in by_board.items() if any(inc.values())}
+
+def done_status_id(statuses: list) -> Optional[str]:
+    """The board's last status; tasks in it are completed, so never overdue"""
+    return max(statuses, key=lambda s: s.get('order', 0))['id'] if statuses else None
+
+async def count_board_tasks(board_id: str, statuses: list) -> dict:
+    """Counts per status, priority and group plus overdue tasks"""
+    counts = await store.count_tasks(board_id, done_status_id(statuses))
+    stats = {counter: {} for counter in STATS_FIELDS.values()}
+    for counter in STATS_FIELDS.values():
+        for value, n in counts[counter].items():
+            key = stats_key(value)
+            stats[counter][key] = stats[counter].get(key, 0) + n
+    stats['total'] = sum(stats['by_status'].values())
+    stats['overdue'] = counts['overdue']
+    return stats
+
+async def stream_ndjson(docs):
+    async for doc in docs:
+        yield dump_json(serialize_doc(doc)) + b'\n'
+
 # ============================================================================
 # AUTHENTICATION ROUTES
 # ============================================================================
 
 @api_router.post("/auth/register", response_model=AuthResponse)
 async def register(user_data: UserCreate):
-    # Check if user exists
-    existing = await db.users.find_one({"email": user_data.email}, {"_id": 0})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
     # Create user
     user = User(
         email=user_data.email,
         name=user_data.name,
-        password_hash=hash_password(user_data.password)
+        password_hash=await run_password_job(hash_password, user_data.password)
     )
     
     doc = user.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.users.insert_one(doc)
+    try:
+        await store.insert_user(doc)
+    except DuplicateKey:
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     # Create token
     token = create_token(user.id)
@@ -236,19 +1115,18 @@ async def register(user_data: UserCreate):
     )
 
 @api_router.post("/auth/login", response_model=AuthResponse)
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, background_tasks: BackgroundTasks):
     # Find user
-    user_doc = await db.users.find_one({"email": credentials.email}, {"_id": 0})
+    user_doc = await store.find_user_by_email(credentials.email)
     if not user_doc:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     # Verify password
-    if not verify_password(credentials.password, user_doc['password_hash']):
+    if not await run_password_job(verify_password, credentials.password, user_doc['password_hash']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    # Convert ISO string to datetime
-    if isinstance(user_doc['created_at'], str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
+    if password_needs_rehash(user_doc['password_hash']):
+        background_tasks.add_task(rehash_password, user_doc['id'], credentials.password)
     
     user = User(**user_doc)
     token = create_token(user.id)
@@ -263,15 +1141,18 @@ async def login(credentials: UserLogin):
         )
     )
 
+@api_router.post("/auth/logout")
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    await decode_token(credentials.credentials)
+    await revoke_token(credentials.credentials)
+    return {"message": "Logged out"}
+
 @api_router.get("/auth/me", response_model=UserResponse)
 async def get_me(user_id: str = Depends(get_current_user)):
-    user_doc = await db.users.find_one({"id": user_id}, {"_id": 0})
+    user_doc = await store.find_user(user_id)
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if isinstance(user_doc['created_at'], str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
-    
     user = User(**user_doc)
     return UserResponse(
         id=user.id,
@@ -285,9 +1166,12 @@ async def get_me(user_id: str = Depends(get_current_user)):
 # ============================================================================
 
 @api_router.get("/workspaces", response_model=List[Workspace])
-async def get_workspaces(user_id: str = Depends(get_current_user)):
-    workspaces = await db.workspaces.find({"owner_id": user_id}, {"_id": 0}).to_list(1000)
-    return [serialize_doc(w) for w in workspaces]
+async def get_workspaces(fields: Optional[str] = None, user_id: str = Depends(get_current_user)):
+    fields = parse_fields(fields, Workspace)
+    workspaces = await store.list_workspaces(user_id, fields)
+    if fields:
+        return sparse_response(workspaces, Workspace, fields)
+    return list_response(workspaces, Workspace)
 
 @api_router.post("/workspaces", response_model=Workspace)
 async def create_workspace(workspace_data: WorkspaceCreate, user_id: str = Depends(get_current_user)):
@@ -296,31 +1180,24 @@ async def create_workspace(workspace_data: WorkspaceCreate, user_id: str = Depen
         owner_id=user_id
     )
     
-    doc = serialize_doc(workspace.model_dump())
-    await db.workspaces.insert_one(doc)
+    doc = workspace.model_dump()
+    await store.insert_workspace(doc)
+    access_cache.invalidate(user_id)
     return workspace
 
 @api_router.put("/workspaces/{workspace_id}", response_model=Workspace)
 async def update_workspace(workspace_id: str, workspace_data: WorkspaceCreate, user_id: str = Depends(get_current_user)):
-    result = await db.workspaces.update_one(
-        {"id": workspace_id, "owner_id": user_id},
-        {"$set": serialize_doc(workspace_data.model_dump())}
-    )
-    
-    if result.matched_count == 0:
+    workspace_doc = await store.update_workspace(workspace_id, user_id, workspace_data.model_dump())
+    if not workspace_doc:
         raise HTTPException(status_code=404, detail="Workspace not found")
-    
-    workspace_doc = await db.workspaces.find_one({"id": workspace_id}, {"_id": 0})
     return serialize_doc(workspace_doc)
 
 @api_router.delete("/workspaces/{workspace_id}")
 async def delete_workspace(workspace_id: str, user_id: str = Depends(get_current_user)):
-    result = await db.workspaces.delete_one({"id": workspace_id, "owner_id": user_id})
-    if result.deleted_count == 0:
+    # Boards, groups, tasks and statuses go with it (in the background on MongoDB)
+    if not await store.delete_workspace(workspace_id, user_id):
         raise HTTPException(status_code=404, detail="Workspace not found")
-    
-    # Delete associated boards, groups, tasks, statuses
-    await db.boards.delete_many({"workspace_id": workspace_id})
+    access_cache.invalidate(user_id)
     return {"message": "Workspace deleted"}
 
 # ============================================================================
@@ -328,31 +1205,137 @@ async def delete_workspace(workspace_id: str, user_id: str = Depends(get_current
 # ============================================================================
 
 @api_router.get("/boards", response_model=List[Board])
-async def get_boards(workspace_id: Optional[str] = None, user_id: str = Depends(get_current_user)):
-    query = {}
+async def get_boards(workspace_id: Optional[str] = None, fields: Optional[str] = None, access: Access = Depends(get_access)):
+    fields = parse_fields(fields, Board)
     if workspace_id:
-        query["workspace_id"] = workspace_id
-    
-    boards = await db.boards.find(query, {"_id": 0}).to_list(1000)
-    return [serialize_doc(b) for b in boards]
+        await require_workspace(access, workspace_id)
+        boards = await store.list_boards(workspace_id, fields)
+    else:
+        boards = await store.list_boards(list(access.workspaces), fields)
+    if fields:
+        return sparse_response(boards, Board, fields)
+    return list_response(boards, Board)
 
 @api_router.get("/boards/{board_id}", response_model=Board)
-async def get_board(board_id: str, user_id: str = Depends(get_current_user)):
-    board = await db.boards.find_one({"id": board_id}, {"_id": 0})
+async def get_board(board_id: str, request: Request, response: Response, access: Access = Depends(get_access)):
+    await require_board(access, board_id)
+    not_modified = await check_board_etag(request, response, board_id)
+    if not_modified:
+        return not_modified
+    
+    board = await read_through(board_id, 'board', load_board, getattr(request.state, 'board_version', None))
     if not board:
         raise HTTPException(status_code=404, detail="Board not found")
-    return serialize_doc(board)
+    return respond(board, Board, response)
+
+@api_router.get("/boards/{board_id}/snapshot", response_model=BoardSnapshot)
+async def get_board_snapshot(board_id: str, request: Request, response: Response, access: Access = Depends(get_access)):
+    await require_board(access, board_id)
+    not_modified = await check_board_etag(request, response, board_id)
+    if not_modified:
+        return not_modified
+    
+    stored_version = getattr(request.state, 'board_version', None)
+    snapshot = await coalesced_read(request, 'snapshot', (board_id,), lambda: load_snapshot(board_id, stored_version))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    return respond(snapshot, BoardSnapshot, response)
+
+async def load_snapshot(board_id: str, stored_version: Optional[int] = None) -> Optional[dict]:
+    board, groups, statuses, tasks = await asyncio.gather(
+        read_through(board_id, 'board', load_board, stored_version),
+        read_through(board_id, 'groups', load_groups, stored_version),
+        read_through(board_id, 'statuses', load_statuses, stored_version),
+        store.list_tasks({"board_id": board_id}, limit=MAX_PAGE_SIZE + 1)
+    )
+    if not board:
+        return None
+    
+    next_cursor = None
+    if len(tasks) > MAX_PAGE_SIZE:
+        tasks = tasks[:MAX_PAGE_SIZE]
+        next_cursor = encode_cursor(tasks[-1])
+    
+    groups = [{**g, "tasks": []} for g in groups]
+    tasks_by_group = {g['id']: g['tasks'] for g in groups}
+    ungrouped_tasks = []
+    for task in tasks:
+        tasks_by_group.get(task.get('group_id'), ungrouped_tasks).append(serialize_doc(task))
+    
+    return {
+        "board": board,
+        "groups": groups,
+        "statuses": statuses,
+        "ungrouped_tasks": ungrouped_tasks,
+        "next_cursor": next_cursor
+    }
+
+@api_router.get("/boards/{board_id}/timeline", response_model=List[Task])
+async def get_board_timeline(
+    board_id: str,
+    request: Request,
+    response: Response,
+    start: datetime,
+    end: datetime,
+    limit: int = Query(TIMELINE_MAX_TASKS, ge=1, le=TIMELINE_MAX_TASKS),
+    access: Access = Depends(get_access)
+):
+    """Tasks whose start_date..due_date span overlaps [start, end), sorted by when they begin"""
+    start, end = as_utc(start), as_utc(end)
+    if end <= start:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    if end - start > timedelta(days=TIMELINE_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"A timeline covers at most {TIMELINE_MAX_DAYS} days")
+    await require_board(access, board_id)
+    not_modified = await check_board_etag(request, response, board_id)
+    if not_modified:
+        return not_modified
+    
+    tasks = await store.list_timeline(board_id, start, end, limit + 1)
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        response.headers['X-Truncated'] = 'true'
+    tasks.sort(key=lambda t: (t.get('start_date') or t['due_date'], t.get('order', 0), t['id']))
+    return list_response(tasks, Task, response)
+
+@api_router.get("/boards/{board_id}/stats", response_model=BoardStats)
+async def get_board_stats(board_id: str, access: Access = Depends(get_access)):
+    await require_board(access, board_id)
+    board, statuses, counters = await asyncio.gather(
+        read_through(board_id, 'board', load_board),
+        read_through(board_id, 'statuses', load_statuses),
+        store.get_counters(board_id)
+    )
+    if not board:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    recount_after = datetime.now(timezone.utc) - timedelta(seconds=STATS_RECOUNT_SECONDS)
+    if counters and as_utc(counters['counted_at']) > recount_after:
+        overdue = await store.count_overdue(board_id, done_status_id(statuses))
+        return {
+            **{k: v for k, v in counters.items() if k != 'counted_at'},
+            "by_status": {k: n for k, n in counters['by_status'].items() if n},
+            "by_priority": {k: n for k, n in counters['by_priority'].items() if n},
+            "by_group": {k: n for k, n in counters['by_group'].items() if n},
+            "overdue": overdue,
+            "source": "counters"
+        }
+    
+    stats = await count_board_tasks(board_id, statuses)
+    if stats['total'] >= STATS_COUNTER_THRESHOLD:
+        # Large board: materialize the counts so task writes keep them current
+        counters = {k: stats[k] for k in ('total', *STATS_FIELDS.values())}
+        await store.put_counters(board_id, counters)
+    elif counters:
+        await store.delete_counters(board_id)
+    return {"board_id": board_id, **stats, "source": "aggregate"}
 
 @api_router.post("/boards", response_model=Board)
-async def create_board(board_data: BoardCreate, user_id: str = Depends(get_current_user)):
-    # Verify workspace ownership
-    workspace = await db.workspaces.find_one({"id": board_data.workspace_id, "owner_id": user_id})
-    if not workspace:
-        raise HTTPException(status_code=404, detail="Workspace not found")
+async def create_board(board_data: BoardCreate, access: Access = Depends(get_access)):
+    await require_workspace(access, board_data.workspace_id)
     
     board = Board(**board_data.model_dump())
-    doc = serialize_doc(board.model_dump())
-    await db.boards.insert_one(doc)
+    doc = board.model_dump()
     
     # Create default statuses
     default_statuses = [
@@ -362,35 +1345,41 @@ async def create_board(board_data: BoardCreate, user_id: str = Depends(get_curre
         {"name": "Done", "color": "#10b981", "order": 3}
     ]
     
-    for status_data in default_statuses:
-        status = Status(board_id=board.id, **status_data)
-        await db.statuses.insert_one(serialize_doc(status.model_dump()))
+    statuses = [Status(board_id=board.id, **status_data).model_dump() for status_data in default_statuses]
+    await store.insert_board(doc, statuses)
     
+    access_cache.invalidate(access.user_id)
+    board_cache.invalidate(board.id)
+    await record_board_changes(board_change('board', 'created', doc, doc))
     return board
 
 @api_router.put("/boards/{board_id}", response_model=Board)
-async def update_board(board_id: str, board_data: BoardCreate, user_id: str = Depends(get_current_user)):
-    result = await db.boards.update_one(
-        {"id": board_id},
-        {"$set": serialize_doc(board_data.model_dump())}
-    )
+async def update_board(board_id: str, board_data: BoardCreate, access: Access = Depends(get_access)):
+    access = await require_board(access, board_id)
+    access = await require_workspace(access, board_data.workspace_id)
+    updated = await store.update_board(board_id, board_data.model_dump())
+    board_cache.invalidate(board_id)
+    if board_id not in access.workspaces[board_data.workspace_id]:
+        access_cache.invalidate(access.user_id)  # moved to another workspace
     
-    if result.matched_count == 0:
+    if not updated:
         raise HTTPException(status_code=404, detail="Board not found")
     
-    board_doc = await db.boards.find_one({"id": board_id}, {"_id": 0})
+    board_doc, version = updated
+    await record_board_changes(board_change('board', 'updated', board_doc, board_data.model_dump()), versions={board_id: version})
     return serialize_doc(board_doc)
 
 @api_router.delete("/boards/{board_id}")
-async def delete_board(board_id: str, user_id: str = Depends(get_current_user)):
-    result = await db.boards.delete_one({"id": board_id})
-    if result.deleted_count == 0:
+async def delete_board(board_id: str, access: Access = Depends(get_access)):
+    await require_board(access, board_id)
+    # Groups, tasks and statuses go with it (in the background on MongoDB)
+    deleted = await store.delete_board(board_id)
+    access_cache.invalidate(access.user_id)
+    board_cache.invalidate(board_id)
+    if not deleted:
         raise HTTPException(status_code=404, detail="Board not found")
     
-    # Delete associated groups, tasks, statuses
-    await db.groups.delete_many({"board_id": board_id})
-    await db.tasks.delete_many({"board_id": board_id})
-    await db.statuses.delete_many({"board_id": board_id})
+    await record_board_changes(board_change('board', 'deleted', {"id": board_id}))
     return {"message": "Board deleted"}
 
 # ============================================================================
@@ -398,35 +1387,52 @@ async def delete_board(board_id: str, user_id: str = Depends(get_current_user)):
 # ============================================================================
 
 @api_router.get("/groups", response_model=List[Group])
-async def get_groups(board_id: str, user_id: str = Depends(get_current_user)):
-    groups = await db.groups.find({"board_id": board_id}, {"_id": 0}).sort("order", 1).to_list(1000)
-    return [serialize_doc(g) for g in groups]
+async def get_groups(board_id: str, request: Request, response: Response, access: Access = Depends(get_access)):
+    await require_board(access, board_id)
+    not_modified = await check_board_etag(request, response, board_id)
+    if not_modified:
+        return not_modified
+    return respond(await read_through(board_id, 'groups', load_groups, getattr(request.state, 'board_version', None)), List[Group], response)
 
 @api_router.post("/groups", response_model=Group)
-async def create_group(group_data: GroupCreate, user_id: str = Depends(get_current_user)):
+async def create_group(group_data: GroupCreate, access: Access = Depends(get_access)):
+    await require_board(access, group_data.board_id)
     group = Group(**group_data.model_dump())
-    doc = serialize_doc(group.model_dump())
-    await db.groups.insert_one(doc)
+    doc = group.model_dump()
+    await store.insert_group(doc)
+    board_cache.invalidate(group.board_id)
+    await record_board_changes(board_change('group', 'created', doc, doc))
     return group
 
 @api_router.put("/groups/{group_id}", response_model=Group)
-async def update_group(group_id: str, group_data: GroupCreate, user_id: str = Depends(get_current_user)):
-    result = await db.groups.update_one(
-        {"id": group_id},
-        {"$set": serialize_doc(group_data.model_dump())}
-    )
+async def update_group(group_id: str, group_data: GroupCreate, access: Access = Depends(get_access)):
+    access = await require_board(access, group_data.board_id)
+    update_data = group_data.model_dump()
+    previous = await scoped_write(access, lambda board_ids: store.update_group(group_id, update_data, board_ids))
     
-    if result.matched_count == 0:
+    if not previous:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    group_doc = await db.groups.find_one({"id": group_id}, {"_id": 0})
+    group_doc = {**previous, **update_data}
+    board_cache.invalidate(previous['board_id'])
+    board_cache.invalidate(update_data['board_id'])
+    if previous['board_id'] == update_data['board_id']:
+        await record_board_changes(board_change('group', 'updated', group_doc, update_data))
+    else:
+        await record_board_changes(board_change('group', 'deleted', previous), board_change('group', 'created', group_doc, group_doc))
     return serialize_doc(group_doc)
 
 @api_router.delete("/groups/{group_id}")
-async def delete_group(group_id: str, user_id: str = Depends(get_current_user)):
-    result = await db.groups.delete_one({"id": group_id})
-    if result.deleted_count == 0:
+async def delete_group(group_id: str, access: Access = Depends(get_access)):
+    deleted = await scoped_write(access, lambda board_ids: store.delete_group(group_id, board_ids))
+    if not deleted:
         raise HTTPException(status_code=404, detail="Group not found")
+    group_doc, task_ids = deleted
+    board_cache.invalidate(group_doc['board_id'])
+    await record_board_changes(
+        board_change('group', 'deleted', group_doc),
+        *[board_change('task', 'updated', {"board_id": group_doc['board_id'], "id": task_id}, {"group_id": None}) for task_id in task_ids]
+    )
     return {"message": "Group deleted"}
 
 # ============================================================================
@@ -434,35 +1440,52 @@ async def delete_group(group_id: str, user_id: str = Depends(get_current_user)):
 # ============================================================================
 
 @api_router.get("/statuses", response_model=List[Status])
-async def get_statuses(board_id: str, user_id: str = Depends(get_current_user)):
-    statuses = await db.statuses.find({"board_id": board_id}, {"_id": 0}).sort("order", 1).to_list(1000)
-    return [serialize_doc(s) for s in statuses]
+async def get_statuses(board_id: str, request: Request, response: Response, access: Access = Depends(get_access)):
+    await require_board(access, board_id)
+    not_modified = await check_board_etag(request, response, board_id)
+    if not_modified:
+        return not_modified
+    return respond(await read_through(board_id, 'statuses', load_statuses, getattr(request.state, 'board_version', None)), List[Status], response)
 
 @api_router.post("/statuses", response_model=Status)
-async def create_status(status_data: StatusCreate, user_id: str = Depends(get_current_user)):
+async def create_status(status_data: StatusCreate, access: Access = Depends(get_access)):
+    await require_board(access, status_data.board_id)
     status = Status(**status_data.model_dump())
-    doc = serialize_doc(status.model_dump())
-    await db.statuses.insert_one(doc)
+    doc = status.model_dump()
+    await store.insert_status(doc)
+    board_cache.invalidate(status.board_id)
+    await record_board_changes(board_change('status', 'created', doc, doc))
     return status
 
 @api_router.put("/statuses/{status_id}", response_model=Status)
-async def update_status(status_id: str, status_data: StatusCreate, user_id: str = Depends(get_current_user)):
-    result = await db.statuses.update_one(
-        {"id": status_id},
-        {"$set": serialize_doc(status_data.model_dump())}
-    )
+async def update_status(status_id: str, status_data: StatusCreate, access: Access = Depends(get_access)):
+    access = await require_board(access, status_data.board_id)
+    update_data = status_data.model_dump()
+    previous = await scoped_write(access, lambda board_ids: store.update_status(status_id, update_data, board_ids))
     
-    if result.matched_count == 0:
+    if not previous:
         raise HTTPException(status_code=404, detail="Status not found")
     
-    status_doc = await db.statuses.find_one({"id": status_id}, {"_id": 0})
+    status_doc = {**previous, **update_data}
+    board_cache.invalidate(previous['board_id'])
+    board_cache.invalidate(update_data['board_id'])
+    if previous['board_id'] == update_data['board_id']:
+        await record_board_changes(board_change('status', 'updated', status_doc, update_data))
+    else:
+        await record_board_changes(board_change('status', 'deleted', previous), board_change('status', 'created', status_doc, status_doc))
     return serialize_doc(status_doc)
 
 @api_router.delete("/statuses/{status_id}")
-async def delete_status(status_id: str, user_id: str = Depends(get_current_user)):
-    result = await db.statuses.delete_one({"id": status_id})
-    if result.deleted_count == 0:
+async def delete_status(status_id: str, access: Access = Depends(get_access)):
+    deleted = await scoped_write(access, lambda board_ids: store.delete_status(status_id, board_ids))
+    if not deleted:
         raise HTTPException(status_code=404, detail="Status not found")
+    status_doc, task_ids = deleted
+    board_cache.invalidate(status_doc['board_id'])
+    await record_board_changes(
+        board_change('status', 'deleted', status_doc),
+        *[board_change('task', 'updated', {"board_id": status_doc['board_id'], "id": task_id}, {"status_id": None}) for task_id in task_ids]
+    )
     return {"message": "Status deleted"}
 
 # ============================================================================
@@ -471,68 +1494,503 @@ async def delete_status(status_id: str, user_id: str = Depends(get_current_user)
 
 @api_router.get("/tasks", response_model=List[Task])
 async def get_tasks(
+    request: Request,
+    response: Response,
     board_id: Optional[str] = None,
     group_id: Optional[str] = None,
     status_id: Optional[str] = None,
     priority: Optional[str] = None,
+    due_before: Optional[datetime] = None,
+    due_after: Optional[datetime] = None,
+    overdue: bool = False,
+    include_archived: bool = False,
     search: Optional[str] = None,
-    user_id: str = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    fields: Optional[str] = None,
+    access: Access = Depends(get_access)
 ):
-    query = {}
+    # Cursors are built from (order, id), so sparse pages always carry both
+    fields = parse_fields(fields, Task, always=('id', 'order'))
+    if overdue and not board_id:
+        raise HTTPException(status_code=400, detail="overdue requires a board_id")
+    if include_archived and search:
+        raise HTTPException(status_code=400, detail="include_archived cannot be combined with search")
     if board_id:
-        query["board_id"] = board_id
+        await require_board(access, board_id)
+        # Which tasks are overdue changes with the clock, not only with the board version
+        not_modified = None if overdue else await check_board_etag(request, response, board_id)
+        if not_modified:
+            return not_modified
+    
+    # Without a board, a query covers every board the user can see
+    filters = {"board_id": board_id or sorted(access.board_ids)}
     if group_id:
-        query["group_id"] = group_id
+        filters["group_id"] = group_id
     if status_id:
-        query["status_id"] = status_id
+        filters["status_id"] = status_id
     if priority:
-        query["priority"] = priority
-    if search:
-        query["$or"] = [
-            {"title": {"$regex": search, "$options": "i"}},
-            {"description": {"$regex": search, "$options": "i"}}
-        ]
+        filters["priority"] = priority
+    if due_before:
+        filters["due_before"] = as_utc(due_before)
+    if due_after:
+        filters["due_after"] = as_utc(due_after)
+    if overdue:
+        now = datetime.now(timezone.utc)
+        filters["due_before"] = min(filters.get("due_before", now), now)
+        done = done_status_id(await read_through(board_id, 'statuses', load_statuses))
+        if done:
+            filters["status_id_not"] = done
+    terms = search_terms(search) if search else None
+    after = decode_cursor(cursor) if cursor else None
+    
+    # Streaming mode: send tasks as the store yields them, unbounded unless limited
+    if NDJSON_MEDIA_TYPE in request.headers.get('accept', ''):
+        if include_archived:
+            docs = store.stream_tasks_with_archive(filters, after, limit, fields)
+        else:
+            docs = store.stream_tasks(filters, terms, after, limit, fields)
+        return StreamingResponse(stream_ndjson(docs), media_type=NDJSON_MEDIA_TYPE, headers=dict(response.headers))
     
-    tasks = await db.tasks.find(query, {"_id": 0}).sort("order", 1).to_list(1000)
-    return [serialize_doc(t) for t in tasks]
+    # Fetch one extra document to know whether another page exists
+    page_size = limit or MAX_PAGE_SIZE
+    if include_archived:
+        load = lambda: store.list_tasks_with_archive(filters, after, page_size + 1, fields)
+    else:
+        load = lambda: store.list_tasks(filters, terms, after, page_size + 1, fields)
+    read_key = (filters, terms, after, page_size, fields, include_archived)
+    tasks = await coalesced_read(request, 'tasks', read_key, load)
+    if len(tasks) > page_size:
+        tasks = tasks[:page_size]
+        response.headers['X-Next-Cursor'] = encode_cursor(tasks[-1])
+    if fields:
+        return sparse_response(tasks, Task, fields, response)
+    return list_response(tasks, Task, response)
 
 @api_router.get("/tasks/{task_id}", response_model=Task)
-async def get_task(task_id: str, user_id: str = Depends(get_current_user)):
-    task = await db.tasks.find_one({"id": task_id}, {"_id": 0})
+async def get_task(task_id: str, access: Access = Depends(get_access)):
+    task = await store.find_task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
+    await require_board(access, task['board_id'], detail="Task not found")
     return serialize_doc(task)
 
+def task_document(task: Task) -> dict:
+    """A new task as the store keeps it: only archived copies carry archived_at, so both
+    backends store the same fields and the response model fills in the default"""
+    return task.model_dump(exclude={'archived_at'})
+
 @api_router.post("/tasks", response_model=Task)
-async def create_task(task_data: TaskCreate, user_id: str = Depends(get_current_user)):
+async def create_task(task_data: TaskCreate, access: Access = Depends(get_access)):
+    await require_board(access, task_data.board_id)
     task = Task(**task_data.model_dump())
-    doc = serialize_doc(task.model_dump())
-    await db.tasks.insert_one(doc)
+    doc = task_document(task)
+    await store.insert_task(doc)
+    await record_board_changes(board_change('task', 'created', doc, doc), counters=board_counter_changes((None, doc)))
     return task
 
+operation_actions = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}
+
+def prepare_bulk_operation(operation: BulkTaskOperation, existing: dict, board_ids: set, now: datetime):
+    """Turn one bulk operation into a store write (see bulk_write_tasks) and the resulting task document.
+
+    `existing` holds the current documents of every task targeted by the batch that the
+    user can see, and is updated in place, so later operations in the same batch see
+    earlier ones. Creates are limited to `board_ids`.
+    """
+    if operation.op == 'create':
+        task = Task(**TaskCreate(**(operation.data or {})).model_dump())
+        if task.board_id not in board_ids:
+            raise ValueError("Board not found")
+        doc = task_document(task)
+        return ('create', doc, None), doc
+
+    if not operation.id:
+        raise ValueError("Task id is required")
+    if operation.id not in existing:
+        raise ValueError("Task not found")
+
+    if operation.op == 'update':
+        update_data = {k: v for k, v in TaskUpdate(**(operation.data or {})).model_dump().items() if v is not None}
+        update_data['updated_at'] = now
+        existing[operation.id] = {**existing[operation.id], **update_data}
+        return ('update', existing[operation.id], update_data), existing[operation.id]
+
+    doc = existing.pop(operation.id)
+    return ('delete', doc, None), doc
+
+@api_router.post("/tasks/bulk", response_model=BulkTaskResponse)
+async def bulk_tasks(bulk_data: BulkTaskRequest, access: Access = Depends(get_access)):
+    operations = bulk_data.operations
+    if len(operations) > MAX_BULK_OPERATIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_OPERATIONS} operations per request")
+    
+    results = [{"index": i, "op": o.op, "id": o.id, "ok": False} for i, o in enumerate(operations)]
+    
+    # Load every task touched by an update/delete in a single query
+    target_ids = list({o.id for o in operations if o.op != 'create' and o.id})
+    docs = await store.find_tasks(target_ids) if target_ids else []
+    
+    # Tasks on boards the user cannot see count as missing
+    board_ids = [d['board_id'] for d in docs] + [(o.data or {}).get('board_id') for o in operations if o.op == 'create']
+    access = await covering_access(access, [b for b in board_ids if isinstance(b, str)])
+    existing = {d['id']: d for d in docs if d['board_id'] in access.board_ids}
+    
+    requests = []
+    request_index = []
+    written = {}
+    previous = {}
+    now = datetime.now(timezone.utc)
+    for i, operation in enumerate(operations):
+        previous[i] = existing.get(operation.id) if operation.op != 'create' else None
+        try:
+            write, doc = prepare_bulk_operation(operation, existing, access.board_ids, now)
+        except (ValidationError, ValueError) as e:
+            results[i]["error"] = str(e)
+            if bulk_data.ordered:
+                break
+            continue
+        requests.append(write)
+        request_index.append(i)
+        written[i] = doc
+        results[i]["id"] = doc['id']
+        if operation.op != 'delete':
+            results[i]["task"] = doc
+    
+    write_errors = await store.bulk_write_tasks(requests, ordered=bulk_data.ordered)
+    
+    # Ordered batches stop at the first failure; nothing after it was applied
+    first_failure = min(write_errors) if bulk_data.ordered and write_errors else None
+    for position, i in enumerate(request_index):
+        if position in write_errors:
+            results[i]["error"] = write_errors[position]
+        elif first_failure is not None and position > first_failure:
+            results[i]["error"] = "Skipped after an earlier failure"
+        else:
+            results[i]["ok"] = True
+            continue
+        results[i].pop("task", None)
+    
+    for result in results:
+        if not result["ok"] and "error" not in result:
+            result["error"] = "Skipped after an earlier failure"
+    
+    await record_board_changes(*[
+        board_change('task', operation_actions[operations[i].op], written[i], None if operations[i].op == 'delete' else written[i])
+        for i in request_index if results[i]["ok"]
+    ], counters=board_counter_changes(*[
+        (previous[i], None if operations[i].op == 'delete' else written[i])
+        for i in request_index if results[i]["ok"]
+    ]))
+    
+    succeeded = [r["op"] for r in results if r["ok"]]
+    return {
+        "ordered": bulk_data.ordered,
+        "inserted": succeeded.count('create'),
+        "updated": succeeded.count('update'),
+        "deleted": succeeded.count('delete'),
+        "failed": len(results) - len(succeeded),
+        "results": results
+    }
+
 @api_router.put("/tasks/{task_id}", response_model=Task)
-async def update_task(task_id: str, task_data: TaskUpdate, user_id: str = Depends(get_current_user)):
+async def update_task(task_id: str, task_data: TaskUpdate, access: Access = Depends(get_access)):
     update_data = {k: v for k, v in task_data.model_dump().items() if v is not None}
-    update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
+    update_data['updated_at'] = datetime.now(timezone.utc)
     
-    result = await db.tasks.update_one(
-        {"id": task_id},
-        {"$set": update_data}
-    )
+    previous_doc = await scoped_write(access, lambda board_ids: store.update_task(task_id, update_data, board_ids))
+    if not previous_doc:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task_doc = {**previous_doc, **update_data}
     
-    if result.matched_count == 0:
+    await record_board_changes(board_change('task', 'updated', task_doc, update_data), counters=board_counter_changes((previous_doc, task_doc)))
+    return serialize_doc(task_doc)
+
+@api_router.post("/tasks/{task_id}/move", response_model=Task)
+async def move_task(task_id: str, move: TaskMove, background_tasks: BackgroundTasks, access: Access = Depends(get_access)):
+    if task_id in (move.after_id, move.before_id):
+        raise HTTPException(status_code=400, detail="A task cannot be moved next to itself")
+    
+    ids = [i for i in (task_id, move.after_id, move.before_id) if i]
+    found = await store.find_tasks(ids)
+    access = await covering_access(access, [d['board_id'] for d in found])
+    docs = {d['id']: d for d in found if d['board_id'] in access.board_ids}
+    if task_id not in docs:
         raise HTTPException(status_code=404, detail="Task not found")
+    if any(i not in docs for i in ids):
+        raise HTTPException(status_code=400, detail="Neighbour task not found")
+    
+    task = docs[task_id]
+    after, before = docs.get(move.after_id), docs.get(move.before_id)
+    anchor = after or before
+    group_id = anchor['group_id'] if anchor else (move.group_id if 'group_id' in move.model_fields_set else task.get('group_id'))
+    if any(n['board_id'] != task['board_id'] or n.get('group_id') != group_id for n in (after, before) if n):
+        raise HTTPException(status_code=400, detail="Neighbours must be in the same board and group")
+    if after and before and task_sort_key(after) > task_sort_key(before):
+        raise HTTPException(status_code=400, detail="after_id must come before before_id")
+    if move.status_id and move.status_id not in {s['id'] for s in await read_through(task['board_id'], 'statuses', load_statuses)}:
+        raise HTTPException(status_code=400, detail="Status not found")
+    if not anchor and group_id and group_id not in {g['id'] for g in await read_through(task['board_id'], 'groups', load_groups)}:
+        raise HTTPException(status_code=400, detail="Group not found")
     
-    task_doc = await db.tasks.find_one({"id": task_id}, {"_id": 0})
+    lower, upper = await neighbour_orders(task, group_id, after, before)
+    order = midpoint_order(lower, upper)
+    if not order_fits(order, lower, upper):
+        # Neighbours share an order (tasks created without one all have 0) or sit closer than
+        # floats can split: renumber the group, then place the task between the new orders
+        await rebalance_task_orders(task['board_id'], group_id)
+        neighbours = {d['id']: d for d in await store.find_tasks([n['id'] for n in (after, before) if n])}
+        if any(n['id'] not in neighbours for n in (after, before) if n):
+            raise HTTPException(status_code=409, detail="A neighbour task changed, please retry the move")
+        after, before = neighbours.get(move.after_id), neighbours.get(move.before_id)
+        lower, upper = await neighbour_orders(task, group_id, after, before)
+        order = midpoint_order(lower, upper)
+    elif lower is not None and upper is not None and upper - lower < RANK_REBALANCE_GAP:
+        background_tasks.add_task(rebalance_task_orders, task['board_id'], group_id)
+    
+    update_data = {"order": order, "group_id": group_id, "updated_at": datetime.now(timezone.utc)}
+    if move.status_id:
+        update_data['status_id'] = move.status_id
+    previous_doc = await store.update_task(task_id, update_data)
+    if not previous_doc:
+        raise HTTPException(status_code=404, detail="Task not found")
+    task_doc = {**previous_doc, **update_data}
+    
+    await record_board_changes(board_change('task', 'updated', task_doc, update_data), counters=board_counter_changes((previous_doc, task_doc)))
     return serialize_doc(task_doc)
 
 @api_router.delete("/tasks/{task_id}")
-async def delete_task(task_id: str, user_id: str = Depends(get_current_user)):
-    result = await db.tasks.delete_one({"id": task_id})
-    if result.deleted_count == 0:
+async def delete_task(task_id: str, access: Access = Depends(get_access)):
+    task_doc = await scoped_write(access, lambda board_ids: store.delete_task(task_id, board_ids))
+    if not task_doc:
         raise HTTPException(status_code=404, detail="Task not found")
+    await record_board_changes(board_change('task', 'deleted', task_doc), counters=board_counter_changes((task_doc, None)))
     return {"message": "Task deleted"}
 
+@api_router.post("/tasks/{task_id}/restore", response_model=Task)
+async def restore_task(task_id: str, access: Access = Depends(get_access)):
+    update_data = {"updated_at": datetime.now(timezone.utc)}
+    task_doc = await scoped_write(access, lambda board_ids: store.restore_task(task_id, update_data, board_ids))
+    if not task_doc:
+        raise HTTPException(status_code=404, detail="Archived task not found")
+    await record_board_changes(board_change('task', 'restored', task_doc, task_doc), counters=board_counter_changes((None, task_doc)))
+    return serialize_doc(task_doc)
+
+# ============================================================================
+# ARCHIVE
+# ============================================================================
+
+async def archive_board_tasks(board_id: str, before: datetime) -> int:
+    """Move the board's completed tasks last updated before `before` to the archive"""
+    statuses = await store.list_statuses(board_id)
+    # On a single-status board the last status is also the first: nothing there is completed
+    if len(statuses) < 2:
+        return 0
+    done = done_status_id(statuses)
+    archived = 0
+    while True:
+        docs = await store.archive_tasks(board_id, done, before, ARCHIVE_BATCH_SIZE)
+        if docs:
+            archived += len(docs)
+            await record_board_changes(*[board_change('task', 'archived', doc) for doc in docs], counters=board_counter_changes(*[(doc, None) for doc in docs]))
+        if len(docs) < ARCHIVE_BATCH_SIZE:
+            return archived
+
+async def archive_completed_tasks() -> int:
+    """One archive pass over every board; returns how many tasks were moved"""
+    before = datetime.now(timezone.utc) - timedelta(days=ARCHIVE_AFTER_DAYS)
+    archived = 0
+    after_id = ''
+    while True:
+        board_ids = await store.list_board_ids(after_id, MAX_PAGE_SIZE)
+        for board_id in board_ids:
+            archived += await archive_board_tasks(board_id, before)
+        if len(board_ids) < MAX_PAGE_SIZE:
+            return archived
+        after_id = board_ids[-1]
+
+async def archive_worker():
+    while True:
+        try:
+            # The lease lasts one interval: whichever worker takes it makes this interval's pass
+            if await store.claim_lease('archive', ARCHIVE_INTERVAL_SECONDS):
+                archived = await archive_completed_tasks()
+                if archived:
+                    logger.info("Archived %d completed tasks", archived)
+        except Exception:
+            logger.exception("Archiving completed tasks failed; retrying on the next pass")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+# ============================================================================
+# SYNC ROUTES
+# ============================================================================
+
+def encode_sync_token(version: int) -> str:
+    raw = json.dumps([version, int(time.time())]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_sync_token(token: str) -> Optional[int]:
+    """Return the board version a token was issued at, or None when it is unusable or past retention"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        version, issued_at = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if isinstance(version, bool) or not isinstance(version, int) or isinstance(issued_at, bool) or not isinstance(issued_at, (int, float)):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if time.time() - issued_at > SYNC_RETENTION_DAYS * 86400 - SYNC_GAP_GRACE_SECONDS:
+        return None
+    return version
+
+@api_router.get("/sync", response_model=SyncResponse)
+async def sync_board(board_id: str, since: Optional[str] = None, access: Access = Depends(get_access)):
+    await require_board(access, board_id)
+    current = await store.board_version(board_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail="Board not found")
+    
+    version = decode_sync_token(since) if since else None
+    if version is None:
+        return {"board_id": board_id, "sync_token": encode_sync_token(current), "reset": True}
+    
+    changes = await store.changes_since(board_id, version, SYNC_MAX_CHANGES + 1)
+    if len(changes) > SYNC_MAX_CHANGES:
+        return {"board_id": board_id, "sync_token": encode_sync_token(current), "reset": True}
+    
+    # Advance the token only over contiguous versions: a missing one may be a write that has
+    # bumped the board but not yet logged its change. Entries past the gap are still returned.
+    token = version
+    gap_deadline = datetime.now(timezone.utc) - timedelta(seconds=SYNC_GAP_GRACE_SECONDS)
+    for change in changes:
+        if change['seq'] <= token + 1 or as_utc(change['at']) < gap_deadline:
+            token = max(token, change['seq'])
+        else:
+            break
+    
+    # Replay the log: the last action per document wins
+    latest = {}
+    reordered_groups = set()
+    for change in changes:
+        if change['entity'] == 'task' and change['action'] == 'reordered':
+            reordered_groups.add(change['id'])
+        else:
+            latest[(change['entity'], change['id'])] = change['action']
+    
+    # An archived task leaves the board like a deleted one
+    gone = ('deleted', 'archived')
+    changed = {entity: [i for (e, i), action in latest.items() if e == entity and action not in gone] for entity in ('task', 'group', 'status')}
+    deleted = {entity: [i for (e, i), action in latest.items() if e == entity and action in gone] for entity in ('task', 'group', 'status')}
+    
+    board_doc, tasks, reordered_tasks, groups, statuses = await asyncio.gather(
+        store.find_board(board_id) if ('board', board_id) in latest else asyncio.sleep(0),
+        store.find_tasks(changed['task']) if changed['task'] else asyncio.sleep(0, []),
+        store.list_group_tasks(board_id, list(reordered_groups)) if reordered_groups else asyncio.sleep(0, []),
+        store.find_groups(changed['group']) if changed['group'] else asyncio.sleep(0, []),
+        store.find_statuses(changed['status']) if changed['status'] else asyncio.sleep(0, []),
+    )
+    tasks = list({t['id']: t for t in tasks + reordered_tasks}.values())
+    
+    return {
+        "board_id": board_id,
+        "sync_token": encode_sync_token(token),
+        "board": serialize_doc(board_doc) if board_doc else None,
+        "tasks": [serialize_doc(t) for t in tasks],
+        "groups": [serialize_doc(g) for g in groups],
+        "statuses": [serialize_doc(s) for s in statuses],
+        "deleted": {"tasks": deleted['task'], "groups": deleted['group'], "statuses": deleted['status']}
+    }
+
+# ============================================================================
+# EVENT ROUTES
+# ============================================================================
+#
+# Clients subscribe to one board and receive the change events recorded by the write
+# handlers ({"type": "task.updated", "board_id", "id", "data"}, or a "batch" of them).
+# Browsers cannot set headers on WebSocket/EventSource requests, so both endpoints also
+# accept the JWT as a `token` query parameter. Fan-out is per process.
+
+async def stream_access(request, token: Optional[str], board_id: str) -> Access:
+    authorization = request.headers.get('authorization', '')
+    if not token and authorization.lower().startswith('bearer '):
+        token = authorization[7:]
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    return await require_board(await load_access(await decode_token(token)), board_id)
+
+@api_router.websocket("/boards/{board_id}/ws")
+async def board_events_websocket(websocket: WebSocket, board_id: str, token: Optional[str] = None):
+    try:
+        await stream_access(websocket, token, board_id)
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    
+    await websocket.accept()
+    queue = board_hub.subscribe(board_id)
+    
+    async def wait_for_disconnect():
+        while (await websocket.receive())['type'] != 'websocket.disconnect':
+            pass
+    
+    disconnected = asyncio.create_task(wait_for_disconnect())
+    try:
+        while True:
+            next_event = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({next_event, disconnected}, timeout=EVENT_HEARTBEAT_SECONDS, return_when=asyncio.FIRST_COMPLETED)
+            if next_event not in done:
+                next_event.cancel()
+            if disconnected in done:
+                break
+            event = next_event.result() if next_event in done else {"type": "ping"}
+            await websocket.send_text(dump_json(event).decode('utf-8'))
+    finally:
+        board_hub.unsubscribe(board_id, queue)
+        disconnected.cancel()
+
+@api_router.get("/boards/{board_id}/events")
+async def board_events_stream(board_id: str, request: Request, token: Optional[str] = None):
+    await stream_access(request, token, board_id)
+    queue = board_hub.subscribe(board_id)
+    
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': ping\n\n'
+                    continue
+                yield f"event: {event['type']}\ndata: {dump_json(event).decode('utf-8')}\n\n"
+        finally:
+            board_hub.unsubscribe(board_id, queue)
+    
+    return StreamingResponse(events(), media_type='text/event-stream', headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ============================================================================
+# SEARCH ROUTES
+# ============================================================================
+
+@api_router.get("/search/tasks", response_model=List[TaskSearchHit])
+async def search_tasks(
+    q: str,
+    board_id: Optional[str] = None,
+    workspace_id: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    access: Access = Depends(get_access)
+):
+    if board_id:
+        await require_board(access, board_id)
+        filters = {"board_id": board_id}
+    elif workspace_id:
+        access = await require_workspace(access, workspace_id)
+        filters = {"board_id": access.workspaces[workspace_id]}
+    else:
+        raise HTTPException(status_code=400, detail="board_id or workspace_id is required")
+    
+    # The store ranks every match and returns only the best
+    hits = await store.search_tasks(filters, search_terms(q), limit)
+    return [serialize_doc(hit) for hit in hits]
+
 # ============================================================================
 # SEED DATA ROUTE (for demo purposes)
 # ============================================================================
@@ -540,7 +1998,7 @@ async def delete_task(task_id: str, user_id: str = Depends(get_current_user)):
 @api_router.post("/seed-demo-data")
 async def seed_demo_data(user_id: str = Depends(get_current_user)):
     # Check if user already has workspaces
-    existing = await db.workspaces.find_one({"owner_id": user_id})
+    existing = await store.list_workspaces(user_id)
     if existing:
         return {"message": "Demo data already exists"}
     
@@ -552,7 +2010,6 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         color="#6366f1",
         icon="🚀"
     )
-    await db.workspaces.insert_one(serialize_doc(workspace1.model_dump()))
     
     workspace2 = Workspace(
         name="Marketing",
@@ -561,7 +2018,7 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         color="#ec4899",
         icon="📢"
     )
-    await db.workspaces.insert_one(serialize_doc(workspace2.model_dump()))
+    await store.insert_many('workspaces', [w.model_dump() for w in (workspace1, workspace2)])
     
     # Create boards for workspace 1
     board1 = Board(
@@ -571,7 +2028,6 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         color="#6366f1",
         icon="📋"
     )
-    await db.boards.insert_one(serialize_doc(board1.model_dump()))
     
     board2 = Board(
         workspace_id=workspace1.id,
@@ -580,7 +2036,6 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         color="#ef4444",
         icon="🐛"
     )
-    await db.boards.insert_one(serialize_doc(board2.model_dump()))
     
     # Create board for workspace 2
     board3 = Board(
@@ -590,7 +2045,7 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         color="#ec4899",
         icon="📅"
     )
-    await db.boards.insert_one(serialize_doc(board3.model_dump()))
+    await store.insert_many('boards', [b.model_dump() for b in (board1, board2, board3)])
     
     # Create statuses for board1
     statuses1 = [
@@ -599,8 +2054,6 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         Status(board_id=board1.id, name="Review", color="#a855f7", order=2),
         Status(board_id=board1.id, name="Done", color="#10b981", order=3)
     ]
-    for status in statuses1:
-        await db.statuses.insert_one(serialize_doc(status.model_dump()))
     
     # Create statuses for board2
     statuses2 = [
@@ -609,8 +2062,6 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         Status(board_id=board2.id, name="Testing", color="#f59e0b", order=2),
         Status(board_id=board2.id, name="Resolved", color="#10b981", order=3)
     ]
-    for status in statuses2:
-        await db.statuses.insert_one(serialize_doc(status.model_dump()))
     
     # Create statuses for board3
     statuses3 = [
@@ -619,18 +2070,13 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         Status(board_id=board3.id, name="Scheduled", color="#3b82f6", order=2),
         Status(board_id=board3.id, name="Published", color="#10b981", order=3)
     ]
-    for status in statuses3:
-        await db.statuses.insert_one(serialize_doc(status.model_dump()))
+    await store.insert_many('statuses', [s.model_dump() for s in statuses1 + statuses2 + statuses3])
     
     # Create groups for board1
     group1 = Group(board_id=board1.id, name="Frontend", order=0)
-    await db.groups.insert_one(serialize_doc(group1.model_dump()))
-    
     group2 = Group(board_id=board1.id, name="Backend", order=1)
-    await db.groups.insert_one(serialize_doc(group2.model_dump()))
-    
     group3 = Group(board_id=board1.id, name="Design", order=2)
-    await db.groups.insert_one(serialize_doc(group3.model_dump()))
+    await store.insert_many('groups', [g.model_dump() for g in (group1, group2, group3)])
     
     # Create tasks
     now = datetime.now(timezone.utc)
@@ -713,20 +2159,252 @@ async def seed_demo_data(user_id: str = Depends(get_current_user)):
         ),
     ]
     
-    for task in tasks:
-        await db.tasks.insert_one(serialize_doc(task.model_dump()))
+    await store.insert_many('tasks', [task_document(task) for task in tasks])
     
+    access_cache.invalidate(user_id)
     return {"message": "Demo data created successfully"}
 
+# ============================================================================
+# SYNTHETIC DATA GENERATOR (for load testing)
+# ============================================================================
+#
+# Builds documents shaped like the ones the routes write and streams them into the store with
+# chunked insert_many calls. Everything, ids included, comes from one seeded Random, so a
+# spec and seed always produce the same dataset. Through the API the Random is also seeded
+# with the caller's id, so two users never generate the same ids. `python generate_data.py`
+# is the CLI.
+
+GENERATOR_WORDS = [
+    'api', 'auth', 'billing', 'cache', 'checkout', 'dashboard', 'deploy', 'design', 'docs', 'email',
+    'export', 'filter', 'import', 'invoice', 'login', 'mobile', 'onboarding', 'payment', 'report', 'search',
+    'settings', 'signup', 'sync', 'upload', 'webhook'
+]
+GENERATOR_VERBS = ['Fix', 'Add', 'Update', 'Refactor', 'Test', 'Review', 'Document', 'Migrate', 'Remove', 'Investigate']
+GENERATOR_STATUSES = ['In Progress', 'Review', 'Testing', 'Blocked', 'On Hold', 'Ready']
+GENERATOR_COLORS = ['#94a3b8', '#3b82f6', '#a855f7', '#f59e0b', '#ef4444', '#ec4899', '#6366f1', '#10b981']
+GENERATOR_PRIORITIES = (['low', 'medium', 'high', 'critical'], list(itertools.accumulate([3, 5, 2, 0.5])))
+GENERATOR_COLLECTIONS = ['users', 'workspaces', 'boards', 'statuses', 'groups', 'tasks']  # parents first
+
+class BatchInserter:
+    """Buffers documents per collection and writes them with insert_many, one batch in flight"""
+
+    def __init__(self, store: Repository, batch_size: int = GENERATOR_BATCH_SIZE):
+        self.store = store
+        self.batch_size = batch_size
+        self.buffers: Dict[str, list] = {}
+        self.counts: Dict[str, int] = {}
+        self.pending: Optional[asyncio.Future] = None
+
+    async def add(self, collection: str, doc: dict):
+        buffer = self.buffers.setdefault(collection, [])
+        buffer.append(doc)
+        if len(buffer) >= self.batch_size:
+            await self.flush(collection)
+
+    async def flush(self, collection: str):
+        # Write the buffers this collection references first, so a foreign key never dangles
+        for parent in GENERATOR_COLLECTIONS[:GENERATOR_COLLECTIONS.index(collection)]:
+            await self.write(parent)
+        await self.write(collection)
+
+    async def write(self, collection: str):
+        docs = self.buffers.pop(collection, None)
+        if not docs:
+            return
+        # Build the next batch while this one is written
+        if self.pending is not None:
+            await self.pending
+        self.pending = asyncio.ensure_future(self.store.insert_many(collection, docs))
+        self.counts[collection] = self.counts.get(collection, 0) + len(docs)
+
+    async def close(self):
+        for collection in GENERATOR_COLLECTIONS:
+            await self.write(collection)
+        if self.pending is not None:
+            await self.pending
+            self.pending = None
+
+def seeded_id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+def seeded_time(rng: random.Random, min_days: float, max_days: float) -> datetime:
+    return GENERATOR_EPOCH + timedelta(days=rng.uniform(min_days, max_days))
+
+def board_task_counts(rng: random.Random, boards: int, tasks_per_board: int) -> List[int]:
+    """Split boards * tasks_per_board tasks over the boards with a Pareto (long-tailed) skew"""
+    weights = [rng.paretovariate(1.2) for _ in range(boards)]
+    total = boards * tasks_per_board
+    weight_sum = sum(weights)
+    counts = [int(total * w / weight_sum) for w in weights]
+    for i in range(total - sum(counts)):
+        counts[i % boards] += 1
+    return counts
+
+def board_statuses(count: int) -> List[str]:
+    """Status names for a generated board: To Do, some middle stages, Done"""
+    if count == 1:
+        return ['To Do']
+    middle = (GENERATOR_STATUSES * count)[:count - 2]
+    return ['To Do'] + middle + ['Done']
+
+def synthetic_task(rng: random.Random, board_id: str, groups: list, group_weights: list, statuses: list, status_weights: list) -> dict:
+    group = rng.choices(groups, cum_weights=group_weights)[0] if groups and rng.random() > 0.1 else None
+    title = [rng.choice(GENERATOR_VERBS)] + rng.sample(GENERATOR_WORDS, rng.randint(1, 3))
+    description = rng.choices(GENERATOR_WORDS, k=min(int(rng.lognormvariate(2.5, 1)), 200))
+    created_at = seeded_time(rng, -180, 0)
+    due_date = seeded_time(rng, -60, 90) if rng.random() > 0.2 else None
+    task = {
+        "id": seeded_id(rng),
+        "board_id": board_id,
+        "group_id": group['id'] if group else None,
+        "title": ' '.join(title),
+        "description": ' '.join(description) or None,
+        "status_id": rng.choices(statuses, cum_weights=status_weights)[0]['id'],
+        "priority": rng.choices(GENERATOR_PRIORITIES[0], cum_weights=GENERATOR_PRIORITIES[1])[0],
+        "start_date": seeded_time(rng, -70, 0) if due_date and rng.random() > 0.5 else None,
+        "due_date": due_date,
+        "order": 0.0,
+        "created_at": created_at,
+        "updated_at": created_at
+    }
+    task['search_terms'] = task_search_terms(task)
+    return task
+
+def planned_documents(spec: DatasetSpec) -> int:
+    """How many documents generate_dataset writes for spec (tasks_per_board is an average)"""
+    boards = max(spec.users, 1) * spec.workspaces_per_user * spec.boards_per_workspace
+    workspaces = max(spec.users, 1) * spec.workspaces_per_user
+    return spec.users + workspaces + boards * (1 + spec.groups_per_board + spec.statuses_per_board + spec.tasks_per_board)
+
+async def generate_dataset(spec: DatasetSpec, owner_id: Optional[str] = None) -> dict:
+    """Write the dataset described by spec; owner_id receives the workspaces when spec.users is 0"""
+    namespace = str(spec.seed) if owner_id is None else f"{spec.seed}-{owner_id}"
+    rng = random.Random(namespace)
+    writer = BatchInserter(store)
+    
+    owner_ids = [owner_id] if not spec.users else []
+    if spec.users:
+        password_hash = await run_password_job(hash_password, GENERATED_PASSWORD)
+        for n in range(spec.users):
+            user = {
+                "id": seeded_id(rng),
+                "email": f"loadtest-{namespace}-{n}@example.com",
+                "name": f"Load Test {n}",
+                "password_hash": password_hash,
+                "created_at": seeded_time(rng, -365, -180)
+            }
+            owner_ids.append(user['id'])
+            await writer.add('users', user)
+    
+    boards = len(owner_ids) * spec.workspaces_per_user * spec.boards_per_workspace
+    task_counts = iter(board_task_counts(rng, boards, spec.tasks_per_board))
+    
+    for owner in owner_ids:
+        for w in range(spec.workspaces_per_user):
+            workspace_id = seeded_id(rng)
+            await writer.add('workspaces', {
+                "id": workspace_id, "name": f"Workspace {w + 1}", "description": None, "owner_id": owner,
+                "color": rng.choice(GENERATOR_COLORS), "icon": '📁', "created_at": seeded_time(rng, -180, -90)
+            })
+            for b in range(spec.boards_per_workspace):
+                board_id = seeded_id(rng)
+                await writer.add('boards', {
+                    "id": board_id, "workspace_id": workspace_id, "name": f"Board {b + 1}", "description": None,
+                    "color": rng.choice(GENERATOR_COLORS), "icon": '📋', "created_at": seeded_time(rng, -180, -90)
+                })
+                statuses = [
+                    {"id": seeded_id(rng), "board_id": board_id, "name": name, "color": GENERATOR_COLORS[k % len(GENERATOR_COLORS)],
+                     "order": k, "created_at": seeded_time(rng, -180, -90)}
+                    for k, name in enumerate(board_statuses(spec.statuses_per_board))
+                ]
+                groups = [
+                    {"id": seeded_id(rng), "board_id": board_id, "name": f"Group {k + 1}", "order": k, "created_at": seeded_time(rng, -180, -90)}
+                    for k in range(spec.groups_per_board)
+                ]
+                for doc in statuses:
+                    await writer.add('statuses', doc)
+                for doc in groups:
+                    await writer.add('groups', doc)
+                
+                # Groups get Zipf-like shares of the tasks; most tasks sit at either end of the workflow
+                group_weights = list(itertools.accumulate(1 / (k + 1) for k in range(len(groups))))
+                status_weights = list(itertools.accumulate(3 if k in (0, len(statuses) - 1) else 1 for k in range(len(statuses))))
+                
+                # Tasks are numbered 0, 1, 2, ... within their group, as rebalance_task_orders leaves them
+                next_order = {}
+                for _ in range(next(task_counts)):
+                    task = synthetic_task(rng, board_id, groups, group_weights, statuses, status_weights)
+                    task['order'] = next_order[task['group_id']] = next_order.get(task['group_id'], -1.0) + 1
+                    await writer.add('tasks', task)
+    
+    await writer.close()
+    return {"seed": spec.seed, **writer.counts}
+
+@api_router.post("/generate-data", response_model=DatasetSummary)
+async def generate_data(spec: DatasetSpec, user_id: str = Depends(get_current_user)):
+    if not DATA_GENERATOR_ENABLED:
+        raise HTTPException(status_code=403, detail="Data generator is disabled")
+    if planned_documents(spec) > GENERATOR_MAX_DOCUMENTS:
+        raise HTTPException(status_code=400, detail=f"At most {GENERATOR_MAX_DOCUMENTS} documents per request; use generate_data.py for more")
+    summary = await generate_dataset(spec, owner_id=user_id)
+    access_cache.invalidate(user_id)
+    return summary
+
 # Include the router in the main app
 app.include_router(api_router)
 
+@app.exception_handler(StorageError)
+async def storage_error(request: Request, exc: StorageError):
+    """A write the store rejected, e.g. a task referencing a group that does not exist"""
+    return JSONResponse(status_code=409 if isinstance(exc, DuplicateKey) else 400, content={"detail": str(exc)})
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus scrape endpoint: route latency, Mongo command and pool timing, bcrypt and encoding time"""
+    return Response(metrics.render(), media_type='text/plain; version=0.0.4; charset=utf-8')
+
+def route_cost_class(method: str, route: str) -> Optional[RouteClass]:
+    name = ROUTE_COST_CLASSES.get(route, 'read' if method in ('GET', 'HEAD', 'OPTIONS') else 'write')
+    return ROUTE_CLASSES[name] if name else None
+
+def client_address(scope) -> str:
+    """The address TRUSTED_PROXY_HEADER names, else the connection's peer"""
+    if TRUSTED_PROXY_HEADER:
+        values = [value for name, value in scope['headers'] if name == TRUSTED_PROXY_HEADER]
+        if values:
+            # The proxy appends the address it saw; anything before it came from the client
+            return values[-1].decode('latin-1').rsplit(',', 1)[-1].strip()
+    client = scope.get('client')
+    return client[0] if client else ''
+
+def rate_limit_key(scope) -> str:
+    """The user of an already verified bearer token, else the client address"""
+    for name, value in scope['headers']:
+        if name == b'authorization' and value[:7].lower() == b'bearer ':
+            user_id = token_cache.peek(token_digest(value[7:].decode('latin-1')))
+            if user_id:
+                return f"user:{user_id}"
+    return f"addr:{client_address(scope)}"
+
+# Added before the metrics middleware, so it runs inside it and shed requests are counted
+if ADMISSION_CONTROL:
+    app.add_middleware(
+        AdmissionMiddleware,
+        classify=route_cost_class,
+        client_key=rate_limit_key,
+        buckets=TokenBuckets(RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_CLIENTS),
+        queue_timeout=ADMISSION_QUEUE_TIMEOUT
+    )
+
+app.add_middleware(metrics.MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Truncated", "ETag", "Retry-After"],
 )
 
 # Configure logging
@@ -736,6 +2414,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def setup_database():
+    if FAST_RESPONSES and orjson is None:
+        logger.warning("FAST_RESPONSES is on but orjson is not installed; responses are encoded with the json module")
+    await store.migrate()
+    store.start()
+    app.state.archive_worker = asyncio.create_task(archive_worker()) if ARCHIVE_AFTER_DAYS > 0 else None
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    if app.state.archive_worker is not None:
+        app.state.archive_worker.cancel()
+    store.stop()
+    store.close()
+    password_pool.shutdown(wait=False)
@@ -0,0 +1,782 @@
+"""SQL storage backend.
+
+Implements the Repository of repository.py on SQLite (the standard library's
+sqlite3). Tables, columns and foreign keys follow the MySQL DDL in
+DATABASE_SCHEMA.md; indexes carry the names of the MongoDB ones, prefixed with their
+table because SQLite index names are global. Work the document store spreads over
+several round trips or a background job is a single statement here: deleting a
+workspace or board cascades through ON DELETE CASCADE, deleting a group or status
+clears it from tasks through ON DELETE SET NULL, and board statistics are one
+GROUP BY over the board's index.
+
+Archived tasks live in tasks_archive, the tasks columns plus archived_at. Only the
+board is a foreign key there: a group or status deleted while a task is archived is
+cleared when the task is restored.
+
+Search uses task_terms, one row per (task, word), in place of the FULLTEXT index;
+a query term matches by a range scan over (board_id, term), like the prefix regex
+on the MongoDB search_terms index.
+
+Timestamps are TEXT in one fixed UTC form (isoformat with microseconds and +00:00),
+so comparing the strings compares the instants and date ranges use the indexes.
+Rows come back with datetime columns parsed. `PRAGMA user_version` records which
+one-off data migrations a database file has been through.
+
+sqlite3 blocks, so every call runs on one thread that owns the connection; calls
+run one at a time and each write is one transaction.
+"""
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone, timedelta
+from typing import Callable, Collection, Dict, List, Optional, Tuple, Union
+
+from repository import Repository, DuplicateKey, ConstraintViolation, MISSING_REFERENCE, TASK_RANGE_FILTERS, as_utc, parse_datetime, task_search_terms
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    digest TEXT PRIMARY KEY,
+    expires_at TEXT NOT NULL
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS workspaces (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT,
+    owner_id TEXT NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    color TEXT DEFAULT '#6366f1',
+    icon TEXT DEFAULT '📁',
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS workspaces_idx_owner ON workspaces (owner_id);
+
+CREATE TABLE IF NOT EXISTS boards (
+    id TEXT PRIMARY KEY,
+    workspace_id TEXT NOT NULL REFERENCES workspaces(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    description TEXT,
+    color TEXT DEFAULT '#6366f1',
+    icon TEXT DEFAULT '📋',
+    created_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS boards_idx_workspace ON boards (workspace_id);
+
+CREATE TABLE IF NOT EXISTS "groups" (
+    id TEXT PRIMARY KEY,
+    board_id TEXT NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    "order" INTEGER DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS groups_idx_board_order ON "groups" (board_id, "order");
+
+CREATE TABLE IF NOT EXISTS statuses (
+    id TEXT PRIMARY KEY,
+    board_id TEXT NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    color TEXT NOT NULL,
+    "order" INTEGER DEFAULT 0,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS statuses_idx_board_order ON statuses (board_id, "order");
+
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    board_id TEXT NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+    group_id TEXT REFERENCES "groups"(id) ON DELETE SET NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    status_id TEXT REFERENCES statuses(id) ON DELETE SET NULL,
+    priority TEXT DEFAULT 'medium' CHECK (priority IN ('low', 'medium', 'high', 'critical')),
+    start_date TEXT,
+    due_date TEXT,
+    "order" REAL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_idx_board_order ON tasks (board_id, "order", id);
+CREATE INDEX IF NOT EXISTS tasks_idx_group_order ON tasks (group_id, "order", id);
+CREATE INDEX IF NOT EXISTS tasks_idx_status ON tasks (status_id);
+CREATE INDEX IF NOT EXISTS tasks_idx_board_due ON tasks (board_id, due_date);
+CREATE INDEX IF NOT EXISTS tasks_idx_board_start ON tasks (board_id, start_date);
+
+CREATE TABLE IF NOT EXISTS tasks_archive (
+    id TEXT PRIMARY KEY,
+    board_id TEXT NOT NULL REFERENCES boards(id) ON DELETE CASCADE,
+    group_id TEXT,
+    title TEXT NOT NULL,
+    description TEXT,
+    status_id TEXT,
+    priority TEXT DEFAULT 'medium',
+    start_date TEXT,
+    due_date TEXT,
+    "order" REAL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    archived_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_archive_idx_board_order ON tasks_archive (board_id, "order", id);
+
+CREATE TABLE IF NOT EXISTS task_terms (
+    task_id TEXT NOT NULL REFERENCES tasks(id) ON DELETE CASCADE,
+    board_id TEXT NOT NULL,
+    term TEXT NOT NULL,
+    PRIMARY KEY (task_id, term)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS task_terms_idx_search ON task_terms (board_id, term);
+
+CREATE TABLE IF NOT EXISTS board_changes (
+    board_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    entity TEXT NOT NULL,
+    action TEXT NOT NULL,
+    id TEXT,
+    at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS board_changes_idx_board_seq ON board_changes (board_id, seq);
+CREATE INDEX IF NOT EXISTS board_changes_idx_at ON board_changes (at);
+
+CREATE TABLE IF NOT EXISTS job_leases (
+    name TEXT PRIMARY KEY,
+    locked_until TEXT NOT NULL
+);
+"""
+
+COLUMNS = {
+    "users": ('id', 'email', 'name', 'password_hash', 'created_at'),
+    "workspaces": ('id', 'name', 'description', 'owner_id', 'color', 'icon', 'created_at'),
+    "boards": ('id', 'workspace_id', 'name', 'description', 'color', 'icon', 'created_at'),
+    "groups": ('id', 'board_id', 'name', 'order', 'created_at'),
+    "statuses": ('id', 'board_id', 'name', 'color', 'order', 'created_at'),
+    "tasks": ('id', 'board_id', 'group_id', 'title', 'description', 'status_id', 'priority',
+              'start_date', 'due_date', 'order', 'created_at', 'updated_at'),
+    "board_changes": ('board_id', 'seq', 'entity', 'action', 'id', 'at'),
+}
+COLUMNS["tasks_archive"] = COLUMNS["tasks"] + ('archived_at',)
+TASK_FILTERS = ('board_id', 'group_id', 'status_id', 'priority')
+DATETIME_COLUMNS = {'created_at', 'updated_at', 'start_date', 'due_date', 'at', 'archived_at'}
+RANGE_OPERATORS = {'$lt': '<', '$gte': '>=', '$ne': 'IS NOT'}
+SCHEMA_VERSION = 1  # user_version once every data migration below has run
+CHANGE_PURGE_SECONDS = 3600  # how often log_changes drops entries past retention
+
+
+def quoted(names) -> str:
+    return ', '.join(f'"{name}"' for name in names)
+
+
+def select(table: str, columns=None) -> str:
+    return f'SELECT {quoted(columns or COLUMNS[table])} FROM "{table}"'
+
+
+def select_fields(table: str, fields: Optional[Collection[str]]) -> str:
+    """SELECT only the requested columns (all of them when fields is None)"""
+    if fields is None:
+        return select(table)
+    return select(table, [c for c in COLUMNS[table] if c in fields])
+
+
+def sql_value(value):
+    if isinstance(value, datetime):
+        return as_utc(value).astimezone(timezone.utc).isoformat(timespec='microseconds')
+    return value
+
+
+def from_row(row: sqlite3.Row) -> dict:
+    doc = dict(row)
+    for column in DATETIME_COLUMNS.intersection(doc):
+        if doc[column] is not None:
+            doc[column] = datetime.fromisoformat(doc[column])
+    return doc
+
+
+def placeholders(values) -> str:
+    return ', '.join('?' * len(values))
+
+
+def equals(column: str, value) -> Tuple[str, list]:
+    """A WHERE clause matching value, where None matches NULL like a missing field in MongoDB"""
+    if value is None:
+        return f'"{column}" IS NULL', []
+    if isinstance(value, list):
+        return f'"{column}" IN ({placeholders(value)})', list(value)
+    return f'"{column}" = ?', [value]
+
+
+def by_id(doc_id: str, board_ids: Optional[Collection[str]]) -> Tuple[str, list]:
+    """A WHERE clause matching one row by id, only inside board_ids when a scope is given"""
+    if board_ids is None:
+        return "id = ?", [doc_id]
+    board_ids = list(board_ids)
+    return f"id = ? AND board_id IN ({placeholders(board_ids)})", [doc_id] + board_ids
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def storage_error(e: sqlite3.IntegrityError) -> Exception:
+    message = str(e)
+    if message.startswith('UNIQUE') or 'PRIMARY KEY' in message:
+        return DuplicateKey(message)
+    if 'FOREIGN KEY' in message:
+        return ConstraintViolation(MISSING_REFERENCE)
+    return ConstraintViolation(message)
+
+
+def insert_rows(conn: sqlite3.Connection, table: str, docs: List[dict]):
+    columns = COLUMNS[table]
+    conn.executemany(
+        f'INSERT INTO "{table}" ({quoted(columns)}) VALUES ({placeholders(columns)})',
+        [tuple(sql_value(doc.get(c)) for c in columns) for doc in docs]
+    )
+    if table == 'tasks':
+        insert_terms(conn, docs)
+
+
+def insert_terms(conn: sqlite3.Connection, docs: List[dict]):
+    conn.executemany(
+        "INSERT INTO task_terms (task_id, board_id, term) VALUES (?, ?, ?)",
+        [(doc['id'], doc['board_id'], term) for doc in docs for term in (doc.get('search_terms') or task_search_terms(doc))]
+    )
+
+
+def update_row(conn: sqlite3.Connection, table: str, row_id: str, data: dict, extra: str = '') -> int:
+    """UPDATE the known columns in data; returns the number of rows changed"""
+    columns = [c for c in data if c in COLUMNS[table] and c != 'id']
+    assignments = [f'"{c}" = ?' for c in columns] + ([extra] if extra else [])
+    if not assignments:
+        return conn.execute(f'SELECT COUNT(*) FROM "{table}" WHERE id = ?', (row_id,)).fetchone()[0]
+    cursor = conn.execute(
+        f'UPDATE "{table}" SET {", ".join(assignments)} WHERE id = ?',
+        [sql_value(data[c]) for c in columns] + [row_id]
+    )
+    return cursor.rowcount
+
+
+def fetch_one(conn: sqlite3.Connection, sql: str, params=()) -> Optional[dict]:
+    row = conn.execute(sql, params).fetchone()
+    return from_row(row) if row else None
+
+
+def fetch_all(conn: sqlite3.Connection, sql: str, params=()) -> List[dict]:
+    return [from_row(row) for row in conn.execute(sql, params)]
+
+
+def normalize_datetimes(conn: sqlite3.Connection):
+    """Rewrite timestamps stored by earlier versions (isoformat without fixed
+    microseconds, naive or in other offsets) in the canonical form"""
+    for table, columns in COLUMNS.items():
+        for column in DATETIME_COLUMNS.intersection(columns):
+            rows = conn.execute(f'SELECT rowid, "{column}" FROM "{table}" WHERE "{column}" IS NOT NULL').fetchall()
+            conn.executemany(
+                f'UPDATE "{table}" SET "{column}" = ? WHERE rowid = ?',
+                [(sql_value(parse_datetime(value)), rowid) for rowid, value in rows]
+            )
+
+
+def task_where(filters: dict, search: Optional[List[str]], after: Optional[tuple]) -> Tuple[List[str], list]:
+    clauses, params = [], []
+    for field, value in filters.items():
+        if field in TASK_RANGE_FILTERS:
+            column, op = TASK_RANGE_FILTERS[field]
+            clauses.append(f'"{column}" {RANGE_OPERATORS[op]} ?')
+            params.append(sql_value(value))
+            continue
+        if field not in TASK_FILTERS:
+            raise ValueError(f"Cannot filter tasks by {field}")
+        clause, values = equals(field, value)
+        clauses.append(clause)
+        params += values
+    for term in search or ():
+        # Every word starting with term sorts between term and term + the highest code point
+        subquery = "SELECT task_id FROM task_terms WHERE term >= ? AND term < ?"
+        term_params = [term, term + '\U0010ffff']
+        if 'board_id' in filters:
+            clause, values = equals('board_id', filters['board_id'])
+            subquery += f" AND {clause}"
+            term_params += values
+        clauses.append(f"id IN ({subquery})")
+        params += term_params
+    if after:
+        clauses.append('("order", id) > (?, ?)')
+        params += list(after)
+    return clauses, params
+
+
+class SqlRepository(Repository):
+    """Rows in a SQLite database file (or ":memory:")"""
+
+    def __init__(self, path: str, on_board_removed: Optional[Callable[[str], None]] = None, sync_retention_days: int = 30):
+        self.path = path
+        self.on_board_removed = on_board_removed
+        self.sync_retention_days = sync_retention_days
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self.conn: Optional[sqlite3.Connection] = None
+        self.purged_at = 0.0
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute("PRAGMA foreign_keys = ON")
+        return conn
+
+    def call(self, func, args):
+        if self.conn is None:
+            self.conn = self.connect()
+        try:
+            return func(self.conn, *args)
+        except sqlite3.IntegrityError as e:
+            raise storage_error(e)
+
+    async def run(self, func, *args):
+        """Run func(connection, *args) on the connection's thread"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.call, func, args)
+
+    async def migrate(self):
+        def migrate(conn):
+            conn.executescript(SCHEMA)
+            if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+                with transaction(conn):
+                    normalize_datetimes(conn)
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        await self.run(migrate)
+
+    def close(self):
+        if self.conn is not None:
+            self.executor.submit(self.conn.close).result()
+            self.conn = None
+        self.executor.shutdown(wait=True)
+
+    # Users
+
+    async def find_user(self, user_id: str) -> Optional[dict]:
+        return await self.run(fetch_one, select('users') + " WHERE id = ?", (user_id,))
+
+    async def find_user_by_email(self, email: str) -> Optional[dict]:
+        return await self.run(fetch_one, select('users') + " WHERE email = ?", (email,))
+
+    async def insert_user(self, doc: dict):
+        await self.insert_many('users', [doc])
+
+    async def set_password_hash(self, user_id: str, password_hash: str):
+        await self.run(update_row, 'users', user_id, {"password_hash": password_hash})
+
+    async def revoke_token(self, digest: str, expires_at: datetime):
+        def revoke(conn):
+            with transaction(conn):
+                # Logouts are rare: dropping expired records here keeps the table small
+                conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (sql_value(datetime.now(timezone.utc)),))
+                conn.execute("INSERT OR REPLACE INTO revoked_tokens (digest, expires_at) VALUES (?, ?)", (digest, sql_value(expires_at)))
+        await self.run(revoke)
+
+    async def is_token_revoked(self, digest: str) -> bool:
+        sql = "SELECT 1 FROM revoked_tokens WHERE digest = ? AND expires_at > ?"
+        return await self.run(lambda conn: conn.execute(sql, (digest, sql_value(datetime.now(timezone.utc)))).fetchone() is not None)
+
+    # Workspaces
+
+    async def list_workspaces(self, owner_id: str, fields: Optional[Collection[str]] = None) -> List[dict]:
+        return await self.run(fetch_all, select_fields('workspaces', fields) + " WHERE owner_id = ? LIMIT 1000", (owner_id,))
+
+    async def find_workspace(self, workspace_id: str, owner_id: str) -> Optional[dict]:
+        return await self.run(fetch_one, select('workspaces') + " WHERE id = ? AND owner_id = ?", (workspace_id, owner_id))
+
+    async def insert_workspace(self, doc: dict):
+        await self.insert_many('workspaces', [doc])
+
+    async def update_workspace(self, workspace_id: str, owner_id: str, data: dict) -> Optional[dict]:
+        def update(conn):
+            with transaction(conn):
+                if not fetch_one(conn, "SELECT id FROM workspaces WHERE id = ? AND owner_id = ?", (workspace_id, owner_id)):
+                    return None
+                update_row(conn, 'workspaces', workspace_id, data)
+                return fetch_one(conn, select('workspaces') + " WHERE id = ?", (workspace_id,))
+        return await self.run(update)
+
+    async def delete_workspace(self, workspace_id: str, owner_id: str) -> bool:
+        def delete(conn):
+            with transaction(conn):
+                board_ids = [row[0] for row in conn.execute(
+                    "SELECT b.id FROM boards b JOIN workspaces w ON w.id = b.workspace_id WHERE w.id = ? AND w.owner_id = ?",
+                    (workspace_id, owner_id)
+                )]
+                deleted = conn.execute("DELETE FROM workspaces WHERE id = ? AND owner_id = ?", (workspace_id, owner_id)).rowcount
+                return deleted, board_ids
+        deleted, board_ids = await self.run(delete)
+        if self.on_board_removed is not None:
+            for board_id in board_ids:
+                self.on_board_removed(board_id)
+        return bool(deleted)
+
+    async def access_index(self, owner_id: str) -> Dict[str, List[str]]:
+        def load(conn):
+            index = {}
+            rows = conn.execute(
+                "SELECT w.id, b.id FROM workspaces w LEFT JOIN boards b ON b.workspace_id = w.id WHERE w.owner_id = ?",
+                (owner_id,)
+            )
+            for workspace_id, board_id in rows:
+                boards = index.setdefault(workspace_id, [])
+                if board_id is not None:
+                    boards.append(board_id)
+            return index
+        return await self.run(load)
+
+    # Boards
+
+    async def list_boards(self, workspace_id: Union[str, List[str]], fields: Optional[Collection[str]] = None) -> List[dict]:
+        clause, params = equals('workspace_id', workspace_id)
+        return await self.run(fetch_all, select_fields('boards', fields) + f" WHERE {clause} LIMIT 1000", params)
+
+    async def list_board_ids(self, after_id: str, limit: int) -> List[str]:
+        rows = await self.run(fetch_all, "SELECT id FROM boards WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+        return [row['id'] for row in rows]
+
+    async def find_board(self, board_id: str) -> Optional[dict]:
+        return await self.run(fetch_one, select('boards') + " WHERE id = ?", (board_id,))
+
+    async def board_version(self, board_id: str) -> Optional[int]:
+        row = await self.run(fetch_one, "SELECT version FROM boards WHERE id = ?", (board_id,))
+        return row['version'] if row else None
+
+    async def insert_board(self, doc: dict, statuses: List[dict]):
+        def insert(conn):
+            with transaction(conn):
+                insert_rows(conn, 'boards', [doc])
+                insert_rows(conn, 'statuses', statuses)
+        await self.run(insert)
+
+    async def update_board(self, board_id: str, data: dict) -> Optional[Tuple[dict, int]]:
+        def update(conn):
+            with transaction(conn):
+                if not update_row(conn, 'boards', board_id, data, extra="version = version + 1"):
+                    return None
+                board = fetch_one(conn, select('boards', COLUMNS['boards'] + ('version',)) + " WHERE id = ?", (board_id,))
+                return board, board.pop('version')
+        return await self.run(update)
+
+    async def delete_board(self, board_id: str) -> bool:
+        # Groups, statuses and tasks go with it through ON DELETE CASCADE
+        return bool(await self.run(lambda conn: conn.execute("DELETE FROM boards WHERE id = ?", (board_id,)).rowcount))
+
+    async def bump_board_versions(self, board_ids: List[str], counters: Optional[Dict[str, Dict[str, int]]] = None) -> Dict[str, int]:
+        # Statistics are always aggregated here, so there are no counters to adjust
+        def bump(conn):
+            with transaction(conn):
+                conn.execute(f"UPDATE boards SET version = version + 1 WHERE id IN ({placeholders(board_ids)})", board_ids)
+                return dict(conn.execute(f"SELECT id, version FROM boards WHERE id IN ({placeholders(board_ids)})", board_ids).fetchall())
+        return await self.run(bump) if board_ids else {}
+
+    # Groups and statuses
+
+    async def list_groups(self, board_id: str) -> List[dict]:
+        return await self.run(fetch_all, select('groups') + ' WHERE board_id = ? ORDER BY "order" LIMIT 1000', (board_id,))
+
+    async def find_groups(self, group_ids: List[str]) -> List[dict]:
+        return await self.run(fetch_all, select('groups') + f" WHERE id IN ({placeholders(group_ids)})", group_ids)
+
+    async def insert_group(self, doc: dict):
+        await self.insert_many('groups', [doc])
+
+    async def update_group(self, group_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        return await self.run(self.update_returning_previous, 'groups', group_id, data, board_ids)
+
+    async def delete_group(self, group_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[Tuple[dict, List[str]]]:
+        return await self.run(self.delete_detaching_tasks, 'groups', 'group_id', group_id, board_ids)
+
+    async def list_statuses(self, board_id: str) -> List[dict]:
+        return await self.run(fetch_all, select('statuses') + ' WHERE board_id = ? ORDER BY "order" LIMIT 1000', (board_id,))
+
+    async def find_statuses(self, status_ids: List[str]) -> List[dict]:
+        return await self.run(fetch_all, select('statuses') + f" WHERE id IN ({placeholders(status_ids)})", status_ids)
+
+    async def insert_status(self, doc: dict):
+        await self.insert_many('statuses', [doc])
+
+    async def update_status(self, status_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        return await self.run(self.update_returning_previous, 'statuses', status_id, data, board_ids)
+
+    async def delete_status(self, status_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[Tuple[dict, List[str]]]:
+        return await self.run(self.delete_detaching_tasks, 'statuses', 'status_id', status_id, board_ids)
+
+    @staticmethod
+    def update_returning_previous(conn, table: str, row_id: str, data: dict, board_ids: Optional[Collection[str]]) -> Optional[dict]:
+        clause, params = by_id(row_id, board_ids)
+        with transaction(conn):
+            previous = fetch_one(conn, select(table) + f" WHERE {clause}", params)
+            if previous is not None:
+                update_row(conn, table, row_id, data)
+            return previous
+
+    @staticmethod
+    def delete_detaching_tasks(conn, table: str, task_column: str, row_id: str, board_ids: Optional[Collection[str]]) -> Optional[Tuple[dict, List[str]]]:
+        clause, params = by_id(row_id, board_ids)
+        with transaction(conn):
+            doc = fetch_one(conn, f'SELECT id, board_id FROM "{table}" WHERE {clause}', params)
+            if doc is None:
+                return None
+            # ON DELETE SET NULL clears the reference from these tasks
+            task_ids = [row[0] for row in conn.execute(f"SELECT id FROM tasks WHERE {task_column} = ?", (row_id,))]
+            conn.execute(f'DELETE FROM "{table}" WHERE id = ?', (row_id,))
+            return doc, task_ids
+
+    # Tasks
+
+    async def list_tasks(self, filters: dict, search: Optional[List[str]] = None, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> List[dict]:
+        if search is not None and not search:
+            return []
+        clauses, params = task_where(filters, search, after)
+        sql = select_fields('tasks', fields)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += ' ORDER BY "order", id LIMIT ?'
+        return await self.run(fetch_all, sql, params + [limit or -1])
+
+    async def search_tasks(self, filters: dict, search: List[str], limit: int) -> List[dict]:
+        if not search:
+            return []
+        # One row per (word, term) pair where the word starts with the term, as in task_where;
+        # a task matches when every term has a pair
+        terms = " UNION ALL ".join(["SELECT ? AS term, ? AS upper"] * len(search))
+        hits = ("SELECT task_id, SUM(CASE WHEN task_terms.term = q.term THEN 2 ELSE 1 END) AS score"
+                f" FROM ({terms}) AS q JOIN task_terms ON task_terms.term >= q.term AND task_terms.term < q.upper")
+        params = [value for term in search for value in (term, term + '\U0010ffff')]
+        if 'board_id' in filters:
+            clause, values = equals('board_id', filters['board_id'])
+            hits += f" WHERE {clause}"
+            params += values
+        hits += " GROUP BY task_id HAVING COUNT(DISTINCT q.term) = ?"
+        params.append(len(set(search)))
+        clauses, where_params = task_where(filters, None, None)
+        sql = f'SELECT {quoted(COLUMNS["tasks"])}, score FROM tasks JOIN ({hits}) AS hits ON hits.task_id = tasks.id'
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += ' ORDER BY score DESC, "order", id LIMIT ?'
+        return await self.run(fetch_all, sql, params + where_params + [limit])
+
+    async def list_timeline(self, board_id: str, start: datetime, end: datetime, limit: int) -> List[dict]:
+        # One indexed range per branch, as in MongoDB's timeline_filter
+        start, end = sql_value(start), sql_value(end)
+        sql = " UNION ALL ".join([
+            select('tasks') + " WHERE board_id = ? AND due_date >= ? AND due_date < ?",
+            select('tasks') + " WHERE board_id = ? AND due_date >= ? AND start_date < ?",
+            select('tasks') + " WHERE board_id = ? AND due_date IS NULL AND start_date >= ? AND start_date < ?",
+        ]) + " ORDER BY due_date, id LIMIT ?"
+        params = (board_id, start, end, board_id, end, end, board_id, start, end, limit)
+        return await self.run(fetch_all, sql, params)
+
+    async def find_task(self, task_id: str) -> Optional[dict]:
+        return await self.run(fetch_one, select('tasks') + " WHERE id = ?", (task_id,))
+
+    async def find_tasks(self, task_ids: List[str]) -> List[dict]:
+        return await self.run(fetch_all, select('tasks') + f" WHERE id IN ({placeholders(task_ids)})", task_ids)
+
+    async def list_group_tasks(self, board_id: str, group_ids: List[str]) -> List[dict]:
+        # None stands for the ungrouped tasks, which IN would not match
+        ids = [g for g in group_ids if g is not None]
+        sql = select('tasks') + f" WHERE board_id = ? AND (group_id IN ({placeholders(ids)})"
+        sql += " OR group_id IS NULL)" if None in group_ids else ")"
+        return await self.run(fetch_all, sql, [board_id] + ids)
+
+    async def insert_task(self, doc: dict):
+        await self.insert_many('tasks', [doc])
+
+    @staticmethod
+    def write_task_update(conn, task: dict, data: dict):
+        update_row(conn, 'tasks', task['id'], data)
+        if 'title' in data or 'description' in data:
+            conn.execute("DELETE FROM task_terms WHERE task_id = ?", (task['id'],))
+            insert_terms(conn, [task])
+
+    async def update_task(self, task_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        clause, params = by_id(task_id, board_ids)
+
+        def update(conn):
+            with transaction(conn):
+                previous = fetch_one(conn, select('tasks') + f" WHERE {clause}", params)
+                if previous is not None:
+                    self.write_task_update(conn, {**previous, **data}, data)
+                return previous
+        return await self.run(update)
+
+    async def delete_task(self, task_id: str, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        clause, params = by_id(task_id, board_ids)
+
+        def delete(conn):
+            with transaction(conn):
+                doc = fetch_one(conn, f"SELECT id, board_id, group_id, status_id, priority FROM tasks WHERE {clause}", params)
+                if doc is not None:
+                    conn.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+                return doc
+        return await self.run(delete)
+
+    async def bulk_write_tasks(self, writes: List[tuple], ordered: bool) -> Dict[int, str]:
+        def write(conn):
+            errors = {}
+            with transaction(conn):
+                for position, (op, doc, data) in enumerate(writes):
+                    # Each write gets a savepoint, so a failed one leaves the others in place
+                    conn.execute("SAVEPOINT bulk_write")
+                    try:
+                        if op == 'create':
+                            insert_rows(conn, 'tasks', [doc])
+                        elif op == 'update':
+                            self.write_task_update(conn, doc, data)
+                        else:
+                            conn.execute("DELETE FROM tasks WHERE id = ?", (doc['id'],))
+                    except sqlite3.IntegrityError as e:
+                        conn.execute("ROLLBACK TO bulk_write")
+                        errors[position] = str(storage_error(e))
+                    conn.execute("RELEASE bulk_write")
+                    if errors and ordered:
+                        break
+            return errors
+        return await self.run(write) if writes else {}
+
+    async def order_after(self, board_id: str, group_id: Optional[str], exclude_id: str, key: tuple) -> Optional[float]:
+        group_clause, group_params = equals('group_id', group_id)
+        row = await self.run(
+            fetch_one,
+            f'SELECT "order" FROM tasks WHERE board_id = ? AND {group_clause} AND id != ? AND ("order", id) > (?, ?) ORDER BY "order", id LIMIT 1',
+            [board_id] + group_params + [exclude_id, *key]
+        )
+        return row['order'] if row else None
+
+    async def order_before(self, board_id: str, group_id: Optional[str], exclude_id: str, key: Optional[tuple] = None) -> Optional[float]:
+        group_clause, group_params = equals('group_id', group_id)
+        sql = f'SELECT "order" FROM tasks WHERE board_id = ? AND {group_clause} AND id != ?'
+        params = [board_id] + group_params + [exclude_id]
+        if key is not None:
+            sql += ' AND ("order", id) < (?, ?)'
+            params += list(key)
+        row = await self.run(fetch_one, sql + ' ORDER BY "order" DESC, id DESC LIMIT 1', params)
+        return row['order'] if row else None
+
+    async def renumber_tasks(self, board_id: str, group_id: Optional[str]) -> bool:
+        def renumber(conn):
+            group_clause, group_params = equals('group_id', group_id)
+            with transaction(conn):
+                ids = [row[0] for row in conn.execute(
+                    f'SELECT id FROM tasks WHERE board_id = ? AND {group_clause} ORDER BY "order", id', [board_id] + group_params
+                )]
+                conn.executemany('UPDATE tasks SET "order" = ? WHERE id = ?', [(float(i), task_id) for i, task_id in enumerate(ids)])
+            return bool(ids)
+        return await self.run(renumber)
+
+    # Job leases
+
+    async def claim_lease(self, name: str, seconds: float) -> bool:
+        now = datetime.now(timezone.utc)
+        sql = ("INSERT INTO job_leases (name, locked_until) VALUES (?, ?) "
+               "ON CONFLICT (name) DO UPDATE SET locked_until = excluded.locked_until WHERE job_leases.locked_until <= ?")
+        params = (name, sql_value(now + timedelta(seconds=seconds)), sql_value(now))
+        return bool(await self.run(lambda conn: conn.execute(sql, params).rowcount))
+
+    # Archive
+
+    async def archive_tasks(self, board_id: str, status_id: str, updated_before: datetime, limit: int) -> List[dict]:
+        def archive(conn):
+            with transaction(conn):
+                docs = fetch_all(conn, select('tasks') + " WHERE board_id = ? AND status_id = ? AND updated_at < ? LIMIT ?",
+                                 (board_id, status_id, sql_value(updated_before), limit))
+                if docs:
+                    archived_at = datetime.now(timezone.utc)
+                    insert_rows(conn, 'tasks_archive', [{**doc, 'archived_at': archived_at} for doc in docs])
+                    ids = [doc['id'] for doc in docs]
+                    conn.execute(f"DELETE FROM tasks WHERE id IN ({placeholders(ids)})", ids)
+                return docs
+        return await self.run(archive)
+
+    async def restore_task(self, task_id: str, data: dict, board_ids: Optional[Collection[str]] = None) -> Optional[dict]:
+        clause, params = by_id(task_id, board_ids)
+
+        def restore(conn):
+            with transaction(conn):
+                doc = fetch_one(conn, select('tasks_archive', COLUMNS['tasks']) + f" WHERE {clause}", params)
+                if doc is None:
+                    return None
+                doc.update(data)
+                for column, table in (('group_id', 'groups'), ('status_id', 'statuses')):
+                    if doc[column] is not None and not conn.execute(f'SELECT 1 FROM "{table}" WHERE id = ?', (doc[column],)).fetchone():
+                        doc[column] = None
+                conn.execute("DELETE FROM tasks_archive WHERE id = ?", (task_id,))
+                insert_rows(conn, 'tasks', [doc])
+                return doc
+        return await self.run(restore)
+
+    async def list_archived_tasks(self, filters: dict, after: Optional[tuple] = None, limit: Optional[int] = None, fields: Optional[Collection[str]] = None) -> List[dict]:
+        clauses, params = task_where(filters, None, after)
+        sql = select_fields('tasks_archive', fields)
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += ' ORDER BY "order", id LIMIT ?'
+        return await self.run(fetch_all, sql, params + [limit or -1])
+
+    # Statistics
+
+    async def count_tasks(self, board_id: str, done_status_id: Optional[str]) -> dict:
+        now = sql_value(datetime.now(timezone.utc))
+        rows = await self.run(fetch_all, """
+            SELECT status_id, priority, group_id, COUNT(*) AS count,
+                   SUM(due_date < ? AND (? IS NULL OR status_id IS NOT ?)) AS overdue
+            FROM tasks WHERE board_id = ?
+            GROUP BY status_id, priority, group_id
+        """, (now, done_status_id, done_status_id, board_id))
+        stats = {"by_status": {}, "by_priority": {}, "by_group": {}, "overdue": 0}
+        for row in rows:
+            for field, counter in (('status_id', 'by_status'), ('priority', 'by_priority'), ('group_id', 'by_group')):
+                stats[counter][row[field]] = stats[counter].get(row[field], 0) + row['count']
+            stats['overdue'] += row['overdue'] or 0
+        return stats
+
+    async def count_overdue(self, board_id: str, done_status_id: Optional[str]) -> int:
+        now = sql_value(datetime.now(timezone.utc))
+        row = await self.run(
+            fetch_one,
+            "SELECT COUNT(*) AS count FROM tasks WHERE board_id = ? AND due_date < ? AND (? IS NULL OR status_id IS NOT ?)",
+            (board_id, now, done_status_id, done_status_id)
+        )
+        return row['count']
+
+    # Change log
+
+    async def log_changes(self, entries: List[dict]):
+        def log(conn):
+            with transaction(conn):
+                insert_rows(conn, 'board_changes', entries)
+                if time.time() - self.purged_at > CHANGE_PURGE_SECONDS:
+                    cutoff = datetime.now(timezone.utc) - timedelta(days=self.sync_retention_days)
+                    conn.execute("DELETE FROM board_changes WHERE at < ?", (sql_value(cutoff),))
+                    self.purged_at = time.time()
+        await self.run(log)
+
+    async def changes_since(self, board_id: str, seq: int, limit: int) -> List[dict]:
+        return await self.run(fetch_all, select('board_changes') + " WHERE board_id = ? AND seq > ? ORDER BY seq LIMIT ?", (board_id, seq, limit))
+
+    # Bulk loading
+
+    async def insert_many(self, collection: str, docs: List[dict]):
+        def insert(conn):
+            with transaction(conn):
+                insert_rows(conn, collection, docs)
+        await self.run(insert)
@@ -0,0 +1,65 @@
+"""One-off sweeper for documents orphaned by the old synchronous deletes.
+
+Finds boards whose workspace no longer exists and groups, statuses and tasks whose
+board no longer exists, queues cascade deletion jobs for the missing parents, and
+runs them. Safe to re-run; uses MONGO_URL/DB_NAME from .env like the server. Only
+the mongo backend needs it: the SQL schema cascades through foreign keys.
+
+    python sweep_orphans.py [--dry-run]
+"""
+import argparse
+import asyncio
+
+import server
+from repository import MongoRepository
+
+
+def missing_parents(parent_field: str, parent_collection: str) -> list:
+    """Aggregation listing values of parent_field with no matching parent document"""
+    return [
+        {"$group": {"_id": f"${parent_field}"}},
+        {"$lookup": {"from": parent_collection, "localField": "_id", "foreignField": "id", "as": "parent"}},
+        {"$match": {"parent": {"$size": 0}}},
+        {"$project": {"_id": 1}},
+    ]
+
+
+async def find_orphans(database) -> dict:
+    """Return the ids of missing workspaces and boards that still have descendants"""
+    workspaces = await database.boards.aggregate(missing_parents("workspace_id", "workspaces")).to_list(None)
+    boards = set()
+    for collection in (database.groups, database.statuses, database.tasks, database.tasks_archive):
+        docs = await collection.aggregate(missing_parents("board_id", "boards")).to_list(None)
+        boards.update(d['_id'] for d in docs)
+    return {
+        "workspace": sorted(d['_id'] for d in workspaces if d['_id']),
+        "board": sorted(b for b in boards if b),
+    }
+
+
+async def sweep(database, dry_run: bool = False) -> dict:
+    orphans = await find_orphans(database)
+    if not dry_run:
+        repository = MongoRepository(database, cascade_batch_size=server.CASCADE_BATCH_SIZE)
+        for kind, target_ids in orphans.items():
+            await repository.enqueue_deletion(kind, *target_ids)
+        await repository.drain_deletion_jobs()
+    return orphans
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help="only report orphaned parents")
+    args = parser.parse_args()
+
+    if server.db is None:
+        parser.exit(message="nothing to sweep: the SQL backend cascades deletes itself\n")
+    orphans = await sweep(server.db, dry_run=args.dry_run)
+    print(f"missing workspaces with boards: {len(orphans['workspace'])}")
+    print(f"missing boards with groups/statuses/tasks: {len(orphans['board'])}")
+    if not args.dry_run:
+        print("orphans removed")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
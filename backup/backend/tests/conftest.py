@@ -0,0 +1,61 @@
+"""Shared fixtures: the API served from an in-memory store, once per storage backend.
+
+MongoDB is mocked with mongomock-motor and SQLite runs on ":memory:", so the suite
+needs no database server. Run from backend/:
+
+    python -m pytest -q tests
+"""
+import asyncio
+import os
+
+# Read by server at import; nothing connects to MONGO_URL, the store is swapped per test
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'taskflow_test')
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('ADMISSION_CONTROL', '0')
+os.environ.setdefault('ARCHIVE_AFTER_DAYS', '0')
+
+import pytest
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import server
+from repository import MongoRepository
+from sql_repository import SqlRepository
+from tests.helpers import register
+
+
+@pytest.fixture(params=['mongo', 'sqlite'])
+def store(request, monkeypatch):
+    """A fresh, migrated store installed as server.store, with empty caches"""
+    monkeypatch.setattr(server, 'token_cache', server.TokenCache(server.TOKEN_CACHE_SIZE))
+    monkeypatch.setattr(server, 'board_cache', server.BoardCache(server.BOARD_CACHE_SIZE))
+    monkeypatch.setattr(server, 'access_cache', server.AccessCache(server.ACCESS_CACHE_SIZE))
+    if request.param == 'mongo':
+        database = AsyncMongoMockClient(tz_aware=True)['taskflow_test']
+        monkeypatch.setattr(server, 'db', database)
+        repository = MongoRepository(database, on_board_removed=server.board_cache.invalidate)
+    else:
+        repository = SqlRepository(':memory:', on_board_removed=server.board_cache.invalidate)
+    asyncio.run(repository.migrate())
+    monkeypatch.setattr(server, 'store', repository)
+    yield repository
+    if request.param == 'sqlite':
+        repository.close()
+
+
+@pytest.fixture
+def client(store):
+    return TestClient(server.app)
+
+
+@pytest.fixture
+def auth(client):
+    return register(client)
+
+
+@pytest.fixture
+def board(client, auth):
+    """A board with its default statuses, owned by the `auth` user"""
+    workspace = client.post('/api/workspaces', json={"name": "Workspace"}, headers=auth).json()
+    return client.post('/api/boards', json={"name": "Board", "workspace_id": workspace['id']}, headers=auth).json()
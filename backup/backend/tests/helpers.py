@@ -0,0 +1,22 @@
+"""Request helpers shared by the test modules"""
+import uuid
+
+from fastapi.testclient import TestClient
+
+
+def register(client: TestClient, name: str = 'user') -> dict:
+    """Register a user and return the Authorization header for their token"""
+    response = client.post('/api/auth/register', json={
+        "email": f"{name}-{uuid.uuid4().hex[:8]}@example.com", "name": name, "password": "secret"
+    })
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['token']}"}
+
+
+def create_tasks(client: TestClient, auth: dict, board_id: str, count: int, **fields) -> list:
+    tasks = []
+    for i in range(count):
+        response = client.post('/api/tasks', json={"board_id": board_id, "title": f"Task {i}", "order": i, **fields}, headers=auth)
+        assert response.status_code == 200, response.text
+        tasks.append(response.json())
+    return tasks
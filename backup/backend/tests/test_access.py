@@ -0,0 +1,56 @@
+"""Every board-level route is limited to the boards in the caller's workspaces"""
+import pytest
+
+from server import AccessCache
+from tests.helpers import create_tasks, register
+
+
+@pytest.fixture
+def other(client):
+    return register(client, 'other')
+
+
+def test_other_users_cannot_read_the_board(client, auth, board, other):
+    create_tasks(client, auth, board['id'], 2)
+    for path in (f"/api/boards/{board['id']}", f"/api/boards/{board['id']}/snapshot", f"/api/boards/{board['id']}/stats"):
+        assert client.get(path, headers=other).status_code == 404, path
+    for path in ('/api/tasks', '/api/groups', '/api/statuses'):
+        assert client.get(path, params={"board_id": board['id']}, headers=other).status_code == 404, path
+    assert client.get('/api/sync', params={"board_id": board['id']}, headers=other).status_code == 404
+
+
+def test_unscoped_task_list_only_covers_own_boards(client, auth, board, other):
+    create_tasks(client, auth, board['id'], 2)
+    assert len(client.get('/api/tasks', headers=auth).json()) == 2
+    assert client.get('/api/tasks', headers=other).json() == []
+
+
+def test_other_users_cannot_write_tasks(client, auth, board, other):
+    a, b = create_tasks(client, auth, board['id'], 2)
+    assert client.get(f"/api/tasks/{a['id']}", headers=other).status_code == 404
+    assert client.put(f"/api/tasks/{a['id']}", json={"title": "mine"}, headers=other).status_code == 404
+    assert client.post(f"/api/tasks/{a['id']}/move", json={"after_id": b['id']}, headers=other).status_code == 404
+    assert client.delete(f"/api/tasks/{a['id']}", headers=other).status_code == 404
+    assert client.post('/api/tasks', json={"board_id": board['id'], "title": "x"}, headers=other).status_code == 404
+    response = client.post('/api/tasks/bulk', json={"operations": [{"op": "delete", "id": a['id']}]}, headers=other)
+    assert response.json()['results'][0]['error'] == "Task not found"
+    assert client.get(f"/api/tasks/{a['id']}", headers=auth).json()['title'] == a['title']
+
+
+def test_new_board_is_visible_at_once(client, auth, board):
+    # The access cache is reloaded when a route meets a board it has not seen yet
+    workspace_id = board['workspace_id']
+    second = client.post('/api/boards', json={"name": "Second", "workspace_id": workspace_id}, headers=auth).json()
+    assert client.get(f"/api/boards/{second['id']}", headers=auth).status_code == 200
+
+
+def test_access_cache_versions_are_bounded():
+    cache = AccessCache(max_size=2)
+    cache.invalidate('a')
+    loading = cache.version('a')
+    for user_id in 'bc':
+        cache.invalidate(user_id)
+    assert list(cache.versions) == ['b', 'c']
+    # A load that began before 'a' was forgotten is still refused
+    cache.put('a', loading, object())
+    assert cache.get('a') is None
@@ -0,0 +1,100 @@
+"""Route cost classes, token buckets and load shedding"""
+import asyncio
+
+import httpx
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from fastapi.testclient import TestClient
+
+import metrics
+import server
+from admission import AdmissionMiddleware, RouteClass, TokenBuckets
+
+
+def test_route_classes():
+    assert server.route_cost_class('POST', '/api/auth/login').name == 'auth'
+    assert server.route_cost_class('GET', '/api/search/tasks').name == 'search'
+    assert server.route_cost_class('GET', '/api/tasks').name == 'read'
+    assert server.route_cost_class('PUT', '/api/tasks/{task_id}').name == 'write'
+    assert server.route_cost_class('GET', '/api/boards/{board_id}/events') is None
+    assert server.route_cost_class('GET', '/metrics') is None
+
+
+def request_class(method: str, path: str):
+    """The class AdmissionMiddleware gives a request, resolving its route like the router does"""
+    scope = {"type": "http", "method": method, "path": path, "root_path": "", "app": server.app}
+    return server.route_cost_class(method, metrics.route_template(scope))
+
+
+def test_requests_are_classed_by_the_route_that_serves_them():
+    assert request_class('POST', '/api/tasks/bulk').name == 'bulk'
+    assert request_class('POST', '/api/seed-demo-data').name == 'bulk'
+    assert request_class('POST', '/api/auth/login').name == 'auth'
+    assert request_class('GET', '/api/search/tasks').name == 'search'
+    assert request_class('PUT', '/api/tasks/abc').name == 'write'
+    assert request_class('GET', '/api/boards/abc/events') is None
+
+
+def test_token_bucket_refuses_past_its_burst():
+    buckets = TokenBuckets(rate=1, burst=3, max_size=10)
+    assert [buckets.take('a', 1) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take('a', 1) > 0
+    assert buckets.take('b', 3) == 0  # buckets are per client
+
+
+def test_token_buckets_are_bounded():
+    buckets = TokenBuckets(rate=1, burst=1, max_size=2)
+    for key in 'abc':
+        buckets.take(key, 1)
+    assert list(buckets.entries) == ['b', 'c']
+
+
+def limited_app(route_class: RouteClass, buckets: TokenBuckets, release: asyncio.Event = None, client_key=lambda scope: 'client'):
+    async def endpoint(request):
+        if release is not None:
+            await release.wait()
+        return PlainTextResponse('ok')
+    app = Starlette(routes=[Route('/work', endpoint)])
+    app.add_middleware(AdmissionMiddleware, classify=lambda method, route: route_class,
+                       client_key=client_key, buckets=buckets, queue_timeout=0.05)
+    return app
+
+
+def test_rate_limited_client_gets_429_with_retry_after():
+    app = limited_app(RouteClass('read', limit=4, queue=4, cost=1), TokenBuckets(rate=0.1, burst=2, max_size=10))
+    client = TestClient(app)
+    assert [client.get('/work').status_code for _ in range(3)] == [200, 200, 429]
+    assert int(client.get('/work').headers['Retry-After']) >= 1
+
+
+def test_clients_behind_the_proxy_have_their_own_buckets(monkeypatch):
+    monkeypatch.setattr(server, 'TRUSTED_PROXY_HEADER', b'x-forwarded-for')
+    app = limited_app(RouteClass('read', limit=4, queue=4, cost=1), TokenBuckets(rate=0.1, burst=2, max_size=10), client_key=server.rate_limit_key)
+    client = TestClient(app)  # every request arrives from the same proxy address
+
+    def get(forwarded_for):
+        return client.get('/work', headers={"X-Forwarded-For": forwarded_for}).status_code
+    assert [get('203.0.113.1') for _ in range(3)] == [200, 200, 429]
+    assert [get('203.0.113.2') for _ in range(2)] == [200, 200]
+    # Only the proxy's own entry counts, so a client cannot pick another bucket
+    assert get('198.51.100.7, 203.0.113.1') == 429
+
+
+def test_full_class_sheds_with_503():
+    async def scenario():
+        release = asyncio.Event()
+        app = limited_app(RouteClass('bulk', limit=1, queue=1, cost=0), TokenBuckets(rate=1, burst=1, max_size=10), release)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+            running = asyncio.ensure_future(client.get('/work'))
+            await asyncio.sleep(0.01)
+            queued = asyncio.ensure_future(client.get('/work'))
+            await asyncio.sleep(0.01)
+            shed = await client.get('/work')
+            timed_out = await queued
+            release.set()
+            return shed, timed_out, await running
+    shed, timed_out, served = asyncio.run(scenario())
+    assert shed.status_code == 503 and 'Retry-After' in shed.headers
+    assert timed_out.status_code == 503
+    assert served.status_code == 200
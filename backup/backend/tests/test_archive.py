@@ -0,0 +1,95 @@
+"""Archiving completed tasks and restoring them"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import server
+from tests.helpers import create_tasks, register
+
+
+@pytest.fixture
+def archived(client, auth, board, store, monkeypatch):
+    """Six tasks, three in the board's last status; two of those are old enough to archive"""
+    monkeypatch.setattr(server, 'ARCHIVE_AFTER_DAYS', 90)
+    monkeypatch.setattr(server, 'ARCHIVE_BATCH_SIZE', 1)  # exercise the batch loop
+    statuses = client.get('/api/statuses', params={"board_id": board['id']}, headers=auth).json()
+    done = max(statuses, key=lambda s: s['order'])['id']
+    open_tasks = create_tasks(client, auth, board['id'], 3)
+    done_tasks = [
+        client.post('/api/tasks', json={"board_id": board['id'], "title": f"Done {i}", "order": 10 + i, "status_id": done}, headers=auth).json()
+        for i in range(3)
+    ]
+    old = datetime.now(timezone.utc) - timedelta(days=200)
+    for task in open_tasks + done_tasks[:2]:
+        asyncio.run(store.update_task(task['id'], {"updated_at": old}))
+    token = client.get('/api/sync', params={"board_id": board['id']}, headers=auth).json()['sync_token']
+    assert asyncio.run(server.archive_completed_tasks()) == 2
+    return {"open": open_tasks, "done": done_tasks, "token": token}
+
+
+def test_archived_tasks_leave_lists_and_stats(client, auth, board, archived):
+    ids = [t['id'] for t in client.get('/api/tasks', params={"board_id": board['id']}, headers=auth).json()]
+    assert ids == [t['id'] for t in archived['open']] + [archived['done'][2]['id']]
+    assert client.get(f"/api/boards/{board['id']}/stats", headers=auth).json()['total'] == 4
+    body = client.get('/api/sync', params={"board_id": board['id'], "since": archived['token']}, headers=auth).json()
+    assert sorted(body['deleted']['tasks']) == sorted(t['id'] for t in archived['done'][:2])
+
+
+def test_include_archived_pages_through_both(client, auth, board, archived):
+    seen, cursor = [], None
+    while True:
+        params = {"board_id": board['id'], "include_archived": "true", "limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = client.get('/api/tasks', params=params, headers=auth)
+        seen += response.json()
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert [t['id'] for t in seen] == [t['id'] for t in archived['open'] + archived['done']]
+    assert [t['archived_at'] is not None for t in seen] == [False] * 3 + [True, True, False]
+    response = client.get('/api/tasks', params={"board_id": board['id'], "include_archived": "true", "search": "done"}, headers=auth)
+    assert response.status_code == 400
+
+
+def test_restore(client, auth, board, archived):
+    task = archived['done'][0]
+    assert client.get(f"/api/tasks/{task['id']}", headers=auth).status_code == 404
+    assert client.post(f"/api/tasks/{task['id']}/restore", headers=register(client, 'other')).status_code == 404
+    response = client.post(f"/api/tasks/{task['id']}/restore", headers=auth)
+    assert response.status_code == 200, response.text
+    assert response.json()['archived_at'] is None
+    assert client.get(f"/api/tasks/{task['id']}", headers=auth).status_code == 200
+    assert client.post(f"/api/tasks/{task['id']}/restore", headers=auth).status_code == 404
+    # Restored tasks are searchable again
+    hits = client.get('/api/search/tasks', params={"q": "done", "board_id": board['id']}, headers=auth).json()
+    assert task['id'] in [h['id'] for h in hits]
+
+
+def test_restore_clears_a_status_deleted_meanwhile(client, auth, board, archived):
+    task = archived['done'][0]
+    assert client.delete(f"/api/statuses/{task['status_id']}", headers=auth).status_code == 200
+    response = client.post(f"/api/tasks/{task['id']}/restore", headers=auth)
+    assert response.json()['status_id'] is None
+
+
+def test_live_tasks_store_no_archived_at(client, auth, board, store, archived):
+    created, = create_tasks(client, auth, board['id'], 1)
+    bulk = client.post('/api/tasks/bulk', json={"operations": [{"op": "create", "data": {"board_id": board['id'], "title": "Bulk"}}]}, headers=auth).json()
+    restored = archived['done'][0]
+    assert client.post(f"/api/tasks/{restored['id']}/restore", headers=auth).status_code == 200
+    for task_id in (created['id'], bulk['results'][0]['id'], restored['id']):
+        assert 'archived_at' not in asyncio.run(store.find_task(task_id))
+        # Both backends answer with the model's full field set
+        assert client.get(f"/api/tasks/{task_id}", headers=auth).json()['archived_at'] is None
+
+
+def test_one_worker_at_a_time_holds_the_archive_lease(store):
+    async def claims():
+        return [
+            await store.claim_lease('archive', 60),
+            await store.claim_lease('archive', 60),  # another worker, same interval
+            await store.claim_lease('other', 60),
+            await store.claim_lease('expired', 0),
+            await store.claim_lease('expired', 60),
+        ]
+    assert asyncio.run(claims()) == [True, False, True, True, True]
@@ -0,0 +1,78 @@
+"""Password hashing off the event loop, rehashing on login, and the token cache"""
+import asyncio
+import time
+
+import pytest
+
+import server
+from tests.helpers import register
+
+CREDENTIALS = {"email": "hash@example.com", "password": "secret"}
+
+
+@pytest.fixture
+def user(client):
+    response = client.post('/api/auth/register', json={**CREDENTIALS, "name": "Hash"})
+    assert response.status_code == 200, response.text
+    return response.json()['user']
+
+
+def stored_hash(store) -> str:
+    return asyncio.run(store.find_user_by_email(CREDENTIALS['email']))['password_hash']
+
+
+def test_saturated_pool_sheds_with_503(client, user, monkeypatch):
+    monkeypatch.setattr(server, 'password_jobs', server.HASH_POOL_SIZE + server.HASH_QUEUE_LIMIT)
+    response = client.post('/api/auth/login', json=CREDENTIALS)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(server.HASH_RETRY_AFTER_SECONDS)
+    response = client.post('/api/auth/register', json={**CREDENTIALS, "email": "other@example.com", "name": "Other"})
+    assert response.status_code == 503
+
+
+def test_login_upgrades_a_cheaper_hash(client, user, store, monkeypatch):
+    assert stored_hash(store).startswith(f"$2b${server.BCRYPT_ROUNDS:02d}$")
+    monkeypatch.setattr(server, 'BCRYPT_ROUNDS', server.BCRYPT_ROUNDS + 1)
+    # The rehash runs as a background task once the response is sent
+    assert client.post('/api/auth/login', json=CREDENTIALS).status_code == 200
+    assert stored_hash(store).startswith(f"$2b${server.BCRYPT_ROUNDS:02d}$")
+    assert client.post('/api/auth/login', json=CREDENTIALS).status_code == 200
+    assert client.post('/api/auth/login', json={**CREDENTIALS, "password": "wrong"}).status_code == 401
+
+
+def test_token_cache_hits_and_evicts_least_recent():
+    cache = server.TokenCache(max_size=2)
+    exp = time.time() + 3600
+    for digest in 'abc':
+        cache.put(digest, f"user-{digest}", exp)
+    assert cache.get('a') is None  # evicted
+    assert cache.get('b') == 'user-b' and cache.get('c') == 'user-c'
+    assert (cache.hits, cache.misses) == (2, 1)
+    cache.put('d', 'user-d', time.time() - 1)  # already expired
+    assert cache.get('d') is None
+
+
+def test_cached_tokens_are_rechecked(monkeypatch):
+    monkeypatch.setattr(server, 'TOKEN_RECHECK_SECONDS', 0)
+    cache = server.TokenCache(max_size=2)
+    cache.put('a', 'user-a', time.time() + 3600)
+    assert cache.get('a') is None
+
+
+def test_logout_is_refused_by_every_worker(client, monkeypatch):
+    auth = register(client)
+    assert client.get('/api/auth/me', headers=auth).status_code == 200
+    other_worker = server.TokenCache(server.TOKEN_CACHE_SIZE)
+    monkeypatch.setattr(server, 'token_cache', other_worker)
+    assert client.get('/api/auth/me', headers=auth).status_code == 200  # cached by the other worker
+    monkeypatch.setattr(server, 'token_cache', server.TokenCache(server.TOKEN_CACHE_SIZE))
+    assert client.post('/api/auth/logout', headers=auth).status_code == 200
+    assert client.get('/api/auth/me', headers=auth).status_code == 401
+    # A restarted worker asks the store
+    monkeypatch.setattr(server, 'token_cache', server.TokenCache(server.TOKEN_CACHE_SIZE))
+    assert client.get('/api/auth/me', headers=auth).status_code == 401
+    # The other worker refuses it once its entry is due for a recheck
+    monkeypatch.setattr(server, 'token_cache', other_worker)
+    digest, (user_id, _) = next(iter(other_worker.entries.items()))
+    other_worker.entries[digest] = (user_id, time.time() - 1)
+    assert client.get('/api/auth/me', headers=auth).status_code == 401
@@ -0,0 +1,99 @@
+"""Cascade deletion of workspaces and boards, and the orphan sweeper"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from repository import MongoRepository
+from sweep_orphans import find_orphans, sweep
+from tests.helpers import create_tasks
+
+
+def drain(store) -> int:
+    """Run the cascade worker's pending jobs; the SQL backend cascades in the delete itself"""
+    if isinstance(store, MongoRepository):
+        return asyncio.run(store.drain_deletion_jobs())
+    return 0
+
+
+def descendants(store, board_id: str) -> dict:
+    async def gather():
+        return {
+            "groups": await store.list_groups(board_id),
+            "statuses": await store.list_statuses(board_id),
+            "tasks": await store.list_tasks({"board_id": board_id}),
+        }
+    return asyncio.run(gather())
+
+
+@pytest.fixture
+def filled(client, auth, board):
+    group = client.post('/api/groups', json={"board_id": board['id'], "name": "Group"}, headers=auth).json()
+    create_tasks(client, auth, board['id'], 3, group_id=group['id'])
+    return board
+
+
+@pytest.mark.parametrize('parent', ['workspace', 'board'])
+def test_delete_leaves_no_orphans(client, auth, filled, store, parent):
+    assert all(descendants(store, filled['id']).values())
+    path = f"/api/workspaces/{filled['workspace_id']}" if parent == 'workspace' else f"/api/boards/{filled['id']}"
+    assert client.delete(path, headers=auth).status_code == 200
+    drain(store)
+    assert asyncio.run(store.list_boards(filled['workspace_id'])) == []
+    assert descendants(store, filled['id']) == {"groups": [], "statuses": [], "tasks": []}
+    if isinstance(store, MongoRepository):
+        assert asyncio.run(store.database.deletion_jobs.count_documents({})) == 0
+
+
+def test_expired_lease_resumes_a_crashed_job(client, auth, filled, store):
+    if not isinstance(store, MongoRepository):
+        pytest.skip("the SQL backend has no deletion jobs")
+    delete_in_batches = store.delete_in_batches
+
+    async def crash_at_statuses(collection, query, on_batch=None):
+        if collection.name == 'statuses':
+            raise RuntimeError("worker killed")
+        await delete_in_batches(collection, query, on_batch)
+
+    store.delete_in_batches = crash_at_statuses
+    assert client.delete(f"/api/boards/{filled['id']}", headers=auth).status_code == 200
+    with pytest.raises(RuntimeError):
+        drain(store)
+    del store.delete_in_batches
+    left = descendants(store, filled['id'])
+    assert not left['tasks'] and not left['groups'] and left['statuses']
+
+    # Another worker leaves the job alone while the lease holds, then takes it over
+    assert drain(store) == 0
+    expired = datetime.now(timezone.utc) - timedelta(seconds=1)
+    asyncio.run(store.database.deletion_jobs.update_many({}, {"$set": {"locked_until": expired}}))
+    assert drain(store) == 1
+    assert descendants(store, filled['id']) == {"groups": [], "statuses": [], "tasks": []}
+    assert asyncio.run(store.database.deletion_jobs.count_documents({})) == 0
+
+
+def test_sweeper_removes_existing_orphans():
+    async def scenario():
+        database = AsyncMongoMockClient(tz_aware=True)['taskflow_sweep']
+        await database.workspaces.insert_one({"id": "w-live", "owner_id": "u1", "name": "Live"})
+        await database.boards.insert_many([
+            {"id": "b-live", "workspace_id": "w-live", "name": "Live"},
+            {"id": "b-orphan", "workspace_id": "w-gone", "name": "Orphan"},
+        ])
+        for board_id in ("b-live", "b-orphan", "b-gone"):
+            await database.groups.insert_one({"id": f"g-{board_id}", "board_id": board_id, "name": "Group"})
+            await database.statuses.insert_one({"id": f"s-{board_id}", "board_id": board_id, "name": "Status"})
+            await database.tasks.insert_one({"id": f"t-{board_id}", "board_id": board_id, "title": "Task"})
+
+        expected = {"workspace": ["w-gone"], "board": ["b-gone"]}
+        assert await sweep(database, dry_run=True) == expected
+        assert await database.tasks.count_documents({}) == 3
+        assert await sweep(database) == expected
+
+        assert await find_orphans(database) == {"workspace": [], "board": []}
+        assert [b['id'] for b in await database.boards.find().to_list(None)] == ["b-live"]
+        for collection in (database.groups, database.statuses, database.tasks):
+            assert [d['board_id'] for d in await collection.find().to_list(None)] == ["b-live"]
+        assert await database.deletion_jobs.count_documents({}) == 0
+    asyncio.run(scenario())
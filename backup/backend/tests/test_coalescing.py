@@ -0,0 +1,39 @@
+"""Single-flight board reads"""
+import asyncio
+from datetime import datetime, timezone
+
+import server
+from tests.helpers import create_tasks
+
+
+def test_concurrent_identical_loads_share_one_call():
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ['result']
+
+    async def scenario():
+        coalescer = server.ReadCoalescer()
+        key = (1, server.coalescing_key(({"board_id": "b"}, None)))
+        return await asyncio.gather(*[coalescer.run('tasks', key, loader) for _ in range(5)])
+
+    assert asyncio.run(scenario()) == [['result']] * 5
+    assert len(calls) == 1
+
+
+def test_keys_are_hashable_and_ignore_dict_order():
+    when = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    first = server.coalescing_key(({"board_id": ["a", "b"], "due_before": when}, ["x"], (1.0, "id"), 10, ("id",), False))
+    second = server.coalescing_key(({"due_before": when, "board_id": ["a", "b"]}, ["x"], (1.0, "id"), 10, ("id",), False))
+    assert first == second and hash(first) == hash(second)
+
+
+def test_filtered_board_reads_are_coalesced(client, auth, board):
+    create_tasks(client, auth, board['id'], 3, due_date="2025-01-02T00:00:00Z")
+    params = {"board_id": board['id'], "due_before": "2025-02-01T00:00:00Z", "fields": "title", "limit": 2}
+    for _ in range(2):
+        response = client.get('/api/tasks', params=params, headers=auth)
+        assert response.status_code == 200, response.text
+        assert len(response.json()) == 2
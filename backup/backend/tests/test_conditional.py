@@ -0,0 +1,72 @@
+"""ETags on board-scoped reads and 304 Not Modified"""
+import asyncio
+
+from server import BoardCache
+from tests.helpers import create_tasks
+
+
+def test_board_reads_revalidate_until_a_write(client, auth, board):
+    paths = [f"/api/boards/{board['id']}", f"/api/boards/{board['id']}/snapshot", f"/api/tasks?board_id={board['id']}"]
+    etags = {}
+    for path in paths:
+        response = client.get(path, headers=auth)
+        assert response.status_code == 200
+        etags[path] = response.headers['ETag']
+        cached = client.get(path, headers={**auth, "If-None-Match": etags[path]})
+        assert cached.status_code == 304, path
+        assert cached.content == b''
+
+    create_tasks(client, auth, board['id'], 1)
+    for path in paths:
+        response = client.get(path, headers={**auth, "If-None-Match": etags[path]})
+        assert response.status_code == 200, path
+        assert response.headers['ETag'] != etags[path]
+
+
+def test_snapshot_after_a_write_has_the_write(client, auth, board):
+    client.get(f"/api/boards/{board['id']}/snapshot", headers=auth)
+    task, = create_tasks(client, auth, board['id'], 1)
+    snapshot = client.get(f"/api/boards/{board['id']}/snapshot", headers=auth).json()
+    ids = [t['id'] for t in snapshot['ungrouped_tasks']] + [t['id'] for g in snapshot['groups'] for t in g['tasks']]
+    assert task['id'] in ids
+
+
+def test_write_in_another_process_misses_the_cache(client, auth, board, store):
+    path = f"/api/boards/{board['id']}"
+    before = client.get(path, headers=auth)
+    assert client.get(f"/api/groups?board_id={board['id']}", headers=auth).status_code == 200
+    # Another worker renames the board: this process's cache never hears of it
+    asyncio.run(store.update_board(board['id'], {"name": "Renamed elsewhere"}))
+    after = client.get(path, headers=auth)
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert after.json()['name'] == "Renamed elsewhere"
+    snapshot = client.get(f"{path}/snapshot", headers=auth).json()
+    assert snapshot['board']['name'] == "Renamed elsewhere"
+
+
+def test_board_cache_entries_are_tagged_with_the_stored_version():
+    cache = BoardCache(max_size=10)
+    cache.put('b', 'board', cache.version('b'), 3, {"name": "old"})
+    assert cache.get('b', 'board', 3) == {"name": "old"}
+    assert cache.get('b', 'board') == {"name": "old"}
+    assert cache.get('b', 'board', 4) is None
+
+
+def test_board_cache_versions_are_bounded():
+    cache = BoardCache(max_size=2)
+    for board_id in 'abcd':
+        cache.invalidate(board_id)
+    assert list(cache.versions) == ['c', 'd']
+    for board_id in 'efg':
+        cache.put(board_id, 'board', cache.version(board_id), None, {})
+    assert len(cache.entries) == 2 and len(cache.versions) <= 2
+
+
+def test_board_cache_refuses_loads_that_began_before_a_version_was_dropped():
+    cache = BoardCache(max_size=1)
+    cache.invalidate('a')
+    loading = cache.version('a')
+    cache.invalidate('b')  # pushes 'a' out of versions
+    assert 'a' not in cache.versions
+    cache.put('a', 'board', loading, None, {})
+    assert cache.get('a', 'board') is None
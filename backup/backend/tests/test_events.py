@@ -0,0 +1,143 @@
+"""Board change events over WebSocket and server-sent events"""
+import asyncio
+import json
+from urllib.parse import urlencode
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+import server
+from tests.helpers import register
+
+
+def token(auth: dict) -> str:
+    return auth['Authorization'][len('Bearer '):]
+
+
+@pytest.fixture
+def hub(monkeypatch):
+    hub = server.BoardHub(3)
+    monkeypatch.setattr(server, 'board_hub', hub)
+    return hub
+
+
+def task_updated(board_id: str, title: str) -> dict:
+    return server.board_change('task', 'updated', {"id": "t1", "board_id": board_id}, {"title": title})
+
+
+def test_websocket_delivers_board_changes(client, auth, board, hub):
+    with client.websocket_connect(f"/api/boards/{board['id']}/ws?token={token(auth)}") as websocket:
+        websocket.portal.call(server.record_board_changes, task_updated(board['id'], "Renamed"))
+        event = websocket.receive_json()
+    assert event['type'] == 'task.updated'
+    assert event['data'] == {"title": "Renamed"}
+    assert event['version'] is not None
+    assert hub.subscribers == {}
+
+
+def test_websocket_accepts_the_authorization_header(client, auth, board, hub):
+    with client.websocket_connect(f"/api/boards/{board['id']}/ws", headers=auth) as websocket:
+        websocket.portal.call(hub.publish, board['id'], {"type": "ping"})
+        assert websocket.receive_json() == {"type": "ping"}
+
+
+@pytest.mark.parametrize('credentials', ['none', 'invalid', 'other user'])
+def test_websocket_rejects_unauthorized_subscribers(client, board, hub, credentials):
+    query = {
+        'none': '',
+        'invalid': '?token=not-a-token',
+        'other user': f"?token={token(register(client, 'other'))}",
+    }[credentials]
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect(f"/api/boards/{board['id']}/ws{query}"):
+            pass
+    assert closed.value.code == 1008
+    assert hub.subscribers == {}
+
+
+def test_websocket_only_receives_its_board(client, auth, board, hub):
+    workspace_id = board['workspace_id']
+    other = client.post('/api/boards', json={"name": "Other", "workspace_id": workspace_id}, headers=auth).json()
+    with client.websocket_connect(f"/api/boards/{board['id']}/ws?token={token(auth)}") as websocket:
+        def publish():
+            hub.publish(other['id'], task_updated(other['id'], "Elsewhere"))
+            hub.publish(board['id'], task_updated(board['id'], "Here"))
+        websocket.portal.call(publish)
+        assert websocket.receive_json()['data'] == {"title": "Here"}
+
+
+def test_websocket_resyncs_after_overflow(client, auth, board, hub):
+    with client.websocket_connect(f"/api/boards/{board['id']}/ws?token={token(auth)}") as websocket:
+        def flood():
+            # All in one loop callback, so the subscriber cannot drain in between
+            for i in range(hub.queue_size + 1):
+                hub.publish(board['id'], task_updated(board['id'], f"Title {i}"))
+            hub.publish(board['id'], task_updated(board['id'], "After"))
+        websocket.portal.call(flood)
+        assert websocket.receive_json() == {"type": "resync", "board_id": board['id']}
+        assert websocket.receive_json()['data'] == {"title": "After"}
+
+
+def read_event_stream(path: str, params: dict, headers: dict, publish) -> tuple:
+    """GET an event stream, call publish() once it is open and hang up after the first event.
+
+    TestClient buffers a response until the app returns, which an event stream never
+    does, so the app is driven directly. Returns the response start message and body.
+    """
+    async def scenario():
+        hang_up = asyncio.Event()
+        requested = False
+        start = {}
+        body = []
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await hang_up.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                start.update(message)
+                publish()
+            elif message.get('body'):
+                body.append(message['body'].decode('utf-8'))
+                if 'data:' in body[-1]:
+                    hang_up.set()
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": urlencode(params).encode(),
+            "headers": [(b"host", b"testserver")] + [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+            "client": ("testclient", 50000), "server": ("testserver", 80),
+        }
+        await asyncio.wait_for(server.app(scope, receive, send), timeout=5)
+        return start, ''.join(body)
+    return asyncio.run(scenario())
+
+
+@pytest.mark.parametrize('via', ['query', 'header'])
+def test_event_stream_delivers_board_changes(auth, board, hub, via):
+    params, headers = ({"token": token(auth)}, {}) if via == 'query' else ({}, auth)
+    start, body = read_event_stream(
+        f"/api/boards/{board['id']}/events", params, headers,
+        lambda: hub.publish(board['id'], task_updated(board['id'], "Renamed"))
+    )
+    assert start['status'] == 200
+    assert (b'content-type', b'text/event-stream; charset=utf-8') in start['headers']
+    event, data = body.strip().split('\n')
+    assert event == 'event: task.updated'
+    assert json.loads(data[len('data: '):])['data'] == {"title": "Renamed"}
+    assert hub.subscribers == {}
+
+
+def test_event_stream_rejects_unauthorized_subscribers(client, board, hub):
+    path = f"/api/boards/{board['id']}/events"
+    assert client.get(path).status_code == 401
+    assert client.get(path, params={"token": "not-a-token"}).status_code == 401
+    other = register(client, 'other')
+    assert client.get(path, params={"token": token(other)}).status_code == 404
+    assert hub.subscribers == {}
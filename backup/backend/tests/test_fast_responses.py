@@ -0,0 +1,54 @@
+"""FAST_RESPONSES encodes reads directly; the payloads must match the validated path"""
+from typing import List
+
+import pytest
+from pydantic import TypeAdapter
+
+import server
+from tests.helpers import create_tasks
+
+
+def paths(board: dict) -> dict:
+    """Each list or board read, with its response model"""
+    board_id = board['id']
+    return {
+        "/api/workspaces": List[server.Workspace],
+        f"/api/boards?workspace_id={board['workspace_id']}": List[server.Board],
+        f"/api/boards/{board_id}": server.Board,
+        f"/api/boards/{board_id}/snapshot": server.BoardSnapshot,
+        f"/api/groups?board_id={board_id}": List[server.Group],
+        f"/api/statuses?board_id={board_id}": List[server.Status],
+        f"/api/tasks?board_id={board_id}": List[server.Task],
+        f"/api/tasks?board_id={board_id}&include_archived=true": List[server.Task],
+        f"/api/tasks?board_id={board_id}&fields=title,due_date": None,
+        f"/api/boards/{board_id}/timeline?start=2025-01-01T00:00:00Z&end=2025-03-01T00:00:00Z": List[server.Task],
+    }
+
+
+def fields(body):
+    """The keys of every object in a response, nested ones included"""
+    if isinstance(body, list):
+        return [fields(item) for item in body]
+    if isinstance(body, dict):
+        return {key: fields(value) for key, value in body.items()}
+    return None
+
+
+@pytest.fixture
+def filled(client, auth, board):
+    client.post('/api/groups', json={"board_id": board['id'], "name": "Group"}, headers=auth)
+    create_tasks(client, auth, board['id'], 3, due_date="2025-02-01T00:00:00Z")
+    return board
+
+
+def test_fast_payloads_match_the_validated_ones(client, auth, filled, monkeypatch):
+    for path, model in paths(filled).items():
+        monkeypatch.setattr(server, 'FAST_RESPONSES', False)
+        standard = client.get(path, headers=auth)
+        monkeypatch.setattr(server, 'FAST_RESPONSES', True)
+        fast = client.get(path, headers=auth)
+        assert fast.status_code == standard.status_code == 200, path
+        assert fields(fast.json()) == fields(standard.json()), path
+        if model is not None:
+            adapter = TypeAdapter(model)
+            assert adapter.validate_python(fast.json()) == adapter.validate_python(standard.json()), path
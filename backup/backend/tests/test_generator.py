@@ -0,0 +1,44 @@
+"""The synthetic data generator route"""
+import pytest
+
+import server
+from tests.helpers import register
+
+
+@pytest.fixture(autouse=True)
+def generator_enabled(monkeypatch):
+    monkeypatch.setattr(server, 'DATA_GENERATOR_ENABLED', True)
+
+
+SMALL = {"workspaces_per_user": 1, "boards_per_workspace": 2, "groups_per_board": 1, "statuses_per_board": 2, "tasks_per_board": 5}
+
+
+def test_two_users_can_generate_with_the_same_seed(client, auth):
+    first = client.post('/api/generate-data', json=SMALL, headers=auth)
+    assert first.status_code == 200, first.text
+    second = client.post('/api/generate-data', json=SMALL, headers=register(client, 'second'))
+    assert second.status_code == 200, second.text
+    assert second.json() == first.json()
+    assert len(client.get('/api/boards', headers=auth).json()) == 2
+
+
+def test_repeating_a_request_is_a_conflict(client, auth):
+    assert client.post('/api/generate-data', json=SMALL, headers=auth).status_code == 200
+    assert client.post('/api/generate-data', json=SMALL, headers=auth).status_code == 409
+    assert client.post('/api/generate-data', json={**SMALL, "seed": 1}, headers=auth).status_code == 200
+
+
+def test_size_cap_counts_every_document(client, auth, monkeypatch):
+    monkeypatch.setattr(server, 'GENERATOR_MAX_DOCUMENTS', 1000)
+    response = client.post('/api/generate-data', json={**SMALL, "users": 500, "tasks_per_board": 0}, headers=auth)
+    assert response.status_code == 400
+
+
+def test_generated_tasks_are_searchable(client, auth):
+    assert client.post('/api/generate-data', json=SMALL, headers=auth).status_code == 200
+    board = client.get('/api/boards', headers=auth).json()[0]
+    task = client.get('/api/tasks', params={"board_id": board['id']}, headers=auth).json()[0]
+    # The first title word is capitalized, so this also checks it was folded like a typed task's
+    word = task['title'].split()[0].upper()
+    found = client.get('/api/tasks', params={"board_id": board['id'], "search": word}, headers=auth).json()
+    assert task['id'] in [t['id'] for t in found]
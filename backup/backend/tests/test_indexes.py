@@ -0,0 +1,26 @@
+"""Index provisioning on MongoDB"""
+import asyncio
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from repository import MongoRepository, StorageError
+
+
+def test_duplicate_emails_stop_startup():
+    async def scenario():
+        database = AsyncMongoMockClient(tz_aware=True)['taskflow_indexes']
+        await database.users.insert_many([
+            {"id": "u1", "email": "same@example.com", "name": "One"},
+            {"id": "u2", "email": "same@example.com", "name": "Two"},
+        ])
+        await MongoRepository(database).ensure_indexes()
+    with pytest.raises(StorageError):
+        asyncio.run(scenario())
+
+
+def test_register_rejects_a_taken_email(client):
+    body = {"email": "taken@example.com", "password": "secret123", "name": "First"}
+    assert client.post('/api/auth/register', json=body).status_code == 200
+    response = client.post('/api/auth/register', json={**body, "name": "Second"})
+    assert response.status_code == 400
@@ -0,0 +1,25 @@
+"""Route labels of the request metrics"""
+from fastapi.testclient import TestClient
+
+import metrics
+import server
+
+
+def route_of(method: str, path: str) -> str:
+    scope = {"type": "http", "method": method, "path": path, "root_path": "", "app": server.app}
+    return metrics.route_template(scope)
+
+
+def test_route_template_prefers_the_route_matching_the_method():
+    # /api/tasks/bulk is also a path match for /api/tasks/{task_id}, which has no POST
+    assert route_of('POST', '/api/tasks/bulk') == '/api/tasks/bulk'
+    assert route_of('PUT', '/api/tasks/abc') == '/api/tasks/{task_id}'
+    assert route_of('PATCH', '/api/tasks/abc') == '/api/tasks/{task_id}'  # 405, still labelled by its path
+    assert route_of('GET', '/nowhere') == 'unmatched'
+
+
+def test_bulk_requests_are_recorded_under_their_own_route(client, auth, board):
+    client.post('/api/tasks/bulk', json={"operations": []}, headers=auth)
+    text = TestClient(server.app).get('/metrics').text
+    assert 'route="/api/tasks/bulk"' in text
+    assert 'method="POST",route="/api/tasks/{task_id}"' not in text
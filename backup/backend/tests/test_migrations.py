@@ -0,0 +1,27 @@
+"""Startup data migrations on MongoDB"""
+import asyncio
+
+from mongomock_motor import AsyncMongoMockClient
+
+from repository import MongoRepository, SCHEMA_VERSION
+
+
+def test_migrations_run_until_recorded():
+    async def scenario():
+        database = AsyncMongoMockClient(tz_aware=True)['taskflow_migrations']
+        await database.groups.insert_one({"id": "g1", "board_id": "b", "name": "Group", "order": 0, "created_at": "2024-01-02T03:04:05"})
+        await database.tasks.insert_one({"id": "t1", "board_id": "b", "title": "Old task", "order": 0})
+        repository = MongoRepository(database)
+        await repository.migrate()
+        group = await database.groups.find_one({"id": "g1"})
+        task = await database.tasks.find_one({"id": "t1"})
+        # Written by an older version after the migrations were recorded: left alone
+        await database.statuses.insert_one({"id": "s1", "board_id": "b", "name": "Done", "order": 0, "created_at": "2024-01-02T03:04:05"})
+        await repository.migrate()
+        status = await database.statuses.find_one({"id": "s1"})
+        return group, task, status, await repository.schema_version()
+    group, task, status, version = asyncio.run(scenario())
+    assert group['created_at'].year == 2024 and not isinstance(group['created_at'], str)
+    assert task['search_terms'] == ['old', 'task']
+    assert isinstance(status['created_at'], str)
+    assert version == SCHEMA_VERSION
@@ -0,0 +1,24 @@
+"""Every route's query shape is served by an index (needs a real MongoDB: explain() is not mocked)"""
+import asyncio
+import os
+import uuid
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+import query_plans
+
+TEST_MONGO_URL = os.environ.get('TEST_MONGO_URL')
+
+
+@pytest.mark.skipif(not TEST_MONGO_URL, reason="set TEST_MONGO_URL to check query plans against MongoDB")
+def test_no_route_falls_back_to_a_collection_scan():
+    async def check():
+        client = AsyncIOMotorClient(TEST_MONGO_URL, tz_aware=True)
+        name = f"taskflow_plans_{uuid.uuid4().hex[:8]}"
+        try:
+            await query_plans.assert_no_collscan(client[name])
+        finally:
+            await client.drop_database(name)
+            client.close()
+    asyncio.run(check())
@@ -0,0 +1,46 @@
+"""Board statistics and the counters task writes keep"""
+import pytest
+
+import server
+from repository import MongoRepository
+from tests.helpers import create_tasks
+
+
+@pytest.fixture
+def counted(client, auth, board, store, monkeypatch):
+    """Two tasks on a board over the counter threshold, its counters materialized"""
+    monkeypatch.setattr(server, 'STATS_COUNTER_THRESHOLD', 1)
+    tasks = create_tasks(client, auth, board['id'], 2, priority="low")
+    assert client.get(f"/api/boards/{board['id']}/stats", headers=auth).json()['source'] == 'aggregate'
+    return tasks
+
+
+def stats(client, auth, board, store):
+    body = client.get(f"/api/boards/{board['id']}/stats", headers=auth).json()
+    # Only MongoDB materializes counters; SQLite always aggregates
+    assert body['source'] == ('counters' if isinstance(store, MongoRepository) else 'aggregate')
+    return body
+
+
+def test_task_writes_keep_counters_current(client, auth, board, store, counted):
+    first, second = counted
+    create_tasks(client, auth, board['id'], 1, priority="high")
+    client.put(f"/api/tasks/{first['id']}", json={"priority": "high"}, headers=auth)
+    client.delete(f"/api/tasks/{second['id']}", headers=auth)
+    body = stats(client, auth, board, store)
+    assert body['total'] == 2
+    assert body['by_priority'] == {"high": 2}
+
+
+def test_writes_that_leave_counters_alone_skip_them(client, auth, board, store, counted, monkeypatch):
+    adjusted = []
+    bump = store.bump_board_versions
+
+    async def bump_board_versions(board_ids, counters=None):
+        adjusted.append(counters)
+        return await bump(board_ids, counters)
+    monkeypatch.setattr(store, 'bump_board_versions', bump_board_versions)
+    client.put(f"/api/tasks/{counted[0]['id']}", json={"title": "renamed"}, headers=auth)
+    client.put(f"/api/tasks/{counted[0]['id']}", json={"priority": "high"}, headers=auth)
+    assert adjusted == [{}, {board['id']: {"by_priority.low": -1, "by_priority.high": 1}}]
+    assert stats(client, auth, board, store)['by_priority'] == {"low": 1, "high": 1}
@@ -0,0 +1,47 @@
+"""Delta sync tokens"""
+import base64
+import json
+import time
+
+import pytest
+
+from tests.helpers import create_tasks
+
+
+def sync(client, auth, board_id, since=None):
+    params = {"board_id": board_id, **({"since": since} if since else {})}
+    response = client.get('/api/sync', params=params, headers=auth)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_first_sync_resets(client, auth, board):
+    body = sync(client, auth, board['id'])
+    assert body['reset'] is True
+    assert body['sync_token']
+
+
+def test_sync_returns_changes_and_deletions_since_the_token(client, auth, board):
+    kept, removed = create_tasks(client, auth, board['id'], 2)
+    token = sync(client, auth, board['id'])['sync_token']
+
+    client.put(f"/api/tasks/{kept['id']}", json={"title": "renamed"}, headers=auth)
+    client.delete(f"/api/tasks/{removed['id']}", headers=auth)
+    body = sync(client, auth, board['id'], token)
+    assert body['reset'] is False
+    assert [t['title'] for t in body['tasks']] == ['renamed']
+    assert body['deleted']['tasks'] == [removed['id']]
+
+    # The new token covers those changes
+    body = sync(client, auth, board['id'], body['sync_token'])
+    assert body['tasks'] == [] and body['deleted']['tasks'] == []
+
+
+def encoded(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('token', ["garbage!", encoded([0, "y"]), encoded(["x", int(time.time())]), encoded([1.5, int(time.time())]), encoded([True, 0])])
+def test_malformed_token_is_rejected(client, auth, board, token):
+    response = client.get('/api/sync', params={"board_id": board['id'], "since": token}, headers=auth)
+    assert response.status_code == 400
@@ -0,0 +1,214 @@
+"""Task listing, cursors, bulk writes and moves"""
+import base64
+import json
+
+import pytest
+
+import repository
+from tests.helpers import create_tasks
+
+
+def list_ids(client, auth, **params):
+    response = client.get('/api/tasks', params=params, headers=auth)
+    assert response.status_code == 200, response.text
+    return [t['id'] for t in response.json()]
+
+
+def test_cursor_pages_cover_every_task_once(client, auth, board):
+    tasks = create_tasks(client, auth, board['id'], 7)
+    seen, cursor = [], None
+    while True:
+        params = {"board_id": board['id'], "limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = client.get('/api/tasks', params=params, headers=auth)
+        assert response.status_code == 200, response.text
+        seen += [t['id'] for t in response.json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            break
+    assert seen == [t['id'] for t in tasks]
+
+
+def paged_ids(client, auth, board_id, limit):
+    seen, cursor = [], None
+    while True:
+        params = {"board_id": board_id, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get('/api/tasks', params=params, headers=auth)
+        seen += [t['id'] for t in response.json()]
+        cursor = response.headers.get('X-Next-Cursor')
+        if not cursor:
+            return seen
+
+
+@pytest.mark.parametrize('count', [4, 5])  # a last page that is full, and one that is not
+def test_ndjson_streams_every_page(client, auth, board, monkeypatch, count):
+    monkeypatch.setattr(repository, 'STREAM_PAGE_SIZE', 2)
+    create_tasks(client, auth, board['id'], count)
+    headers = {**auth, "Accept": "application/x-ndjson"}
+    with client.stream('GET', '/api/tasks', params={"board_id": board['id']}, headers=headers) as response:
+        assert response.status_code == 200
+        assert response.headers['content-type'].startswith('application/x-ndjson')
+        assert 'X-Next-Cursor' not in response.headers
+        lines = list(response.iter_lines())
+    assert lines and all(lines)
+    assert [json.loads(line)['id'] for line in lines] == paged_ids(client, auth, board['id'], 2)
+    # A limit stops the stream part-way through a page
+    response = client.get('/api/tasks', params={"board_id": board['id'], "limit": 3}, headers=headers)
+    assert [json.loads(line)['id'] for line in response.text.splitlines()] == paged_ids(client, auth, board['id'], 2)[:3]
+
+
+def encoded(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip('=')
+
+
+@pytest.mark.parametrize('cursor', ["not a cursor", encoded([[1], "x"]), encoded([1, 2]), encoded([True, "x"]), encoded({"a": 1})])
+def test_malformed_cursor_is_rejected(client, auth, board, cursor):
+    response = client.get('/api/tasks', params={"board_id": board['id'], "cursor": cursor}, headers=auth)
+    assert response.status_code == 400
+
+
+def test_sparse_fields(client, auth, board):
+    create_tasks(client, auth, board['id'], 2)
+    response = client.get('/api/tasks', params={"board_id": board['id'], "fields": "title"}, headers=auth)
+    assert response.status_code == 200
+    assert all(set(t) == {'id', 'order', 'title'} for t in response.json())
+    response = client.get('/api/tasks', params={"board_id": board['id'], "fields": "nope"}, headers=auth)
+    assert response.status_code == 400
+
+
+def test_ordered_bulk_stops_at_first_failure(client, auth, board):
+    response = client.post('/api/tasks/bulk', json={"ordered": True, "operations": [
+        {"op": "create", "data": {"board_id": board['id'], "title": "first"}},
+        {"op": "update", "id": "missing", "data": {"title": "x"}},
+        {"op": "create", "data": {"board_id": board['id'], "title": "never"}},
+    ]}, headers=auth)
+    assert response.status_code == 200, response.text
+    body = response.json()
+    assert (body['inserted'], body['failed']) == (1, 2)
+    assert [r['ok'] for r in body['results']] == [True, False, False]
+    assert body['results'][1]['error'] == "Task not found"
+    assert body['results'][2]['error'] == "Skipped after an earlier failure"
+    titles = [t['title'] for t in client.get('/api/tasks', params={"board_id": board['id']}, headers=auth).json()]
+    assert titles == ['first']
+
+
+def test_unordered_bulk_applies_everything_that_can_be_applied(client, auth, board):
+    task, = create_tasks(client, auth, board['id'], 1)
+    response = client.post('/api/tasks/bulk', json={"ordered": False, "operations": [
+        {"op": "update", "id": "missing", "data": {"title": "x"}},
+        {"op": "update", "id": task['id'], "data": {"priority": "high"}},
+        {"op": "create", "data": {"board_id": board['id'], "title": "second"}},
+        {"op": "create", "data": {"board_id": "someone-elses", "title": "nope"}},
+    ]}, headers=auth)
+    body = response.json()
+    assert [r['ok'] for r in body['results']] == [False, True, True, False]
+    assert (body['inserted'], body['updated'], body['failed']) == (1, 1, 2)
+    assert client.get(f"/api/tasks/{task['id']}", headers=auth).json()['priority'] == 'high'
+
+
+def test_move_between_neighbours(client, auth, board):
+    a, b, c = create_tasks(client, auth, board['id'], 3)
+    response = client.post(f"/api/tasks/{c['id']}/move", json={"after_id": a['id'], "before_id": b['id']}, headers=auth)
+    assert response.status_code == 200, response.text
+    assert a['order'] < response.json()['order'] < b['order']
+    assert list_ids(client, auth, board_id=board['id']) == [a['id'], c['id'], b['id']]
+
+
+def test_move_to_the_end(client, auth, board):
+    a, b, c = create_tasks(client, auth, board['id'], 3)
+    response = client.post(f"/api/tasks/{a['id']}/move", json={"after_id": c['id']}, headers=auth)
+    assert response.status_code == 200, response.text
+    assert list_ids(client, auth, board_id=board['id']) == [b['id'], c['id'], a['id']]
+
+
+def test_move_between_tasks_sharing_an_order(client, auth, board):
+    # Tasks created without an order all sit at 0
+    a, b, c = [client.post('/api/tasks', json={"board_id": board['id'], "title": t}, headers=auth).json() for t in 'abc']
+    a, b, c = sorted([a, b, c], key=lambda t: t['id'])
+    response = client.post(f"/api/tasks/{c['id']}/move", json={"after_id": a['id'], "before_id": b['id']}, headers=auth)
+    assert response.status_code == 200, response.text
+    assert list_ids(client, auth, board_id=board['id']) == [a['id'], c['id'], b['id']]
+
+    response = client.post(f"/api/tasks/{b['id']}/move", json={"after_id": a['id']}, headers=auth)
+    assert response.status_code == 200, response.text
+    assert list_ids(client, auth, board_id=board['id']) == [a['id'], b['id'], c['id']]
+
+    response = client.post(f"/api/tasks/{c['id']}/move", json={"before_id": b['id']}, headers=auth)
+    assert response.status_code == 200, response.text
+    assert list_ids(client, auth, board_id=board['id']) == [a['id'], c['id'], b['id']]
+
+
+def test_move_with_neighbours_the_wrong_way_round(client, auth, board):
+    a, b, c = create_tasks(client, auth, board['id'], 3)
+    response = client.post(f"/api/tasks/{c['id']}/move", json={"after_id": b['id'], "before_id": a['id']}, headers=auth)
+    assert response.status_code == 400
+
+
+def test_move_checks_the_status_and_group(client, auth, board):
+    a, b = create_tasks(client, auth, board['id'], 2)
+    response = client.post(f"/api/tasks/{a['id']}/move", json={"after_id": b['id'], "status_id": "elsewhere"}, headers=auth)
+    assert response.status_code == 400
+    response = client.post(f"/api/tasks/{a['id']}/move", json={"group_id": "elsewhere"}, headers=auth)
+    assert response.status_code == 400
+    status = client.get('/api/statuses', params={"board_id": board['id']}, headers=auth).json()[-1]
+    response = client.post(f"/api/tasks/{a['id']}/move", json={"after_id": b['id'], "status_id": status['id']}, headers=auth)
+    assert response.json()['status_id'] == status['id']
+
+
+def test_timeline_keeps_the_earliest_due_when_truncated(client, auth, board):
+    days = [5, 1, 3, 2]
+    for day in days:
+        client.post('/api/tasks', json={"board_id": board['id'], "title": f"Due {day}", "due_date": f"2025-01-0{day}T00:00:00Z"}, headers=auth)
+    params = {"start": "2025-01-01T00:00:00Z", "end": "2025-02-01T00:00:00Z", "limit": 2}
+    response = client.get(f"/api/boards/{board['id']}/timeline", params=params, headers=auth)
+    assert response.status_code == 200, response.text
+    assert response.headers['X-Truncated'] == 'true'
+    assert [t['title'] for t in response.json()] == ['Due 1', 'Due 2']
+
+
+def test_search_ranks_every_match_before_limiting(client, auth, board):
+    titles = ["Designer notes", "Review", "Design review", "Design designer"]
+    for order, title in enumerate(titles):
+        client.post('/api/tasks', json={"board_id": board['id'], "title": title, "order": order}, headers=auth)
+
+    def search(q, limit=50):
+        response = client.get('/api/search/tasks', params={"q": q, "board_id": board['id'], "limit": limit}, headers=auth)
+        assert response.status_code == 200, response.text
+        return [(hit['title'], hit['score']) for hit in response.json()]
+    # The best match sits last in board order
+    assert search("design", limit=1) == [("Design designer", 3)]
+    assert search("design") == [("Design designer", 3), ("Design review", 2), ("Designer notes", 1)]
+    assert search("design rev") == [("Design review", 3)]
+    assert search("nothing") == []
+    response = client.get('/api/search/tasks', params={"q": "design", "workspace_id": board['workspace_id'], "limit": 2}, headers=auth)
+    assert [hit['title'] for hit in response.json()] == ["Design designer", "Design review"]
+
+
+@pytest.mark.parametrize('kind', ['group', 'status'])
+def test_deleting_a_group_or_status_clears_it_from_tasks(client, auth, board, kind):
+    parent = client.post(f"/api/{'groups' if kind == 'group' else 'statuses'}", json={"board_id": board['id'], "name": "Parent", "color": "#94a3b8"}, headers=auth).json()
+    field = f"{kind}_id"
+    task, = create_tasks(client, auth, board['id'], 1, **{field: parent['id']})
+    assert client.delete(f"/api/{'groups' if kind == 'group' else 'statuses'}/{parent['id']}", headers=auth).status_code == 200
+    assert client.get(f"/api/tasks/{task['id']}", headers=auth).json()[field] is None
+    assert client.get('/api/tasks', params={"board_id": board['id'], field: parent['id']}, headers=auth).json() == []
+
+
+def test_task_writes_reject_missing_groups_and_statuses(client, auth, board):
+    response = client.post('/api/tasks', json={"board_id": board['id'], "title": "Orphan", "group_id": "missing"}, headers=auth)
+    assert response.status_code == 400
+    task, = create_tasks(client, auth, board['id'], 1)
+    response = client.put(f"/api/tasks/{task['id']}", json={"status_id": "missing"}, headers=auth)
+    assert response.status_code == 400
+    assert client.get(f"/api/tasks/{task['id']}", headers=auth).json()['status_id'] == task['status_id']
+
+    for ordered, outcome in [(True, [True, False, False]), (False, [True, False, True])]:
+        response = client.post('/api/tasks/bulk', json={"ordered": ordered, "operations": [
+            {"op": "update", "id": task['id'], "data": {"priority": "low"}},
+            {"op": "create", "data": {"board_id": board['id'], "title": "Orphan", "status_id": "missing"}},
+            {"op": "create", "data": {"board_id": board['id'], "title": f"Kept {ordered}"}},
+        ]}, headers=auth)
+        results = response.json()['results']
+        assert [r['ok'] for r in results] == outcome
+        assert results[1]['error'] == repository.MISSING_REFERENCE
+    titles = [t['title'] for t in client.get('/api/tasks', params={"board_id": board['id']}, headers=auth).json()]
+    assert sorted(titles) == ["Kept False", "Task 0"]